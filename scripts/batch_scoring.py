@@ -0,0 +1,33 @@
+# batch_scoring.py
+# Scores a (possibly very large) loan file with the tuned pipeline in chunks.
+
+import os
+import click
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.instrumentation import instrument
+
+
+@click.command()
+@click.option('--pipeline_from', type=str, help="Path to the pipeline object", required=True)
+@click.option('--data_from', type=str, help="Path to the .csv or .parquet file of loans to score", required=True)
+@click.option('--data_to', type=str, help="Path to the .csv or .parquet file the scores are written to", required=True)
+@click.option('--chunksize', type=int, default=100_000, help="Number of loans scored per chunk")
+@click.option('--n_jobs', type=int, default=1, help="Number of worker processes scoring chunks, -1 for all cores")
+@click.option('--keep_column', 'keep_columns', type=str, multiple=True, help="Input column to copy into the output (repeatable)")
+@instrument(name="batch_scoring", report=True)
+def main(pipeline_from, data_from, data_to, chunksize, n_jobs, keep_columns):
+    '''Writes default probabilities and predicted labels for every loan in the input file.'''
+    from src.batch_scoring import score_file
+
+    output_dir = os.path.dirname(data_to)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    stats = score_file(pipeline_from, data_from, data_to, chunksize=chunksize, n_jobs=n_jobs, keep_columns=keep_columns)
+
+    print(f"Scored {stats['rows']} loans in {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/s)")
+    print(f"Scores successfully saved to {data_to}")
+
+if __name__ == '__main__':
+    main()
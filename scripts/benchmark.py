@@ -0,0 +1,59 @@
+# benchmark.py
+# Times the src/ functions and the pipeline stages on synthetic data of increasing size
+# and compares the results with a stored baseline.
+
+import os
+import sys
+import click
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.benchmark import SIZES, FUNCTIONS, STAGES, run_function_benchmarks, run_stage_benchmarks, \
+    save_results, load_results, compare_results
+from src.instrumentation import instrument
+
+
+@click.command()
+@click.option('--sizes', type=int, multiple=True, default=SIZES, show_default=True,
+              help="Row counts to benchmark (repeat the option for several)")
+@click.option('--only', type=click.Choice(FUNCTIONS + [stage.name for stage in STAGES]), multiple=True,
+              help="Benchmark only these functions or stages (repeat the option for several)")
+@click.option('--skip_stages', is_flag=True, help="Only benchmark the src/ functions")
+@click.option('--repeat', type=int, default=3, show_default=True, help="Timed calls per function benchmark")
+@click.option('--budget', type=float, default=None,
+              help="Skip the sizes a case is projected to need more than this many seconds for")
+@click.option('--timeout', type=float, default=None, help="Kill a stage after this many seconds")
+@click.option('--output', type=str, default="results/benchmarks/latest.json", show_default=True,
+              help="Path of the JSON results")
+@click.option('--baseline', type=str, default="results/benchmarks/baseline.json", show_default=True,
+              help="Baseline JSON results to compare against, if the file exists")
+@click.option('--tolerance', type=float, default=0.25, show_default=True,
+              help="Relative slowdown or memory growth reported as a regression")
+@instrument(name="benchmark", report=True)
+def main(sizes, only, skip_stages, repeat, budget, timeout, output, baseline, tolerance):
+    '''Benchmarks the src/ functions and scripts/ stages and compares them with a baseline.'''
+    sizes = sorted(sizes)
+    functions = [name for name in FUNCTIONS if not only or name in only]
+    stages = [stage.name for stage in STAGES if not only or stage.name in only]
+
+    results = []
+    if functions:
+        results += run_function_benchmarks(sizes, names=functions, repeat=repeat, budget=budget)
+    if stages and not skip_stages:
+        results += run_stage_benchmarks(sizes, stages=stages, budget=budget, timeout=timeout)
+    save_results(results, output)
+
+    with pd.option_context("display.width", 200, "display.max_rows", None):
+        print(pd.DataFrame(results).to_string(index=False, float_format="{:.4g}".format))
+        print(f"Benchmark results saved to {output}")
+
+        if os.path.exists(baseline):
+            comparison = compare_results(results, load_results(baseline), tolerance=tolerance)
+            print(f"\nComparison with {baseline}:")
+            print(comparison[["name", "n_rows", "seconds", "seconds_baseline", "time_ratio",
+                              "memory_ratio", "regression"]].to_string(index=False, float_format="{:.3g}".format))
+            if comparison["regression"].any():
+                raise SystemExit(f"{int(comparison['regression'].sum())} benchmark(s) regressed "
+                                 f"by more than {tolerance:.0%}")
+
+if __name__ == '__main__':
+    main()
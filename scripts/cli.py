@@ -0,0 +1,60 @@
+# cli.py
+# Single entry point running every stage script as a subcommand, e.g.
+#   python scripts/cli.py split_validation --data_from=data/raw/loan_data.csv --data_to=data/processed
+
+import os
+import importlib.util
+import click
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Subcommand -> one-line help; each runs the `main` of scripts/<subcommand>.py
+STAGES = {
+    "download_data": "Download the raw loan data.",
+    "split_validation": "Validate the raw data and split it into train and test sets.",
+    "eda": "Save the exploratory tables and figures.",
+    "preprocessing": "Fit the preprocessor and scale the train and test sets.",
+    "model_training": "Cross-validate the candidate models.",
+    "model_tuning": "Tune the logistic regression and save the pipeline.",
+    "model_evaluation": "Evaluate the tuned pipeline on the test set.",
+    "batch_scoring": "Score a file of loans in chunks.",
+    "scoring_service": "Serve single-loan scores over HTTP.",
+    "synthetic_data": "Generate synthetic loans.",
+    "run_pipeline": "Run the Makefile stages with caching.",
+    "run_in_process": "Run the split to the evaluation in one process.",
+    "benchmark": "Benchmark the src/ functions and stages.",
+}
+
+
+class LazyGroup(click.Group):
+    """
+    Click group whose subcommands are imported only when they are invoked.
+
+    Listing the commands (`--help`) uses the help strings in `STAGES`, so
+    it imports no stage script; invoking one imports that script alone,
+    and the stage imports its heavy dependencies when it runs.
+    """
+
+    def list_commands(self, ctx):
+        return list(STAGES)
+
+    def get_command(self, ctx, name):
+        if name not in STAGES:
+            return None
+        spec = importlib.util.spec_from_file_location(f"scripts.{name}", os.path.join(SCRIPTS_DIR, f"{name}.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.main
+
+    def format_commands(self, ctx, formatter):
+        with formatter.section("Commands"):
+            formatter.write_dl(list(STAGES.items()))
+
+
+@click.group(cls=LazyGroup)
+def cli():
+    '''Runs one stage of the loan default analysis.'''
+
+
+if __name__ == '__main__':
+    cli()
@@ -5,11 +5,9 @@
 
 import click
 import os
-import requests
-import pandas as pd
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.write_csv import write_csv
+from src.instrumentation import instrument
 
 
 def download_csv(url, directory):
@@ -27,6 +25,10 @@ def download_csv(url, directory):
     -------
     None
     """
+    import requests
+    import pandas as pd
+    from src.write_csv import write_csv
+
     # Check if URL is valid
     try:
         response = requests.get(url)
@@ -51,6 +53,7 @@ def download_csv(url, directory):
 @click.command()
 @click.option('--url', type=str, help='URL of dataset to be downloaded')
 @click.option('--output_dir', type=str, help='Path to directory where the data will be saved')
+@instrument(name="download_data", report=True)
 def main(url, output_dir):
     """Downloads CSV data from the web to a local filepath."""
     try:
@@ -3,30 +3,34 @@
 # date: December 05, 2024
 
 import os
-import numpy as np
-import pandas as pd
-import altair as alt
 import click
-import matplotlib.pyplot as plt
 import io
 import sys
+from concurrent.futures import ProcessPoolExecutor
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.data_cleaning import handle_missing_values, add_loan_categories, add_loan_income_ratio, add_risk_categories
-
-
-# Enable the VegaFusion data transformer
-alt.data_transformers.enable("vegafusion")
+from src.instrumentation import instrument
 
 @click.command()
 @click.option('--input_csv', type=str, help='Path to input CSV file', required=True)
 @click.option('--output_dir', type=str, help='Directory to save visualizations and summary statistics', required=True)
+@instrument(name="eda", report=True)
 def main(input_csv, output_dir):
     """
     Perform exploratory data analysis (EDA) on the input dataset and save visualizations and statistics.
     """
+    import pandas as pd
+    import altair as alt
+    from src.read_data import read_loan_data
+    from src.data_cleaning import LoanFeatureEngineer
+    from src.eda_plots import histogram_bins, plot_histogram_grid, count_table, sort_by_count, boxplot_summary, \
+        boxplot_chart, save_chart
+
+    # Enable the VegaFusion data transformer
+    alt.data_transformers.enable("vegafusion")
+
     # SECTION 1: Load Data
     try:
-        train_df = pd.read_csv(input_csv)
+        train_df = read_loan_data(input_csv)
         print(f"Data loaded successfully from {input_csv}")
     except Exception as e:
         print(f"Error loading data: {e}")
@@ -51,71 +55,37 @@ def main(input_csv, output_dir):
         'days.with.cr.line', 'revol.bal', 'revol.util', 'inq.last.6mths', 'annual.inc'
     ]
 
-    # Add transformed income-level data
-    train_df['annual.inc'] = np.exp(train_df['log.annual.inc'])
-
-    # Loan-to-Income Ratio
-    train_df = add_loan_income_ratio(train_df, installment_column='installment', income_column='annual.inc')
-
-    # Creating Loan Categories based on FICO score
-    train_df = add_loan_categories(train_df, fico_column='fico')
-
-
-    # Creating Risk Categories based on FICO score
-    train_df = add_risk_categories(train_df, fico_column='fico')
+    # Add annual income, loan-to-income ratio, and loan and risk categories based on FICO score
+    train_df = LoanFeatureEngineer(fico_column='fico').fit_transform(train_df)
 
     # SECTION 4: Visualization (Save to output directory)
 
-    # Histograms for Numeric Columns in a Grid
-    num_plots = len(numeric_cols)
-    n_cols = 3  # Number of columns in the grid
-    n_rows = (num_plots // n_cols) + (num_plots % n_cols != 0)  # Calculate rows needed
-
-    fig, axes = plt.subplots(n_rows, n_cols, figsize=(15, 5 * n_rows))
-
-    # Flatten axes to make indexing easier (in case of multi-row grid)
-    axes = axes.flatten()
-
-    for i, feat in enumerate(numeric_cols):
-        ax = axes[i]
-        train_df.groupby("not.fully.paid")[feat].plot.hist(
-            bins=40, alpha=0.4, legend=True, density=True, title=f"{feat}", ax=ax
-        )
-        ax.set_xlabel(feat)
-
-    # Hide any unused subplots if the grid is larger than the number of features
-    for i in range(num_plots, len(axes)):
-        axes[i].axis('off')
-
-    # Adjust layout and save the grid of histograms
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, "figures", "histograms_grid.png"))
-    plt.close(fig)
-
-
-    # Default Rate by Loan Purpose
-    loan_purpose_data = train_df.explode('purpose')
-    purpose_risk_chart = alt.Chart(loan_purpose_data).mark_circle().encode(
-        x=alt.X('loan_categories:N', title='Risk Profile Category', sort='-color', axis=alt.Axis(labelAngle=0)),
-        y=alt.Y('purpose:N', title='Loan Purpose', sort='color'),
-        color=alt.Color('count()', scale=alt.Scale(scheme='viridis'), title='Loan Count'),
-        size=alt.Size('count()', title='Loan Count', scale=alt.Scale(range=[50, 1500])),
-        tooltip=['purpose', 'loan_categories', 'count()']
+    # Histograms for Numeric Columns in a Grid, binned once per feature and class
+    histograms = histogram_bins(train_df, numeric_cols, by="not.fully.paid", bins=40)
+
+    # Default Rate by Loan Purpose, from the loan counts per purpose and category
+    purpose_counts = count_table(train_df, ['loan_categories', 'purpose'])
+    purpose_risk_chart = alt.Chart(purpose_counts).mark_circle().encode(
+        x=alt.X('loan_categories:N', title='Risk Profile Category',
+                sort=sort_by_count(purpose_counts, 'loan_categories', descending=True), axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('purpose:N', title='Loan Purpose', sort=sort_by_count(purpose_counts, 'purpose')),
+        # Summing the one count per point keeps the chart aggregated, so the circles stay opaque
+        color=alt.Color('sum(count):Q', scale=alt.Scale(scheme='viridis'), title='Loan Count'),
+        size=alt.Size('sum(count):Q', title='Loan Count', scale=alt.Scale(range=[50, 1500])),
+        tooltip=['purpose', 'loan_categories', alt.Tooltip('sum(count):Q', title='Loan Count')]
     ).properties(
         width=600,
         height=400
     )
-    purpose_risk_chart.save(os.path.join(output_dir, "figures", "loan_category_vs_purpose.png"))
 
     # Risk Categories Distribution
-    categories_hist = alt.Chart(train_df).mark_bar().encode(
+    categories_hist = alt.Chart(count_table(train_df, 'risk_category')).mark_bar().encode(
         x=alt.X('risk_category:N', title='Risk Categories', axis=alt.Axis(labelAngle=0)),  
-        y=alt.Y('count()', title='Count') 
+        y=alt.Y('count:Q', title='Count') 
     ).properties(
         height=300,
         width=400
     )
-    categories_hist.save(os.path.join(output_dir, "figures", "risk_categories_distribution.png"))
 
     # SECTION 5: Correlation Heatmap
     correlation_matrix = train_df[numeric_cols].corr().reset_index().melt('index')
@@ -131,60 +101,34 @@ def main(input_csv, output_dir):
         height=400,
         title="Correlation Heatmap"
     )
-    correlation_chart.save(os.path.join(output_dir, "figures", "correlation_heatmap.png"))
-
-    #fico by loan purpose
-    purpose_fico_boxplot = alt.Chart(loan_purpose_data).mark_boxplot().encode(
-        y=alt.Y('purpose:N', title='Loan Purpose', sort='-x'),  
-        x=alt.X('fico:Q', title='FICO Score', scale=alt.Scale(domain=[600, 850]),),  
-        color=alt.Color('purpose:N', legend=None),  
-        tooltip=['purpose', 'fico']
-    ).properties(
-        width=400,
-        height=200
-    )
-
-    purpose_fico_boxplot.save(os.path.join(output_dir, "figures", "boxplot_purpose.png"))
 
-    #Debt to income ratio by risk level
-    risk_dti_boxplot = alt.Chart(train_df).mark_boxplot().encode(
-        y=alt.Y('risk_category:N', title='Risk Level', sort='-x'),  
-        x=alt.X('dti:Q', title='DTI (Debt-to-Income) %', scale=alt.Scale(domain=[0, 35])),  
-        color=alt.Color('risk_category:N', legend=None),  
-        tooltip=['risk_category', 'dti']
-    ).properties(
-        width=400,
-        height=200
-    )
-
-
-    risk_dti_boxplot.save(os.path.join(output_dir, "figures", "boxplot_risk.png"))
-
-
-    # SECTION 6: Boxplots (FICO by Loan Purpose and DTI by Risk Category)
+    # SECTION 6: Boxplots, drawn from their quartiles, whiskers and outliers
     # FICO by loan purpose
-    purpose_fico_boxplot = alt.Chart(loan_purpose_data).mark_boxplot().encode(
-        y=alt.Y('purpose:N', title='Loan Purpose', sort='-x'),  
-        x=alt.X('fico:Q', title='FICO Score', scale=alt.Scale(domain=[600, 850])),  
-        color=alt.Color('purpose:N', legend=None),  
-        tooltip=['purpose', 'fico']
-    ).properties(
-        width=400,
-        height=200,
-        title='Boxplot of FICO Scores by Loan Purpose'
+    purpose_fico_boxplot = boxplot_chart(
+        *boxplot_summary(train_df, 'fico', by='purpose'), 'fico', 'purpose',
+        x_title='FICO Score', y_title='Loan Purpose', domain=[600, 850]
     )
 
     # Debt to income ratio by risk level
-    risk_dti_boxplot = alt.Chart(train_df).mark_boxplot().encode(
-        y=alt.Y('risk_category:N', title='Risk Category', sort='-x'),  
-        x=alt.X('dti:Q', title='DTI (Debt-to-Income)', scale=alt.Scale(domain=[0, 35])),  
-        color=alt.Color('risk_category:N', legend=None),  
-        tooltip=['risk_category', 'dti']
-    ).properties(
-        width=400,
-        height=200,
-        title='Boxplot of DTI by Risk Category'
+    risk_dti_boxplot = boxplot_chart(
+        *boxplot_summary(train_df, 'dti', by='risk_category'), 'dti', 'risk_category',
+        x_title='DTI (Debt-to-Income) %', y_title='Risk Level', domain=[0, 35]
     )
 
+    # SECTION 7: Render the figures in parallel
+    figures = [
+        (plot_histogram_grid, histograms, "histograms_grid.png"),
+        (save_chart, purpose_risk_chart, "loan_category_vs_purpose.png"),
+        (save_chart, categories_hist, "risk_categories_distribution.png"),
+        (save_chart, correlation_chart, "correlation_heatmap.png"),
+        (save_chart, purpose_fico_boxplot, "boxplot_purpose.png"),
+        (save_chart, risk_dti_boxplot, "boxplot_risk.png"),
+    ]
+    with ProcessPoolExecutor(max_workers=min(len(figures), os.cpu_count())) as pool:
+        futures = [pool.submit(render, figure, os.path.join(output_dir, "figures", filename))
+                   for render, figure, filename in figures]
+        for future in futures:
+            future.result()
+
 if __name__ == '__main__':
     main()
@@ -1,83 +1,39 @@
 # Import 
 import os
-import numpy as np
-import pandas as pd
-from sklearn.pipeline import Pipeline
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score
-from sklearn import set_config
 import click
 import pickle
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.write_csv import write_csv
+from src.instrumentation import instrument
 
 @click.command()
 @click.option('--data_from', type=str, help="Path to training data")
 @click.option('--data_to', type=str, help="Path to cv results ")
 @click.option('--pipeline_from', type=str, help="Path to the pipeline object")
-@click.option('--preprocessor_from', type=str, help="Path to preprocessor object")
+@click.option('--preprocessor_from', type=str, hidden=True,
+              help="Deprecated and ignored: the preprocessor is taken from the pipeline")
+@click.option('--n_bootstrap', type=int, default=10000, help="Number of bootstrap resamples for the confidence intervals")
+@click.option('--n_jobs', type=int, default=-1, help="Number of processes for the bootstrap (-1 uses all cores)")
 
 
-def main(data_from, pipeline_from, data_to, preprocessor_from):
+@instrument(name="model_evaluation", report=True)
+def main(data_from, pipeline_from, data_to, preprocessor_from, n_bootstrap, n_jobs):
+    from src.read_data import read_loan_data
+    from src.stages import evaluate, write_tables
+
+    if preprocessor_from is not None:
+        click.echo("--preprocessor_from is deprecated and ignored: the preprocessor is taken from the pipeline",
+                   err=True)
+
     try:
-        train_df = pd.read_csv(os.path.join(data_from, "loan_train.csv"))
-        test_df = pd.read_csv(os.path.join(data_from, "loan_test.csv"))
+        test_df = read_loan_data(os.path.join(data_from, "loan_test.csv"))
         print(f"Data loaded successfully from {data_from}")
     except Exception as e:
         print(f"Error loading data: {e}")
         return
 
     log_reg_search = pickle.load(open(pipeline_from, 'rb'))
-    X_train = train_df.drop(columns="not.fully.paid")
-    X_test = test_df.drop(columns="not.fully.paid")
-    y_test = test_df["not.fully.paid"]
-    
-    y_pred_log_reg = log_reg_search.predict(X_test)
-    accuracy_log_reg = round(accuracy_score(y_test, y_pred_log_reg), 4)
-    write_csv(
-        pd.DataFrame({"Accuracy Score":[accuracy_log_reg]}),
-        data_to,
-        "test_results.csv",
-        index=True
-    )
-
-    pred_true = pd.DataFrame({"prediction":y_pred_log_reg, "true":y_test})
-    results_log_reg = pd.DataFrame(
-        {   
-            " ": ["True Positive (defaulted)", "True Negative (fully paid)"],
-            "Predict Positive (defaulted)": [
-                len(pred_true.query("prediction == 1 & true == 1")),
-                len(pred_true.query("prediction == 1 & true == 0"))
-                
-            ],
-            "Predict Negative (fully paid)": [
-                len(pred_true.query("prediction == 0 & true == 1")),
-                len(pred_true.query("prediction == 0 & true == 0"))
-        
-            ]
-        }
-    )
-    write_csv(results_log_reg, data_to, "confusion_matrix.csv", index=False)
-    
-    preprocessor = pickle.load(open(preprocessor_from, "rb"))
-    preprocessor.fit(X_train)
-    coefficients = log_reg_search.best_estimator_.named_steps['LogReg'].coef_[0]
-
-    positive_coef = pd.DataFrame(
-        {"features":preprocessor.get_feature_names_out(),
-        "positive coefficient": np.round(coefficients, decimals=4)}
-    ).sort_values(by="positive coefficient", ascending=True, ignore_index=True)
-    
-    write_csv(positive_coef, data_to, "positive_coef.csv", index=False)
-
-
-    negative_coef = pd.DataFrame(
-        {"features":preprocessor.get_feature_names_out(),
-        "negative coefficient": np.round(coefficients,decimals=4)}
-    ).sort_values(by="negative coefficient", ascending=False, ignore_index=True)
-
-    write_csv(negative_coef, data_to, "negative_coef.csv", index=False)
+    write_tables(evaluate(log_reg_search, test_df, n_bootstrap=n_bootstrap, n_jobs=n_jobs), data_to)
 
     print(f"Best model evaluation results successfully saved to {data_to}")
     
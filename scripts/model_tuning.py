@@ -1,21 +1,10 @@
 
 # imports
 import click
-import numpy as np
-import pandas as pd
 import os
-import pickle
-import altair as alt
-from sklearn import set_config
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import cross_validate
-from sklearn.pipeline import Pipeline
-from sklearn.metrics import fbeta_score, make_scorer
-from joblib import dump
-from sklearn.model_selection import GridSearchCV
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.write_csv import write_csv
+from src.instrumentation import instrument
 
 
 
@@ -24,65 +13,46 @@ from src.write_csv import write_csv
 @click.option('--data_to', type=str, help="Path to cv results ")
 @click.option('--pipeline_to', type=str, help="Path to the pipeline object")
 @click.option('--preprocessor_from', type=str, help="Path to preprocessor object")
+@click.option('--search', type=click.Choice(["grid", "path", "halving", "streaming"]), default="grid",
+              help="A full grid search (the published results), or the faster opt-in searches: a warm-started "
+                   "C path per fold, successive halving on subsamples, or an out-of-core SGD alpha sweep over "
+                   "the streamed training file")
+@click.option('--chunksize', type=int, default=100_000, help="Rows per chunk for --search=streaming")
+@click.option('--n_epochs', type=int, default=5, help="Passes over the training file for --search=streaming")
 
 
-def main(data_from, preprocessor_from,data_to, pipeline_to):
+@instrument(name="model_tuning", report=True)
+def main(data_from, preprocessor_from,data_to, pipeline_to, search, chunksize, n_epochs):
     '''hyper parameter tuning for logistic model 
     and saves the pipeline object.'''
-    try:
-        train_df = pd.read_csv(os.path.join(data_from, "loan_train.csv"))
-        print(f"Data loaded successfully from {data_from}")
-    except Exception as e:
-        print(f"Error loading data: {e}")
-        return
-    
-    X_train = train_df.drop(columns="not.fully.paid")
-    y_train = train_df["not.fully.paid"]
-    
-    # Logistic Regression Tuning
-    log_reg_param_dist = {
-        "LogReg__C": np.logspace(-5, 5)
-    }
-    preprocessor = pickle.load(open(preprocessor_from, "rb"))
-
-    log_reg_pipe = Pipeline(steps=[
-                ('preprocessor', preprocessor),
-                ('LogReg', LogisticRegression(random_state=123, max_iter=20000))
-    ])
-
-    log_reg_search = GridSearchCV(
-        log_reg_pipe,
-        param_grid=log_reg_param_dist,
-        cv=10,
-        n_jobs=-1,
-        return_train_score=True
-    )
-
-    log_reg_search.fit(X_train, y_train)
-
-    pickle.dump(log_reg_search, open(os.path.join(pipeline_to, "pipeline.pickle"), "wb"))
-    
-    cv_results = pd.DataFrame(log_reg_search.cv_results_)[[
-        "rank_test_score",
-        "param_LogReg__C",
-        "mean_test_score",
-        "mean_train_score"
-    ]]
-    cv_graph = alt.Chart(cv_results).mark_line().encode(
-        x=alt.X('param_LogReg__C:Q', scale=alt.Scale(type='log'), title='C'), 
-        y=alt.Y('mean_test_score:Q', scale=alt.Scale(zero=False, domain=(0.839, 0.8401)), title='Accuracy Score'),  
-    ).properties(
-        width=500
-    )
-    cv_results =  np.round(cv_results, decimals=6).sort_values(by="rank_test_score").head(1)
-    cv_results = pd.DataFrame(
-    data={
-        "Best C": cv_results.iloc[:,1],
-        "Mean Test Score": cv_results.iloc[:,2],
-        "Mean Train Score": cv_results.iloc[:,3]}).reset_index(drop=True)
+    import numpy as np
+    from src.read_data import read_loan_data
+    from src.model_tuning import streaming_alpha_search
+    from src.stages import tune, tuning_report, save_pipeline, write_tables
+
+    if search == "streaming":
+        # Strongest regularization first, so ties go to the simpler model as with C
+        log_reg_search = streaming_alpha_search(
+            preprocessor_from, os.path.join(data_from, "loan_train.csv"), np.logspace(-1, -6, 11),
+            chunksize=chunksize, n_epochs=n_epochs
+        )
+    else:
+        try:
+            train_df = read_loan_data(os.path.join(data_from, "loan_train.csv"))
+            print(f"Data loaded successfully from {data_from}")
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            return
+
+        # Logistic Regression Tuning
+        log_reg_search = tune(preprocessor_from, train_df, search=search)
+
+    save_pipeline(log_reg_search, os.path.join(pipeline_to, "pipeline.pickle"))
+
+    # The streaming search tunes SGD's alpha, where a larger value means more regularization
+    tables, cv_graph = tuning_report(log_reg_search, param="alpha" if search == "streaming" else "C")
     cv_graph.save(os.path.join(data_to, "..", "figures", "param_C_tuning.png"))
-
-    write_csv(cv_results, data_to, "model_results.csv", index=True)
+    write_tables(tables, data_to)
 
     print(f"Best model saved to {pipeline_to}")
     print(f"Hyperparameter tuning graph saved to 'results/figures'")
@@ -1,79 +1,56 @@
 # Import 
 import os
-import pandas as pd
 import click
-import pickle 
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn import set_config
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.write_csv import write_csv
+from src.instrumentation import instrument
 
 @click.command()
 @click.option('--data_from', type=str, help="Path to split data")
 @click.option('--data_to', type=str, help="Path to preprocessed data")
 @click.option('--preprocessor_to', type=str, help="Path to preprocessor")
+@click.option('--chunksize', type=int, default=None,
+              help="Stream the data in chunks of this many rows instead of loading it (out-of-core fit)")
 
-def main(data_from, data_to, preprocessor_to):
-
-    # Load Data
-    try:
-        train_df = pd.read_csv(os.path.join(data_from, "loan_train.csv"))
-        test_df = pd.read_csv(os.path.join(data_from, "loan_test.csv"))
-        print(f"Data loaded successfully from {data_from}")
-    except Exception as e:
-        print(f"Error loading data: {e}")
-        return
-    
-    # Split into training and testing sets
-    # Features
-    X_train = train_df.drop(columns=['not.fully.paid'])  
-    X_test = test_df.drop(columns=['not.fully.paid' ]) 
-
-    # Target
-    y_train = train_df['not.fully.paid']               
-    y_test = test_df['not.fully.paid']      
-
-    # Define numeric and categorical columns
-    numeric_features = [
-        'int.rate', 'installment', 'log.annual.inc', 'dti', 
-        'days.with.cr.line', 'revol.bal', 'revol.util', "fico",
-        'inq.last.6mths', 'delinq.2yrs', 'pub.rec', "credit.policy"
-    ]
-    categorical_features = ['purpose']
-
-    # Preprocessing
-    numeric_transformer = Pipeline(steps=[
-        ('imputer', SimpleImputer(strategy='median')),  # Handle missing values
-        ('scaler', StandardScaler())                   # Scale numeric features
-    ])
-
-    categorical_transformer = Pipeline(steps=[
-        ('imputer', SimpleImputer(strategy='most_frequent')),  # Handle missing values
-        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))     # Encode categorical features
-    ])
-
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', numeric_transformer, numeric_features),
-            ('cat', categorical_transformer, categorical_features)
-        ]
-    )
-    os.makedirs(preprocessor_to, exist_ok=True)
-    pickle.dump(preprocessor, open(os.path.join(preprocessor_to, "preprocessor.pickle"), "wb"))
-
-    # Save transformed data to csv
-    set_config(transform_output="pandas")
-    preprocessor.fit(train_df)
-    scale_train = preprocessor.transform(train_df)
-    scale_test = preprocessor.transform(test_df)
+@instrument(name="preprocessing", report=True)
+def main(data_from, data_to, preprocessor_to, chunksize):
+    from src.read_data import read_loan_data, iter_chunks
+    from src.preprocessing import fit_out_of_core, transform_file, FeatureDigest, PreprocessorArtifact
+    from src.stages import make_preprocessor, preprocess, save_artifact, write_tables
 
     os.makedirs(os.path.join(data_to), exist_ok=True)
-    write_csv(scale_train, data_to, "scaled_loan_train.csv", index=False)
-    write_csv(scale_test, data_to, "scaled_loan_test.csv", index=False)
+    train_path = os.path.join(data_from, "loan_train.csv")
+    if chunksize is not None:
+        # The preprocessor is fitted on the features only, as the model pipelines use it
+        preprocessor, features = make_preprocessor(), FeatureDigest()
+        # Out-of-core: one streaming pass to fit (medians from a quantile sketch), one per file to transform
+        try:
+            fit_out_of_core(preprocessor, (features.update(chunk.drop(columns=['not.fully.paid']))
+                                           for chunk in iter_chunks(train_path, chunksize)))
+        except Exception as e:
+            print(f"Error fitting preprocessor: {e}")
+            return
+        for name in ["loan_train.csv", "loan_test.csv"]:
+            transform_file(preprocessor, os.path.join(data_from, name), os.path.join(data_to, f"scaled_{name}"),
+                           chunksize=chunksize)
+        artifact = PreprocessorArtifact(preprocessor, {"features_sha256": features.hexdigest(),
+                                                       "n_rows": features.n_rows})
+    else:
+        # Load Data
+        try:
+            train_df = read_loan_data(train_path)
+            test_df = read_loan_data(os.path.join(data_from, "loan_test.csv"))
+            print(f"Data loaded successfully from {data_from}")
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            return
+
+        # Save transformed data to csv
+        artifact, tables = preprocess(train_df, test_df)
+        write_tables(tables, data_to)
+
+    # Publish the fitted preprocessor with what it was fitted on, for downstream stages to reuse
+    save_artifact(artifact, os.path.join(preprocessor_to, "preprocessor.pickle"), train_path)
 
     print(f"Preprocessor successfully saved to {preprocessor_to}")
     print(f"Scaled data successfully saved to {data_to}")
@@ -0,0 +1,34 @@
+# run_in_process.py
+# Runs split_validation, preprocessing, model_training, model_tuning and model_evaluation
+# in one process, passing data and models between them in memory.
+
+import os
+import sys
+import click
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.instrumentation import instrument
+
+
+@click.command()
+@click.option('--data_from', type=str, default="data/raw/loan_data.csv", show_default=True, help="Path to raw data")
+@click.option('--processed_to', type=str, default="data/processed", show_default=True,
+              help="Directory of the split and scaled data")
+@click.option('--tables_to', type=str, default="results/tables", show_default=True, help="Directory of the result tables")
+@click.option('--figures_to', type=str, default="results/figures", show_default=True, help="Directory of the tuning figure")
+@click.option('--models_to', type=str, default="results/models", show_default=True,
+              help="Directory of the preprocessor and pipeline objects")
+@click.option('--search', type=click.Choice(["grid", "path", "halving"]), default="grid",
+              help="C search of model_tuning")
+@click.option('--n_jobs', type=int, default=-1, help="Number of worker processes for model comparison and the bootstrap")
+@click.option('--n_bootstrap', type=int, default=10000, help="Number of bootstrap resamples for the confidence intervals")
+@instrument(name="run_in_process", report=True)
+def main(data_from, processed_to, tables_to, figures_to, models_to, search, n_jobs, n_bootstrap):
+    '''Runs the stages from the split to the evaluation without re-reading their intermediate files.'''
+    from src.stages import run_in_process
+
+    run_in_process(data_from, processed_to, tables_to, figures_to, models_to, search=search,
+                   n_jobs=n_jobs, n_bootstrap=n_bootstrap)
+    print(f"Results saved to {processed_to}, {tables_to}, {figures_to} and {models_to}")
+
+if __name__ == '__main__':
+    main()
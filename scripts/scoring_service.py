@@ -0,0 +1,50 @@
+# scoring_service.py
+# Serves single-loan default scores over HTTP from the compiled tuned pipeline.
+
+import os
+import pickle
+import click
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.instrumentation import instrument
+
+
+@click.command()
+@click.option('--pipeline_from', type=str, help="Path to the pipeline object", required=True)
+@click.option('--host', type=str, default="127.0.0.1", help="Interface to listen on")
+@click.option('--port', type=int, default=8000, help="Port to listen on")
+@click.option('--benchmark_from', type=str, default=None,
+              help="Instead of serving, report scoring latency (p50/p99) on the loans in this CSV file")
+@instrument(name="scoring_service", report=True)
+def main(pipeline_from, host, port, benchmark_from):
+    '''Scores loans posted to /score with the compiled tuned pipeline.'''
+    import pandas as pd
+    from src.compiled_scorer import CompiledLinearScorer, latency_benchmark
+    from src.scoring_service import make_server
+
+    pipeline = pickle.load(open(pipeline_from, "rb"))
+    scorer = CompiledLinearScorer.from_pipeline(pipeline)
+
+    if benchmark_from is not None:
+        loans = pd.read_csv(benchmark_from).drop(columns="not.fully.paid", errors="ignore")
+        records = loans.to_dict("records")
+        frames = [loans.iloc[[i]] for i in range(min(len(loans), 200))]
+        for name, score, calls, sample in [
+            ("sklearn pipeline", pipeline.predict_proba, 200, frames),
+            ("compiled scorer", scorer.score_one, 100_000, records),
+        ]:
+            latency = latency_benchmark(score, sample, n_calls=calls)
+            print(f"{name}: p50 {latency['p50_us']:.1f}us, p99 {latency['p99_us']:.1f}us over {calls} calls")
+        return
+
+    server = make_server(scorer, host, port)
+    print(f"Scoring service listening on http://{host}:{server.server_port}/score")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
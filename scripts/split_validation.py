@@ -1,22 +1,33 @@
 # Import 
 import os
-import pandas as pd
-import pandera as pa
 import click
-import math
-from sklearn.model_selection import train_test_split
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.data_validation import validate
-from src.write_csv import write_csv
+from src.instrumentation import instrument
 
 @click.command()
 @click.option('--data_from', type=str, help="Path to raw data")
 @click.option('--data_to', type=str, help="Path to directory where processed data will be written to")
-def main(data_from, data_to):
+@click.option('--chunksize', type=int, default=None,
+              help="Validate and split the raw data in chunks of this many rows, without loading it whole")
+@instrument(name="split_validation", report=True)
+def main(data_from, data_to, chunksize):
+    from src.read_data import read_loan_data, memory_report
+    from src.data_validation import validate_csv
+    from src.stages import split, split_csv, write_tables
+
+    # Data Validation and split (streaming)
+    if chunksize is not None:
+        positions = validate_csv(data_from, chunksize=chunksize)
+        os.makedirs(data_to, exist_ok=True)
+        split_csv(data_from, data_to, positions, chunksize=chunksize)
+        print(f"Train/Test Data successfully saved to {data_to}")
+        return
+
     try:
-        p2ploan_df = pd.read_csv(data_from)
-        print(f"Data loaded successfully from {data_from}")
+        p2ploan_df = read_loan_data(data_from)
+        print(f"Data loaded successfully from {data_from} "
+              f"({memory_report(p2ploan_df).loc['total', 'bytes'] / 1e6:.1f} MB in memory)")
     except Exception as e:
         print(f"Error loading data: {e}")
         return
@@ -25,14 +36,11 @@ def main(data_from, data_to):
     if not os.path.isdir(data_to):
         os.makedirs(data_to)
 
-    # Data Validation
-    validate(p2ploan_df)
-
-    train_df, test_df = train_test_split(p2ploan_df, test_size=0.2, random_state=522)
+    # Data Validation and split
+    train_df, test_df = split(p2ploan_df)
  
     # Save train data and test data to csv
-    write_csv(train_df, data_to, "loan_train.csv", index=False)
-    write_csv(test_df, data_to, "loan_test.csv", index=False)
+    write_tables({"loan_train.csv": (train_df, False), "loan_test.csv": (test_df, False)}, data_to)
     print(f"Train/Test Data successfully saved to {data_to}")
 
 if __name__ == '__main__':
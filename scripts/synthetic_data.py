@@ -0,0 +1,32 @@
+# synthetic_data.py
+# Generates any number of synthetic loans that follow the distributions of the raw loan data.
+
+import os
+import sys
+import click
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.instrumentation import instrument
+
+
+@click.command()
+@click.option('--data_from', type=str, default="data/raw/loan_data.csv", show_default=True,
+              help="Path to the loan data the generator is fit on")
+@click.option('--data_to', type=str, required=True, help="Output file, ending in .csv or .parquet")
+@click.option('--n_rows', type=int, required=True, help="Number of loans to generate")
+@click.option('--chunksize', type=int, default=1_000_000, show_default=True,
+              help="Number of loans generated and written at a time")
+@click.option('--seed', type=int, default=0, show_default=True, help="Random seed")
+@instrument(name="synthetic_data", report=True)
+def main(data_from, data_to, n_rows, chunksize, seed):
+    '''Writes synthetic loans matching the marginals and correlations of the source data.'''
+    from src.read_data import read_data
+    from src.synthetic_data import LoanDataGenerator, write_synthetic
+
+    generator = LoanDataGenerator.fit(read_data(data_from))
+    os.makedirs(os.path.dirname(os.path.abspath(data_to)), exist_ok=True)
+    stats = write_synthetic(generator, data_to, n_rows, chunksize=chunksize, seed=seed)
+    print(f"{stats['rows']:,} synthetic loans written to {data_to} in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s)")
+
+if __name__ == '__main__':
+    main()
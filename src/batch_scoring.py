@@ -0,0 +1,161 @@
+import os
+import time
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.read_data import iter_chunks
+
+# Pipeline loaded once per worker process by `_init_worker`
+_worker_pipeline = None
+
+
+def score_chunk(pipeline, chunk, keep_columns=()):
+    """
+    Score one chunk of loans with a fitted classification pipeline.
+
+    The label is taken from the predicted probabilities rather than a second
+    `predict` call, so the chunk only goes through the preprocessing once.
+
+    Parameters
+    ----------
+    pipeline : fitted sklearn estimator
+        Pipeline (or search) with `predict_proba` and `classes_`.
+    chunk : pandas.DataFrame
+        Raw loan features.
+    keep_columns : sequence of str, optional
+        Input columns (e.g. a loan id) copied into the output.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The kept columns, then `probability` (of the positive class,
+        i.e. not fully paid) and `prediction`.
+    """
+    # predict_proba rejects empty input; an empty chunk still gets the output columns
+    proba = pipeline.predict_proba(chunk) if len(chunk) else np.empty((0, len(pipeline.classes_)))
+    scored = chunk[list(keep_columns)].reset_index(drop=True)
+    scored["probability"] = proba[:, 1]
+    scored["prediction"] = np.asarray(pipeline.classes_).take(proba.argmax(axis=1))
+    return scored
+
+
+def _init_worker(pipeline_from):
+    global _worker_pipeline
+    with open(pipeline_from, "rb") as f:
+        _worker_pipeline = pickle.load(f)
+
+
+def _score_in_worker(chunk, keep_columns):
+    return score_chunk(_worker_pipeline, chunk, keep_columns)
+
+
+class _ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file under a temporary name."""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.tmp_path = f"{filepath}.{os.getpid()}.tmp"
+        self.parquet = filepath.endswith(".parquet")
+        self._writer = None
+        self._header = True
+
+    def write(self, scored):
+        if self.parquet:
+            table = pa.Table.from_pandas(scored, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.tmp_path, table.schema)
+            elif not table.schema.equals(self._writer.schema):
+                # read_csv infers dtypes per chunk, e.g. an integer column with a blank reads as float;
+                # Arrow integers hold nulls, so the chunk is cast back to the file's schema
+                table = table.cast(self._writer.schema)
+            self._writer.write_table(table)
+        else:
+            scored.to_csv(self.tmp_path, mode="w" if self._header else "a", header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self.tmp_path):
+            os.replace(self.tmp_path, self.filepath)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def _scored_chunks(pipeline_from, chunks, keep_columns, n_jobs):
+    """Yield scored chunks in input order, with at most 2 * n_jobs chunks in flight."""
+    if n_jobs == 1:
+        with open(pipeline_from, "rb") as f:
+            pipeline = pickle.load(f)
+        for chunk in chunks:
+            yield score_chunk(pipeline, chunk, keep_columns)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(pipeline_from,)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_score_in_worker, chunk, keep_columns))
+            if len(pending) >= 2 * n_jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def score_file(pipeline_from, data_from, data_to, chunksize=100_000, n_jobs=1, keep_columns=()):
+    """
+    Score an arbitrarily large loan file with the tuned pipeline in bounded memory.
+
+    The pipeline is unpickled once (once per worker when `n_jobs > 1`), the
+    input is streamed in chunks, and the scored chunks are appended to the
+    output in input order as they complete. Memory stays bounded by a few
+    chunks regardless of the input size. The output is written under a
+    temporary name and renamed when complete, so a failed run never leaves
+    a partial file behind. An input without rows gives an output with the
+    columns only.
+
+    Parameters
+    ----------
+    pipeline_from : str
+        Path to the pickled pipeline, e.g. `results/models/pipeline.pickle`.
+    data_from : str
+        Input `.csv` or `.parquet` file with the raw loan features.
+    data_to : str
+        Output `.csv` or `.parquet` file.
+    chunksize : int, optional
+        Rows per chunk. Default is 100,000.
+    n_jobs : int, optional
+        Number of worker processes scoring chunks in parallel. Default is 1
+        (score in the calling process).
+    keep_columns : sequence of str, optional
+        Input columns copied into the output next to the scores.
+
+    Returns
+    -------
+    dict
+        Number of `rows` scored, elapsed `seconds` and `rows_per_second`.
+    """
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+
+    start = time.perf_counter()
+    rows = 0
+    writer = _ChunkWriter(data_to)
+    try:
+        for scored in _scored_chunks(pipeline_from, iter_chunks(data_from, chunksize), tuple(keep_columns), n_jobs):
+            writer.write(scored)
+            rows += len(scored)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+    seconds = time.perf_counter() - start
+    return {"rows": rows, "seconds": seconds, "rows_per_second": rows / seconds if seconds > 0 else float("inf")}
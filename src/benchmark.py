@@ -0,0 +1,375 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import contextlib
+import functools
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.linear_model import LogisticRegression
+from src.read_data import read_data
+from src.data_validation import validate, compact_dtypes
+from src.data_cleaning import handle_missing_values, add_loan_categories, add_risk_categories, add_loan_income_ratio, \
+    LoanFeatureEngineer
+from src.model_cv import model_cross_val
+from src.write_csv import write_csv
+from src.synthetic_data import LoanDataGenerator, write_synthetic
+
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+FUNCTIONS = ["validate", "handle_missing_values", "add_loan_categories", "add_risk_categories",
+             "add_loan_income_ratio", "LoanFeatureEngineer", "model_cross_val", "write_csv"]
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+
+Stage = namedtuple("Stage", ["name", "depends_on", "outputs", "args"])
+
+# Pipeline stages in Makefile order; paths are relative to a benchmark workspace
+STAGES = [
+    Stage("split_validation", [],
+          ["{processed}/loan_train.csv", "{processed}/loan_test.csv"],
+          ["--data_from={raw}/loan_data.csv", "--data_to={processed}"]),
+    Stage("eda", ["split_validation"],
+          ["{results}/tables/info.csv", "{results}/figures/histograms_grid.png"],
+          ["--input_csv={processed}/loan_train.csv", "--output_dir={results}"]),
+    Stage("preprocessing", ["split_validation"],
+          ["{results}/models/preprocessor.pickle", "{processed}/scaled_loan_train.csv"],
+          ["--data_from={processed}", "--data_to={processed}", "--preprocessor_to={results}/models"]),
+    Stage("model_training", ["split_validation", "preprocessing"],
+          ["{results}/tables/cv_results.csv"],
+          ["--data_from={processed}", "--data_to={results}/tables",
+           "--preprocessor_from={results}/models/preprocessor.pickle"]),
+    Stage("model_tuning", ["split_validation", "preprocessing"],
+          ["{results}/models/pipeline.pickle", "{results}/tables/model_results.csv"],
+          ["--data_from={processed}", "--data_to={results}/tables",
+           "--preprocessor_from={results}/models/preprocessor.pickle", "--pipeline_to={results}/models"]),
+    Stage("model_evaluation", ["split_validation", "preprocessing", "model_tuning"],
+          ["{results}/tables/test_results.csv"],
+          ["--data_from={processed}", "--data_to={results}/tables",
+           "--pipeline_from={results}/models/pipeline.pickle"]),
+]
+
+
+@functools.lru_cache(maxsize=4)
+def _generator(source):
+    return LoanDataGenerator.fit(read_data(source))
+
+
+def synthetic_loans(n_rows, source="data/raw/loan_data.csv", seed=0):
+    """
+    Generate a loan data set of any size that follows a real one.
+
+    Uses a `LoanDataGenerator` fit on `source` (once per source), so the
+    result keeps the source's column distributions and correlations, which
+    is what matters for timing, and passes `validate`.
+
+    Parameters:
+    -----------
+    n_rows : int
+        Number of rows to generate.
+    source : str, optional
+        CSV file the generator is fit on. Default is the raw loan data.
+    seed : int, optional
+        Random seed. Default is 0.
+
+    Returns:
+    --------
+    pd.DataFrame
+        The synthetic loans with the source's columns and `read_csv` dtypes.
+    """
+    return _generator(source).sample(n_rows, seed=seed)
+
+
+def _function_cases(data, workdir, preprocessor_path):
+    """Benchmarked function -> setup returning fresh call arguments (setup time is not measured)."""
+    def with_income():
+        df = data.copy()
+        df["annual.inc"] = np.exp(df["log.annual.inc"])
+        return (df,), {"installment_column": "installment", "income_column": "annual.inc"}
+
+    numeric = data.select_dtypes("number").columns
+    X, y = data.drop(columns="not.fully.paid"), data["not.fully.paid"]
+    return {
+        "validate": (validate, lambda: ((data,), {})),
+        "handle_missing_values": (handle_missing_values,
+                                  lambda: ((data.copy(),), {"strategy": "median", "columns": numeric})),
+        "add_loan_categories": (add_loan_categories, lambda: ((data.copy(),), {"fico_column": "fico"})),
+        "add_risk_categories": (add_risk_categories, lambda: ((data.copy(),), {"fico_column": "fico"})),
+        "add_loan_income_ratio": (add_loan_income_ratio, with_income),
+        "LoanFeatureEngineer": (LoanFeatureEngineer().fit_transform, lambda: ((data,), {})),
+        "model_cross_val": (model_cross_val,
+                            lambda: ((LogisticRegression(random_state=123), preprocessor_path, X, y), {})),
+        "write_csv": (write_csv, lambda: ((data, workdir, "benchmark.csv"), {})),
+    }
+
+
+def _measure(func, setup, repeat):
+    """Best-of-`repeat` wall time, then one traced call for the peak of new allocations."""
+    seconds = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            args, kwargs = setup()
+            start = time.perf_counter()
+            func(*args, **kwargs)
+            seconds.append(time.perf_counter() - start)
+        args, kwargs = setup()
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return min(seconds), peak / 2**20
+
+
+def _record(name, kind, n_rows, status, seconds=None, peak_memory_mb=None):
+    return {"name": name, "kind": kind, "n_rows": n_rows, "status": status,
+            "seconds": seconds,
+            "rows_per_second": n_rows / seconds if seconds else None,
+            "peak_memory_mb": peak_memory_mb}
+
+
+def _over_budget(previous, n_rows, budget):
+    """Whether a case, extrapolated linearly from its last measured size, would exceed `budget` seconds."""
+    if budget is None or previous is None:
+        return False
+    if previous["status"] != "ok":
+        return True
+    return previous["seconds"] * n_rows / previous["n_rows"] > budget
+
+
+def run_function_benchmarks(sizes=SIZES, names=None, repeat=3, budget=None,
+                            preprocessor_path="results/models/preprocessor.pickle", seed=0):
+    """
+    Benchmark the src/ functions on synthetic data of increasing size.
+
+    Each function gets the compact-dtype frame the scripts load, fresh for
+    every call when the function modifies its input. Wall time is the best
+    of `repeat` calls; peak memory is the peak of the allocations made during
+    one extra call, traced with `tracemalloc` (the input frame is excluded).
+
+    Parameters:
+    -----------
+    sizes : list of int, optional
+        Row counts to benchmark, in increasing order. Default is 10k to 10M.
+    names : list of str, optional
+        Functions to benchmark, from `FUNCTIONS`. Default is all of them.
+    repeat : int, optional
+        Timed calls per case. Default is 3.
+    budget : float, optional
+        Skip a size when the previous size's time, scaled linearly by the
+        number of rows, exceeds this many seconds. Default runs every size.
+    preprocessor_path : str, optional
+        Preprocessor pickle passed to `model_cross_val`.
+    seed : int, optional
+        Random seed of the synthetic data. Default is 0.
+
+    Returns:
+    --------
+    list of dict
+        One record per (function, size) with `status` ("ok" or "skipped"),
+        `seconds`, `rows_per_second` and `peak_memory_mb`.
+    """
+    results = []
+    previous = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_rows in sizes:
+            run = [name for name in names or FUNCTIONS if not _over_budget(previous.get(name), n_rows, budget)]
+            if run:
+                data = synthetic_loans(n_rows, seed=seed)
+                data = data.astype(compact_dtypes(data))
+                cases = _function_cases(data, workdir, preprocessor_path)
+            for name in names or FUNCTIONS:
+                if name in run:
+                    record = _record(name, "function", n_rows, "ok", *_measure(*cases[name], repeat))
+                else:
+                    record = _record(name, "function", n_rows, "skipped")
+                previous[name] = record
+                results.append(record)
+            if run:
+                del data, cases
+    return results
+
+
+def _peak_rss_mb(pid):
+    """High-water resident set size of a running process in MB, from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    return None
+
+
+def _run_stage(argv, outputs, log_path, timeout=None, poll_interval=0.05):
+    """
+    Run a stage script; return its status, wall time and peak resident memory in MB.
+
+    The peak is the process's own high-water mark, sampled every
+    `poll_interval` seconds (`ru_maxrss` of a child also counts the memory
+    of the benchmark process it was forked from). It is None where /proc is
+    not available. The scripts report some errors and exit normally, so a
+    stage only counts as successful if it also wrote all of its `outputs`.
+    """
+    started = time.time()
+    peak = None
+    timed_out = False
+    with open(log_path, "w") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(argv, stdout=log, stderr=subprocess.STDOUT)
+        while proc.poll() is None:
+            sample = _peak_rss_mb(proc.pid)
+            if sample is not None:
+                peak = sample
+            if timeout is not None and time.perf_counter() - start > timeout:
+                timed_out = True
+                proc.kill()
+                proc.wait()
+                break
+            time.sleep(poll_interval)
+        seconds = time.perf_counter() - start
+    wrote_outputs = all(os.path.exists(path) and os.path.getmtime(path) >= started - 1 for path in outputs)
+    status = "timeout" if timed_out else "ok" if proc.returncode == 0 and wrote_outputs else "failed"
+    return status, seconds, peak
+
+
+def run_stage_benchmarks(sizes=SIZES, stages=None, budget=None, timeout=None, seed=0, workdir=None,
+                         source="data/raw/loan_data.csv"):
+    """
+    Benchmark the scripts/ pipeline stages end to end on synthetic data.
+
+    For every size, a synthetic raw data file is streamed to a fresh workspace
+    and the stages run in Makefile order as subprocesses, each reading the
+    outputs of the stages it depends on. A stage is skipped when a stage it
+    depends on did not succeed. Peak memory is the stage process's maximum
+    resident set size.
+
+    Parameters:
+    -----------
+    sizes : list of int, optional
+        Row counts to benchmark, in increasing order. Default is 10k to 10M.
+    stages : list of str, optional
+        Stages to run, a subset of `STAGES` names. A stage reading the
+        outputs of a stage left out must find them in the workspace (see
+        `workdir`). Default runs all stages.
+    budget : float, optional
+        Skip a size when the previous size's time, scaled linearly by the
+        number of rows, exceeds this many seconds.
+    timeout : float, optional
+        Kill a stage after this many seconds.
+    seed : int, optional
+        Random seed of the synthetic data. Default is 0.
+    source : str, optional
+        CSV file the synthetic data generator is fit on. Default is the raw loan data.
+    workdir : str, optional
+        Directory for the workspaces (`<workdir>/rows_<n_rows>`), kept after
+        the run for inspection or reuse. Default uses a temporary directory
+        that is removed afterwards.
+
+    Returns:
+    --------
+    list of dict
+        One record per (stage, size) with `status` ("ok", "failed",
+        "timeout" or "skipped"), `seconds`, `rows_per_second` and
+        `peak_memory_mb`. A stage that did not succeed has its log at
+        `<workspace>/<stage>.log`.
+    """
+    selected = [stage for stage in STAGES if stages is None or stage.name in stages]
+    results = []
+    previous = {}
+    with contextlib.ExitStack() as stack:
+        root = workdir or stack.enter_context(tempfile.TemporaryDirectory())
+        for n_rows in sizes:
+            workspace = os.path.join(root, f"rows_{n_rows}")
+            paths = {key: os.path.join(workspace, key) for key in ("raw", "processed", "results")}
+            status = {}
+            for name, depends_on, outputs, args in selected:
+                # A dependency left out of `stages` is expected to have its outputs in the workspace already
+                upstream_ok = all(status.get(dependency, "ok") == "ok" for dependency in depends_on)
+                if not upstream_ok or _over_budget(previous.get(name), n_rows, budget):
+                    record = _record(name, "stage", n_rows, "skipped")
+                else:
+                    if not os.path.exists(os.path.join(paths["raw"], "loan_data.csv")):
+                        for sub in ("raw", "processed", "results/tables", "results/figures", "results/models"):
+                            os.makedirs(os.path.join(workspace, sub), exist_ok=True)
+                        write_synthetic(_generator(source), os.path.join(paths["raw"], "loan_data.csv"), n_rows, seed=seed)
+                    argv = [sys.executable, os.path.join(SCRIPTS_DIR, f"{name}.py"),
+                            *(arg.format(**paths) for arg in args)]
+                    outcome, seconds, peak = _run_stage(argv, [path.format(**paths) for path in outputs],
+                                                        os.path.join(workspace, f"{name}.log"), timeout)
+                    record = (_record(name, "stage", n_rows, outcome, seconds, peak) if outcome == "ok"
+                              else _record(name, "stage", n_rows, outcome))
+                status[name] = record["status"]
+                previous[name] = record
+                results.append(record)
+            if workdir is None:
+                shutil.rmtree(workspace, ignore_errors=True)
+    return results
+
+
+def environment():
+    """Describe the machine and library versions the benchmarks ran with."""
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "scikit-learn": sklearn.__version__}
+
+
+def save_results(results, path):
+    """Save benchmark records with the environment description as JSON."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+
+def load_results(path):
+    """Load benchmark records saved by `save_results`."""
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare_results(results, baseline, tolerance=0.25):
+    """
+    Compare benchmark records against a baseline run.
+
+    Parameters:
+    -----------
+    results : list of dict
+        Current records.
+    baseline : list of dict
+        Baseline records, e.g. from `load_results`.
+    tolerance : float, optional
+        Relative slowdown or memory growth tolerated before a case counts as
+        a regression. Default is 0.25 (25%).
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per (name, n_rows) measured in both runs, with the current
+        and baseline `seconds` and `peak_memory_mb`, their ratios
+        (current / baseline) and a boolean `regression` column.
+    """
+    columns = ["name", "kind", "n_rows", "seconds", "peak_memory_mb"]
+    current = pd.DataFrame(results, columns=[*columns, "status"])
+    previous = pd.DataFrame(baseline, columns=[*columns, "status"])
+    current = current[current["status"] == "ok"][columns]
+    previous = previous[previous["status"] == "ok"][columns]
+    comparison = current.merge(previous, on=["name", "kind", "n_rows"], suffixes=("", "_baseline"))
+    comparison["time_ratio"] = comparison["seconds"] / comparison["seconds_baseline"]
+    comparison["memory_ratio"] = comparison["peak_memory_mb"] / comparison["peak_memory_mb_baseline"]
+    comparison["regression"] = (comparison["time_ratio"] > 1 + tolerance) | \
+                               (comparison["memory_ratio"] > 1 + tolerance)
+    return comparison
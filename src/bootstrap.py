@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+# Metrics reported by `bootstrap_metrics`, in order
+METRICS = ["accuracy", "roc_auc", "pr_auc", "recall", "tp", "fp", "fn", "tn"]
+
+
+def _weighted_metrics(weights, cells, order, starts, y_sorted):
+    """
+    Compute every metric for each row of bootstrap weights at once.
+
+    `weights` is a (replicates, loans) matrix of how often each loan is
+    drawn, so a replicate's counts are weighted sums and the whole block is
+    a few matrix products plus one pass over the score-sorted loans.
+    """
+    tn, fp, fn, tp = (weights @ cells).T
+    n_pos, n_neg = tp + fn, tn + fp
+
+    # Weights of positives and negatives at each distinct score, highest score first
+    sorted_weights = weights[:, order]
+    pos = np.add.reduceat(sorted_weights * y_sorted, starts, axis=1)
+    neg = np.add.reduceat(sorted_weights * (1 - y_sorted), starts, axis=1)
+    tps, fps = np.cumsum(pos, axis=1), np.cumsum(neg, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roc_auc = np.sum(neg * (tps - pos / 2), axis=1) / (n_pos * n_neg)
+        pr_auc = np.sum(pos * np.nan_to_num(tps / (tps + fps)), axis=1) / n_pos
+        recall = tp / n_pos
+    both = (n_pos > 0) & (n_neg > 0)
+    roc_auc[~both], pr_auc[~both] = np.nan, np.nan
+    return np.column_stack([(tp + tn) / weights.sum(axis=1), roc_auc, pr_auc, recall, tp, fp, fn, tn])
+
+
+def _bootstrap_block(seed, n_replicates, cells, order, starts, y_sorted):
+    """Draw `n_replicates` resamples and compute their metrics."""
+    n = len(cells)
+    rng = np.random.default_rng(seed)
+    # Row r of the index matrix is one resample; bincount turns it into per-loan weights
+    indices = rng.integers(0, n, size=(n_replicates, n)) + np.arange(n_replicates)[:, None] * n
+    weights = np.bincount(indices.ravel(), minlength=n_replicates * n).reshape(n_replicates, n).astype(float)
+    return _weighted_metrics(weights, cells, order, starts, y_sorted)
+
+
+def bootstrap_metrics(y_true, y_prob, n_replicates=10_000, confidence=0.95, threshold=0.5,
+                      block_size=None, n_jobs=-1, random_state=123):
+    """
+    Compute bootstrap percentile confidence intervals of test-set metrics.
+
+    The stored predictions are resampled with replacement `n_replicates`
+    times. Each resample is a vector of draw counts per loan, and the
+    metrics of a block of resamples are computed together from a weight
+    matrix, without copying the predictions. The blocks run in parallel
+    and are seeded from `random_state` alone, so the intervals do not
+    depend on `n_jobs`.
+
+    Parameters
+    ----------
+    y_true : array-like
+        True labels, 1 for a default and 0 otherwise.
+    y_prob : array-like
+        Predicted probabilities of a default.
+    n_replicates : int, optional
+        Number of bootstrap resamples. Default is 10,000.
+    confidence : float, optional
+        Coverage of the intervals. Default is 0.95.
+    threshold : float, optional
+        A loan is predicted to default when its probability is above this.
+        Default is 0.5.
+    block_size : int, optional
+        Resamples per parallel task. Default keeps each block's weight
+        matrix at about 2 million entries.
+    n_jobs : int, optional
+        Number of worker processes, as in joblib (-1 uses all cores).
+        Default is -1.
+    random_state : int, optional
+        Seed of the resampling. Default is 123.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per metric (`accuracy`, `roc_auc`, `pr_auc`, `recall` of
+        defaulters and the confusion-matrix cells `tp`, `fp`, `fn`, `tn`)
+        with the `estimate` on the test set and the `lower` and `upper`
+        percentile bounds.
+
+    Raises
+    ------
+    ValueError
+        If there are no predictions, the lengths differ or `confidence` is
+        not between 0 and 1.
+    """
+    y_true = np.asarray(y_true).astype(float)
+    y_prob = np.asarray(y_prob, dtype=float)
+    if len(y_true) == 0 or len(y_true) != len(y_prob):
+        raise ValueError("y_true and y_prob must be non-empty and have the same length.")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1.")
+
+    n = len(y_true)
+    predicted = (y_prob > threshold).astype(float)
+    # One-hot confusion-matrix cell of each loan: tn, fp, fn, tp
+    cells = np.eye(4)[(2 * y_true + predicted).astype(int)]
+    order = np.argsort(-y_prob, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(y_prob[order]) != 0])
+    y_sorted = y_true[order]
+
+    if block_size is None:
+        block_size = max(1, 2_000_000 // n)
+    sizes = [min(block_size, n_replicates - start) for start in range(0, n_replicates, block_size)]
+    seeds = np.random.SeedSequence(random_state).spawn(len(sizes))
+    replicates = np.vstack(Parallel(n_jobs=n_jobs)(
+        delayed(_bootstrap_block)(seed, size, cells, order, starts, y_sorted) for seed, size in zip(seeds, sizes)
+    ))
+
+    alpha = (1 - confidence) / 2
+    with np.errstate(invalid="ignore"):
+        lower, upper = np.nanquantile(replicates, [alpha, 1 - alpha], axis=0)
+    estimate = _weighted_metrics(np.ones((1, n)), cells, order, starts, y_sorted)[0]
+    return pd.DataFrame({"metric": METRICS, "estimate": estimate, "lower": lower, "upper": upper})
@@ -0,0 +1,199 @@
+import math
+import time
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+
+class CompiledLinearScorer:
+    """
+    Logistic regression pipeline folded into flat arrays for low-latency scoring.
+
+    Scoring one loan through the fitted `Pipeline` goes through pandas and the
+    `ColumnTransformer` machinery on every call. Because every step of the
+    tuned pipeline is affine, it can be folded into one linear function of the
+    raw features:
+    - a missing numeric value is replaced by the imputer's median,
+    - scaling `(x - mean) / scale` is folded into the coefficient
+      (`coef / scale`) and the intercept (`- coef * mean / scale`),
+    - the one-hot block for `purpose` becomes a category -> coefficient map
+      (unknown categories contribute 0, missing ones use the imputed category).
+
+    Probabilities equal the pipeline's `predict_proba` up to floating point
+    rounding (the sums are taken in a different order), and labels are the same.
+
+    Parameters
+    ----------
+    numeric_columns : list of str
+        Numeric input columns in coefficient order.
+    numeric_fill : numpy.ndarray
+        Value used for a missing numeric input.
+    numeric_coef : numpy.ndarray
+        Coefficients of the raw (unscaled) numeric inputs.
+    intercept : float
+        Intercept including the folded scaler offsets.
+    category_columns : list of str
+        Categorical input columns.
+    category_fill : list
+        Value used for a missing categorical input.
+    category_coef : list of dict
+        For each categorical column, the coefficient of each known category.
+    classes : numpy.ndarray
+        Class labels, negative class first.
+    """
+
+    def __init__(self, numeric_columns, numeric_fill, numeric_coef, intercept,
+                 category_columns, category_fill, category_coef, classes):
+        self.numeric_columns = list(numeric_columns)
+        self.numeric_fill = np.asarray(numeric_fill, dtype=float)
+        self.numeric_coef = np.asarray(numeric_coef, dtype=float)
+        self.intercept = float(intercept)
+        self.category_columns = list(category_columns)
+        self.category_fill = list(category_fill)
+        self.category_coef = [dict(coef) for coef in category_coef]
+        self.classes_ = np.asarray(classes)
+        # Plain Python tuples: per-loan scoring avoids NumPy call overhead entirely
+        self._numeric = list(zip(self.numeric_columns, self.numeric_coef.tolist(), self.numeric_fill.tolist()))
+        self._categorical = list(zip(self.category_columns, self.category_fill, self.category_coef))
+
+    @classmethod
+    def from_pipeline(cls, model):
+        """
+        Extract the scorer from a fitted search or `Pipeline`.
+
+        Parameters
+        ----------
+        model : GridSearchCV, TunedModel or Pipeline
+            Fitted pipeline with a `preprocessor` ColumnTransformer of
+            [SimpleImputer ->] StandardScaler and [SimpleImputer ->] OneHotEncoder
+            blocks, followed by a binary `LogReg` LogisticRegression.
+
+        Returns
+        -------
+        CompiledLinearScorer
+
+        Raises
+        ------
+        ValueError
+            If the pipeline contains a step that cannot be folded.
+        """
+        pipeline = getattr(model, "best_estimator_", model)
+        preprocessor = pipeline.named_steps["preprocessor"]
+        log_reg = pipeline.named_steps["LogReg"]
+        if log_reg.coef_.shape[0] != 1:
+            raise ValueError("Only binary logistic regression can be compiled.")
+        coef = log_reg.coef_[0]
+        intercept = float(log_reg.intercept_[0])
+
+        numeric_columns, numeric_fill, numeric_coef = [], [], []
+        category_columns, category_fill, category_coef = [], [], []
+        offset = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == "drop" or name == "remainder":
+                continue
+            steps = transformer.steps if isinstance(transformer, Pipeline) else [(name, transformer)]
+            imputer = next((step for _, step in steps if isinstance(step, SimpleImputer)), None)
+            encoder = next((step for _, step in steps if isinstance(step, OneHotEncoder)), None)
+            scaler = next((step for _, step in steps if isinstance(step, StandardScaler)), None)
+            if len(steps) != sum(step is not None for step in (imputer, encoder, scaler)) or \
+                    (imputer is not None and imputer.add_indicator):
+                raise ValueError(f"Cannot compile the '{name}' transformer: {transformer}")
+
+            if encoder is not None:
+                for i, column in enumerate(columns):
+                    categories = list(encoder.categories_[i])
+                    category_columns.append(column)
+                    category_fill.append(imputer.statistics_[i] if imputer is not None else None)
+                    category_coef.append(dict(zip(categories, coef[offset:offset + len(categories)].tolist())))
+                    offset += len(categories)
+            else:
+                width = len(columns)
+                mean = scaler.mean_ if scaler is not None and scaler.mean_ is not None else np.zeros(width)
+                scale = scaler.scale_ if scaler is not None and scaler.scale_ is not None else np.ones(width)
+                block = coef[offset:offset + width] / scale
+                intercept -= float(block @ mean)
+                numeric_columns.extend(columns)
+                numeric_fill.extend(imputer.statistics_ if imputer is not None else np.full(width, np.nan))
+                numeric_coef.extend(block)
+                offset += width
+
+        return cls(numeric_columns, numeric_fill, numeric_coef, intercept,
+                   category_columns, category_fill, category_coef, log_reg.classes_)
+
+    def decision_one(self, loan):
+        """Decision function value for one loan given as a dict of raw features."""
+        z = self.intercept
+        for column, coef, fill in self._numeric:
+            value = loan.get(column)
+            z += coef * (fill if value is None or value != value else value)
+        for column, fill, coef in self._categorical:
+            value = loan.get(column)
+            z += coef.get(fill if value is None or value != value else value, 0.0)
+        return z
+
+    def score_one(self, loan):
+        """
+        Score one loan given as a dict of raw features.
+
+        Returns
+        -------
+        tuple
+            Probability of the positive class (not fully paid) and the predicted label.
+        """
+        z = self.decision_one(loan)
+        if z >= 0:
+            probability = 1.0 / (1.0 + math.exp(-z))
+        else:
+            e = math.exp(z)
+            probability = e / (1.0 + e)
+        return probability, self.classes_[1] if z > 0 else self.classes_[0]
+
+    def decision_function(self, X):
+        """Vectorized decision function for a DataFrame of raw loan features."""
+        values = X[self.numeric_columns].to_numpy(dtype=float)
+        values = np.where(np.isnan(values), self.numeric_fill, values)
+        z = values @ self.numeric_coef + self.intercept
+        for column, fill, coef in self._categorical:
+            z += X[column].fillna(fill).map(coef).fillna(0.0).to_numpy(dtype=float)
+        return z
+
+    def predict_proba(self, X):
+        """Vectorized class probabilities, shaped like the pipeline's `predict_proba`."""
+        probability = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - probability, probability])
+
+    def predict(self, X):
+        """Vectorized predicted labels."""
+        return self.classes_.take((self.decision_function(X) > 0).astype(int))
+
+
+def latency_benchmark(score, loans, n_calls=10_000):
+    """
+    Measure the per-call latency of a single-loan scoring function.
+
+    Parameters
+    ----------
+    score : callable
+        Function scoring one loan.
+    loans : list
+        Loans to score, cycled through for `n_calls` calls.
+    n_calls : int, optional
+        Number of timed calls. Default is 10,000.
+
+    Returns
+    -------
+    dict
+        Latency percentiles `p50_us` and `p99_us` and the `mean_us`, in microseconds.
+    """
+    latencies = np.empty(n_calls)
+    for i in range(n_calls):
+        loan = loans[i % len(loans)]
+        start = time.perf_counter()
+        score(loan)
+        latencies[i] = time.perf_counter() - start
+    latencies *= 1e6
+    return {"p50_us": float(np.percentile(latencies, 50)),
+            "p99_us": float(np.percentile(latencies, 99)),
+            "mean_us": float(latencies.mean())}
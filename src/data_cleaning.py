@@ -1,33 +1,115 @@
 import pandas as pd
 import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from src.instrumentation import instrument
 
 # Handle Missing Values
 
+class MissingValueImputer(TransformerMixin, BaseEstimator):
+    """
+    Fill (or drop) missing values with statistics learned at fit time.
+
+    `fit` computes the statistic of every column in one vectorized call
+    and stores it in `statistics_`, so new batches, test data and scoring
+    inputs are imputed with the training statistics rather than their own.
+    `transform` fills every column in one `fillna` call, with the statistic
+    cast to the column's dtype (rounded for integer columns such as a
+    nullable `Int64`).
+
+    Parameters:
+    -----------
+    strategy : str, optional
+        'mean', 'median' or 'drop' (drop rows with a missing value in
+        `columns`). Default is 'mean'.
+    columns : list of str, optional
+        Columns to impute. Default is every numeric column for 'mean' and
+        'median', and every column for 'drop'.
+    copy : bool, optional
+        Return a filled copy; if False, fill the input frame in place.
+        Default is True.
+
+    Attributes:
+    -----------
+    statistics_ : pd.Series
+        Fill value of each imputed column (empty for 'drop').
+    columns_ : list of str
+        Columns imputed.
+    """
+
+    strategies = ('mean', 'median', 'drop')
+
+    def __init__(self, strategy='mean', columns=None, copy=True):
+        self.strategy = strategy
+        self.columns = columns
+        self.copy = copy
+
+    def fit(self, X, y=None):
+        if self.strategy not in self.strategies:
+            raise ValueError(f"strategy must be one of {self.strategies}, got {self.strategy!r}")
+        if self.columns is not None:
+            self.columns_ = list(self.columns)
+        elif self.strategy == 'drop':
+            self.columns_ = list(X.columns)
+        else:
+            self.columns_ = list(X.select_dtypes('number').columns)
+
+        if self.strategy == 'drop':
+            self.statistics_ = pd.Series(dtype=float)
+        else:
+            self.statistics_ = getattr(X[self.columns_], self.strategy)()
+        return self
+
+    def transform(self, X):
+        if self.strategy == 'drop':
+            return X.dropna(subset=self.columns_)
+
+        # Every numeric column is filled (nullable Int64/Float64 hold pd.NA), each with a
+        # value of its own dtype, all in one fillna call aligned on the column labels
+        fills = {col: _fill_value(self.statistics_[col], X.dtypes[col]) for col in self.columns_
+                 if pd.api.types.is_numeric_dtype(X.dtypes[col]) and not pd.isna(self.statistics_[col])}
+        if self.copy:
+            return X.fillna(fills)
+        X.fillna(fills, inplace=True)
+        return X
+
+
+def _fill_value(value, dtype):
+    """`value` as a scalar of `dtype`; integer columns get the nearest integer."""
+    if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        value = round(value)
+    return pd.Series([value]).astype(dtype).iloc[0]
+
+
+@instrument
 def handle_missing_values(df, strategy='mean', columns=None):
-    if columns is None:
-        columns = df.columns
-    
-    # Debugging: Print shape before and after dropping NaN values
-    print("Before dropna:", df.shape)
-    
-    if strategy == 'drop':
-        df = df.dropna(subset=columns)
-    
-    print("After dropna:", df.shape)
-    
-    # Other strategies: mean, median
-    if strategy == 'mean':
-        for col in columns:
-            df[col] = df[col].fillna(df[col].mean())
-    elif strategy == 'median':
-        for col in columns:
-            df[col] = df[col].fillna(df[col].median())
-    
-    return df
+    """
+    Fill or drop the missing values of a DataFrame using its own statistics.
+
+    Shorthand for `MissingValueImputer(strategy, columns, copy=False).fit_transform(df)`:
+    'mean' and 'median' fill `df` in place. Use `MissingValueImputer` to
+    reuse the statistics on other data.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Input DataFrame.
+    strategy : str, optional
+        'mean', 'median' or 'drop'. Default is 'mean'.
+    columns : list of str, optional
+        Columns to impute. Default is every numeric column ('mean',
+        'median') or every column ('drop').
+
+    Returns:
+    --------
+    pd.DataFrame
+        DataFrame without missing values in `columns`.
+    """
+    return MissingValueImputer(strategy=strategy, columns=columns, copy=False).fit_transform(df)
 
 
 
 # Add Loan Categories
+@instrument
 def add_loan_categories(df, fico_column):
     loan_categories = ['Super-prime', 'Prime', 'Near-prime', 'Subprime', 'Deep subprime']
     fico_conditions = [
@@ -43,6 +125,7 @@ def add_loan_categories(df, fico_column):
 
 
 # Add Risk Categories
+@instrument
 def add_risk_categories(df, fico_column):
     conditions = [
         (df[fico_column] >= 720),  # Low Risk
@@ -59,6 +142,7 @@ def add_risk_categories(df, fico_column):
 
 # Add Loan-to-Income Ratio
 
+@instrument
 def add_loan_income_ratio(df, installment_column, income_column):
     """
     Add loan-to-income ratio as a new column to a DataFrame.
@@ -81,3 +165,124 @@ def add_loan_income_ratio(df, installment_column, income_column):
     return df
 
 
+
+
+# Fused Feature Engineering
+
+LOAN_CATEGORIES = pd.CategoricalDtype(['Super-prime', 'Prime', 'Near-prime', 'Subprime', 'Deep subprime', 'Unknown'])
+RISK_CATEGORIES = pd.CategoricalDtype(['Low Risk', 'Medium Risk', 'High Risk', 'Unknown'])
+
+# FICO bins of both categorisations merged: bin i holds scores in [edge i-1, edge i).
+# A missing score sorts after inf, into the last bin.
+_FICO_EDGES = np.array([580, 620, 650, 660, 720, np.inf])
+_LOAN_CATEGORY_CODES = np.array([4, 3, 2, 2, 1, 0, 5], dtype=np.int8)
+_RISK_CATEGORY_CODES = np.array([2, 2, 2, 1, 1, 0, 3], dtype=np.int8)
+
+
+class LoanFeatureEngineer(TransformerMixin, BaseEstimator):
+    """
+    Add the engineered loan features in one pass, as a scikit-learn transformer.
+
+    Computes what `eda.py` used to chain together (`np.exp` of the log
+    income, `add_loan_income_ratio`, `add_loan_categories` and
+    `add_risk_categories`) without mutating the input:
+
+    - `annual.inc`: `exp(log.annual.inc)`;
+    - `loan_income_ratio`: `installment * 12 / annual.inc`;
+    - `loan_categories` and `risk_category`: FICO bins with the same cut
+      points, as `category` columns (`LOAN_CATEGORIES`, `RISK_CATEGORIES`).
+      Both come from a single `np.searchsorted` over the merged cut points;
+      a missing FICO score is 'Unknown'.
+
+    The input columns are passed through without copying (the result shares
+    their memory). The transformer is stateless, so it can sit in front of
+    the preprocessor in a `Pipeline`.
+
+    Parameters:
+    -----------
+    fico_column : str, optional
+        Column with the FICO score. Default is 'fico'.
+    installment_column : str, optional
+        Column with the monthly installment. Default is 'installment'.
+    log_income_column : str, optional
+        Column with the log annual income. Default is 'log.annual.inc'.
+    """
+
+    feature_names = ['annual.inc', 'loan_income_ratio', 'loan_categories', 'risk_category']
+
+    def __init__(self, fico_column='fico', installment_column='installment', log_income_column='log.annual.inc'):
+        self.fico_column = fico_column
+        self.installment_column = installment_column
+        self.log_income_column = log_income_column
+
+    def fit(self, X, y=None):
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        return self
+
+    def compute(self, X, out=None):
+        """
+        Compute the engineered features as NumPy arrays.
+
+        Parameters:
+        -----------
+        X : pd.DataFrame
+            Loan data with the FICO, installment and log income columns.
+        out : dict, optional
+            Preallocated arrays to write into, keyed by feature name: float64
+            for `annual.inc` and `loan_income_ratio`, int8 category codes for
+            `loan_categories` and `risk_category`, each of length `len(X)`.
+            Missing keys are allocated.
+
+        Returns:
+        --------
+        dict
+            Feature name -> array (the `out` arrays where given).
+        """
+        out = {} if out is None else dict(out)
+        n = len(X)
+        for name, dtype in zip(self.feature_names, [np.float64, np.float64, np.int8, np.int8]):
+            if name not in out:
+                out[name] = np.empty(n, dtype=dtype)
+
+        income = np.exp(X[self.log_income_column].to_numpy(dtype=np.float64), out=out['annual.inc'])
+        ratio = np.multiply(X[self.installment_column].to_numpy(dtype=np.float64), 12, out=out['loan_income_ratio'])
+        np.divide(ratio, income, out=ratio)
+
+        fico_bins = np.searchsorted(_FICO_EDGES, X[self.fico_column].to_numpy(dtype=np.float64), side='right')
+        np.take(_LOAN_CATEGORY_CODES, fico_bins, out=out['loan_categories'])
+        np.take(_RISK_CATEGORY_CODES, fico_bins, out=out['risk_category'])
+        return out
+
+    def transform(self, X, out=None):
+        """
+        Return `X` with the engineered features appended.
+
+        Parameters:
+        -----------
+        X : pd.DataFrame
+            Loan data.
+        out : dict, optional
+            Preallocated arrays, see `compute`.
+
+        Returns:
+        --------
+        pd.DataFrame
+            The columns of `X` followed by `feature_names`; existing columns
+            of those names are replaced.
+        """
+        features = self.compute(X, out=out)
+        columns = {name: X[name] for name in X.columns if name not in self.feature_names}
+        columns.update({
+            'annual.inc': features['annual.inc'],
+            'loan_income_ratio': features['loan_income_ratio'],
+            'loan_categories': pd.Categorical.from_codes(features['loan_categories'], dtype=LOAN_CATEGORIES),
+            'risk_category': pd.Categorical.from_codes(features['risk_category'], dtype=RISK_CATEGORIES),
+        })
+        # Building the frame from the columns themselves avoids consolidating (copying) them
+        return pd.DataFrame(columns, index=X.index, copy=False)
+
+    def get_feature_names_out(self, input_features=None):
+        input_features = self.feature_names_in_ if input_features is None else input_features
+        return np.asarray([name for name in input_features if name not in self.feature_names] + self.feature_names,
+                          dtype=object)
@@ -1,12 +1,180 @@
 import os
+import time
 import pandas as pd
 import pandera as pa
 import math
 import numpy as np
 from pandera import Check
 from sklearn.model_selection import train_test_split
+from src.instrumentation import instrument
 
 
+_DTYPE_FAMILIES = {
+    "int": pd.api.types.is_integer_dtype,
+    "float": pd.api.types.is_float_dtype,
+    "str": lambda dtype: isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_object_dtype(dtype)
+           or pd.api.types.is_string_dtype(dtype),
+}
+
+
+def _dtype_check(kind):
+    """Check that a column's dtype belongs to the "int", "float" or "str" family, of any width."""
+    is_kind = _DTYPE_FAMILIES[kind]
+    return pa.Check(lambda col: is_kind(col.dtype),
+                    element_wise=False,
+                    name=f"dtype_{kind}",
+                    error=f"Expected a column of {kind} dtype.")
+
+
+def build_schema(streaming=False):
+    """
+    Build the pandera schema describing a valid loan data frame.
+
+    Column types are checked by family rather than exact dtype, so both the
+    default `read_csv` frame (int64, float64, object) and the compact frame
+    from `compact_dtypes` (int8/int16/int32, float32, category) are valid.
+    Each column's family is also recorded as `metadata["kind"]`.
+
+    Parameters:
+    -----------
+    streaming : bool, optional
+        If True, leave out the checks that need the whole data set at once
+        (the per-column null proportion and the duplicate row check). The
+        chunked validator in `validate_csv` evaluates those with running
+        accumulators instead. Default is False.
+
+    Returns:
+    --------
+    pa.DataFrameSchema
+        The loan data schema.
+    """
+    check_prop = pa.Check(lambda col: col.isna().mean() <= 0.05,
+                          element_wise=False,
+                          error="Too many null values in column.")
+
+    def checks(*column_checks):
+        return list(column_checks) if streaming else [check_prop, *column_checks]
+
+    frame_checks = [pa.Check(lambda df: ~(df.isna().all(axis=1)).any(), error="Empty rows found.")]
+    if not streaming:
+        frame_checks.insert(0, pa.Check(lambda df: ~df.duplicated().any(), error="Duplicate rows found."))
+
+    def column(kind, *column_checks, nullable=True):
+        return pa.Column(checks=checks(_dtype_check(kind), *column_checks),
+                         nullable=nullable,
+                         metadata={"kind": kind})
+
+    schema = pa.DataFrameSchema(
+        {
+    "credit.policy": column("int", pa.Check.isin([0, 1])),
+    "purpose": column(
+        "str",
+        pa.Check.isin([
+            "debt_consolidation",
+            "all_other",
+            "credit_card",
+            "home_improvement",
+            "small_business",
+            "major_purchase",
+            "educational"
+        ])),
+    "int.rate": column("float", pa.Check.in_range(0, 1)),
+    "installment": column("float", pa.Check.ge(0)),
+    "log.annual.inc": column("float", pa.Check.ge(1)),
+    "dti": column("float", pa.Check.ge(0)),
+    "fico": column("int", pa.Check.in_range(300, 900)),
+    "days.with.cr.line": column("float", pa.Check.ge(0)),
+    "revol.bal": column("int", pa.Check.ge(0)),
+    "revol.util": column("float", pa.Check.ge(0)),
+    "inq.last.6mths": column("int", pa.Check.ge(0)),
+    "delinq.2yrs": column("int", pa.Check.ge(0)),
+    "pub.rec": column("int", pa.Check.ge(0)),
+    "not.fully.paid": column("int", pa.Check.isin([0, 1]), nullable=False),
+    },
+        checks = frame_checks)
+
+    return schema
+
+
+def _smallest_int(low, high):
+    """Smallest signed integer dtype holding every value in [low, high]."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def compact_dtypes(data, float32=False):
+    """
+    Derive compact dtypes for a loan data frame from the schema.
+
+    - "int" columns get the smallest signed integer dtype holding both the
+      schema's domain (e.g. int8 for the 0/1 flags, int16 for `fico`) and
+      the observed values, so out-of-domain values are kept intact for
+      validation to report. Counts bounded only from below (e.g.
+      `inq.last.6mths`) are sized by their observed range.
+    - "str" columns with an allowed set become `category`, with the allowed
+      values first and any unexpected values appended.
+    - "float" columns become float32 if `float32` is True, which changes the
+      values by up to float32 rounding; otherwise they are left as they are.
+
+    Columns that are missing, or whose current dtype does not match their
+    schema family (e.g. an "int" column read as float because of NaNs), are
+    left out so validation sees them unchanged.
+
+    Parameters:
+    -----------
+    data : pd.DataFrame
+        Loan data as read by `pandas.read_csv`.
+    float32 : bool, optional
+        Whether to downcast float columns to float32. Default is False.
+
+    Returns:
+    --------
+    dict
+        Column name -> dtype, suitable for `DataFrame.astype`.
+
+    Example:
+    --------
+    df = df.astype(compact_dtypes(df))
+    """
+    dtypes = {}
+    for name, column in build_schema(streaming=True).columns.items():
+        if name not in data.columns:
+            continue
+        kind = column.metadata["kind"]
+        values = data[name]
+        if not _DTYPE_FAMILIES[kind](values.dtype):
+            continue
+        bounds = {"low": None, "high": None}
+        for check in column.checks:
+            stats = check.statistics or {}
+            if "allowed_values" in stats:
+                bounds["allowed"] = list(stats["allowed_values"])
+            if "min_value" in stats:
+                bounds["low"] = stats["min_value"]
+            if "max_value" in stats:
+                bounds["high"] = stats["max_value"]
+
+        if kind == "int" and len(values):
+            allowed = bounds.get("allowed")
+            low = min(allowed) if allowed else bounds["low"]
+            high = max(allowed) if allowed else bounds["high"]
+            observed_low, observed_high = int(values.min()), int(values.max())
+            low = observed_low if low is None else min(low, observed_low)
+            # A domain without an upper bound says nothing about the width
+            high = observed_high if high is None else max(high, observed_high)
+            dtypes[name] = _smallest_int(low, high)
+        elif kind == "str" and "allowed" in bounds and not isinstance(values.dtype, pd.CategoricalDtype):
+            allowed = bounds["allowed"]
+            unexpected = sorted(set(values.dropna()) - set(allowed), key=str)
+            dtypes[name] = pd.CategoricalDtype(allowed + unexpected)
+        elif kind == "float" and float32:
+            dtypes[name] = np.dtype(np.float32)
+    return dtypes
+
+
+@instrument
 def validate(data):
     """
     Validate the input DataFrame to ensure data integrity and quality.
@@ -36,6 +204,12 @@ def validate(data):
         - Target distribution mismatch between training and testing sets.
         - Anomalous correlations between numeric columns.
         
+    Returns:
+    --------
+    dict
+        Wall time in seconds spent on each check: "schema",
+        "target_distribution" and "correlation".
+
     Example:
     --------
     validate(df)
@@ -47,74 +221,192 @@ def validate(data):
         raise ValueError("Input Dataframe cannot be empty.")
     
     # Data Validation
-    check_prop = pa.Check(lambda col: col.isna().mean() <= 0.05,
-                          element_wise=False,
-                          error="Too many null values in column.")
-
-    schema = pa.DataFrameSchema(
-        {
-    "credit.policy": pa.Column(int, 
-                                checks=[check_prop,
-                                        pa.Check.isin([0, 1])], 
-                                nullable=True),
-    "purpose": pa.Column(
-        str, 
-        checks=[check_prop,
-                pa.Check.isin([
-                    "debt_consolidation", 
-                    "all_other", 
-                    "credit_card", 
-                    "home_improvement", 
-                    "small_business", 
-                    "major_purchase", 
-                    "educational"
-        ])],
-        nullable=True),
-    "int.rate": pa.Column(float, checks=[check_prop,pa.Check.in_range(0, 1)], nullable=True),
-    "installment": pa.Column(float, checks=[check_prop,pa.Check.ge(0)], nullable=True),
-    "log.annual.inc": pa.Column(float, checks=[check_prop,pa.Check.ge(1)], nullable=True),
-    "dti": pa.Column(float, checks=[check_prop,pa.Check.ge(0)], nullable=True),
-    "fico": pa.Column(int, checks=[check_prop,pa.Check.in_range(300, 900)], nullable=True),
-    "days.with.cr.line": pa.Column(float, checks=[check_prop,pa.Check.ge(0)], nullable=True),
-    "revol.bal": pa.Column(int, checks=[check_prop,pa.Check.ge(0)], nullable=True),
-    "revol.util": pa.Column(float, checks=[check_prop,pa.Check.ge(0)], nullable=True),
-    "inq.last.6mths": pa.Column(int, checks=[check_prop,pa.Check.ge(0)], nullable=True),
-    "delinq.2yrs": pa.Column(int, checks=[check_prop,pa.Check.ge(0)], nullable=True),
-    "pub.rec": pa.Column(int, checks=[check_prop,pa.Check.ge(0)], nullable=True),
-    "not.fully.paid": pa.Column(int, checks=[check_prop,pa.Check.isin([0, 1])], nullable=False),
-    },
-        checks = [
-            pa.Check(lambda df: ~df.duplicated().any(), error="Duplicate rows found."),
-            pa.Check(lambda df: ~(df.isna().all(axis=1)).any(), error="Empty rows found.")
-    ])
-
+    timings = {}
+    start = time.perf_counter()
+    schema = build_schema()
     schema.validate(data, lazy=True)
+    timings["schema"] = time.perf_counter() - start
 
-
+    # Data Validation: Train/Test Target Distribution
+    start = time.perf_counter()
     train_df, test_df = train_test_split(data, test_size=0.2, random_state=522)
     train_dist = train_df["not.fully.paid"].value_counts(normalize=True)[0]
     test_dist = test_df["not.fully.paid"].value_counts(normalize=True)[0]
+    timings["target_distribution"] = time.perf_counter() - start
 
-    # Data Validation: Train/Test Target Distribution
     if math.isclose(train_dist, test_dist, abs_tol=0.05) == False:
         raise ValueError("Train/Test Target Distribution Mismatch")
     
     # Data Validation: Anomalous Correlations
+    start = time.perf_counter()
     train_corr = train_df.corr(numeric_only=True)
-    corr = train_corr.apply(pd.Series.between, axis=1, left=-0.9, right=0.9, inclusive="neither")
-    num_feats = train_corr.index.tolist()
-    corr_cols = []
-
-    for i in np.arange(len(num_feats)):
-        corr.iloc[:i+1, i] = True
-
-    for row in num_feats:
-        for col in num_feats:
-            if corr.at[col, row] == False: 
-                corr_cols.append((col, row))
-                
+    corr_cols = _anomalous_pairs(train_corr.to_numpy(), train_corr.index.tolist())
+    timings["correlation"] = time.perf_counter() - start
+
     if corr_cols:
         raise ValueError(f"Anomalous Correlations between the following columns: \n {corr_cols}")
 
-    schema.validate(data, lazy=True)
+    return timings
+
+
+def _anomalous_pairs(corr, names):
+    """
+    List the column pairs whose correlation lies outside (-0.9, 0.9).
+
+    Only the strict upper triangle is inspected. A NaN correlation (e.g. a
+    constant column) counts as anomalous.
+    """
+    within = (corr > -0.9) & (corr < 0.9)
+    flagged = np.argwhere(np.triu(~within, k=1))
+    return [(names[j], names[i]) for i, j in flagged]
+
+
+class _CorrelationAccumulator:
+    """
+    Mergeable pairwise-complete correlation accumulator.
+
+    Keeps, for every pair of columns, the number of rows where both are
+    present together with the (shifted) first and second moments over those
+    rows. All statistics are sums, so chunks can be added in any order and
+    the result matches `DataFrame.corr()` up to floating point rounding.
+    Values are shifted by the first chunk's column means before squaring to
+    avoid catastrophic cancellation on large-valued columns like revol.bal.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        p = len(self.columns)
+        self.shift = None
+        self.n = np.zeros((p, p))
+        self.sum_x = np.zeros((p, p))
+        self.sum_xx = np.zeros((p, p))
+        self.sum_xy = np.zeros((p, p))
+
+    def update(self, chunk):
+        values = chunk[self.columns].to_numpy(dtype=float)
+        if len(values) == 0:
+            return
+        if self.shift is None:
+            self.shift = np.nan_to_num(np.nanmean(values, axis=0)) if np.isfinite(values).any() else np.zeros(values.shape[1])
+        present = ~np.isnan(values)
+        mask = present.astype(float)
+        x = np.where(present, values - self.shift, 0.0)
+        self.n += mask.T @ mask
+        # sum_x[i, j] is the sum of column i over rows where j is also present
+        self.sum_x += x.T @ mask
+        self.sum_xx += (x * x).T @ mask
+        self.sum_xy += x.T @ x
+
+    def corr(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = self.n * self.sum_xy - self.sum_x * self.sum_x.T
+            var_i = self.n * self.sum_xx - self.sum_x ** 2
+            var_j = var_i.T
+            corr = cov / np.sqrt(var_i * var_j)
+        corr[self.n < 2] = np.nan
+        return np.clip(corr, -1, 1)
+
+
+@instrument
+def validate_csv(filepath, chunksize=100_000):
+    """
+    Validate a loan data CSV file chunk by chunk.
+
+    Streaming counterpart of `validate` for files that do not fit in memory.
+    The CSV is read twice in chunks of `chunksize` rows: a cheap first pass
+    over the target column counts the rows so the train/test split of
+    `validate` (`test_size=0.2`, `random_state=522`) can be reproduced as a
+    boolean row mask, and a second pass evaluates every check with running
+    accumulators:
+    - column types, ranges, allowed categories and empty rows are checked
+      per chunk with the pandera schema,
+    - null proportions per column are accumulated as null counts,
+    - duplicate rows are detected from 64-bit row hashes,
+    - the train/test target distribution comes from running class counts,
+    - the correlation check uses a mergeable pairwise covariance.
+
+    The pass/fail verdict is the same as `validate` on the whole frame, while
+    peak memory is bounded by the chunk size plus the split positions, the
+    row mask and the row hashes (17 bytes per row).
+
+    Parameters:
+    -----------
+    filepath : str
+        Path to the CSV file. It must contain the columns listed in `validate`.
+    chunksize : int, optional
+        Number of rows read per chunk. Default is 100,000.
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        The row positions of the train and test sets, in the order the split
+        of `validate` gives them, e.g. for `stages.split_csv`.
+
+    Raises:
+    -------
+    ValueError : If the file has no rows, or if any of the following checks fail:
+        - Too many null values in any column.
+        - Duplicate rows.
+        - Target distribution mismatch between training and testing sets.
+        - Anomalous correlations between numeric columns.
+    pa.errors.SchemaErrors : If a chunk fails the column type, range, category
+        or empty row checks.
+
+    Example:
+    --------
+    validate_csv("data/raw/loan_data.csv", chunksize=500_000)
+    """
+    n_rows = sum(len(chunk) for chunk in pd.read_csv(filepath, usecols=[0], chunksize=chunksize))
+    if n_rows == 0:
+        raise ValueError("Input Dataframe cannot be empty.")
+
+    train_idx, test_idx = train_test_split(np.arange(n_rows), test_size=0.2, random_state=522)
+    is_train = np.zeros(n_rows, dtype=bool)
+    is_train[train_idx] = True
+
+    schema = build_schema(streaming=True)
+    null_counts = None
+    row_hashes = []
+    target_counts = {True: [0, 0], False: [0, 0]}  # split -> [zeros, total]
+    corr_acc = None
+    start = 0
+
+    for chunk in pd.read_csv(filepath, chunksize=chunksize):
+        schema.validate(chunk, lazy=True)
+
+        null_counts = chunk.isna().sum() if null_counts is None else null_counts + chunk.isna().sum()
+        row_hashes.append(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+
+        chunk_train = is_train[start:start + len(chunk)]
+        start += len(chunk)
+        target = chunk["not.fully.paid"].to_numpy()
+        for split in (True, False):
+            in_split = target[chunk_train == split]
+            target_counts[split][0] += int((in_split == 0).sum())
+            target_counts[split][1] += len(in_split)
+
+        train_chunk = chunk[chunk_train]
+        if corr_acc is None:
+            corr_acc = _CorrelationAccumulator(train_chunk.select_dtypes("number").columns)
+        corr_acc.update(train_chunk)
+
+    # Data Validation: Null proportions and duplicate rows
+    null_cols = null_counts.index[null_counts / n_rows > 0.05].tolist()
+    if null_cols:
+        raise ValueError(f"Too many null values in column(s): {null_cols}")
+    _, hash_counts = np.unique(np.concatenate(row_hashes), return_counts=True)
+    if (hash_counts > 1).any():
+        raise ValueError("Duplicate rows found.")
+
+    # Data Validation: Train/Test Target Distribution
+    train_dist = target_counts[True][0] / target_counts[True][1]
+    test_dist = target_counts[False][0] / target_counts[False][1]
+    if math.isclose(train_dist, test_dist, abs_tol=0.05) == False:
+        raise ValueError("Train/Test Target Distribution Mismatch")
+
+    # Data Validation: Anomalous Correlations
+    corr_cols = _anomalous_pairs(corr_acc.corr(), corr_acc.columns)
+    if corr_cols:
+        raise ValueError(f"Anomalous Correlations between the following columns: \n {corr_cols}")
 
+    return train_idx, test_idx
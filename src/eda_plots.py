@@ -0,0 +1,238 @@
+import numpy as np
+import pandas as pd
+import altair as alt
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+# Vega-Lite draws boxplot outliers as open points at 0.7 opacity, so repeated outliers
+# darken the antialiased edges of the circle; past this many copies no pixel changes
+MAX_OUTLIER_COPIES = 256
+
+
+def histogram_bins(data, features, by, bins=40):
+    """
+    Bin each feature separately for every class of `by`.
+
+    Each class gets its own `bins` equal-width bins over its range, as
+    `data.groupby(by)[feature].plot.hist(bins=bins)` would draw them, so
+    the figure only ever needs the bin counts.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Input data.
+    features : list of str
+        Numeric columns to bin.
+    by : str
+        Column holding the classes, e.g. "not.fully.paid".
+    bins : int, optional
+        Number of bins per feature and class. Default is 40.
+
+    Returns
+    -------
+    dict
+        Feature -> list of `(class, counts, edges)` tuples in class order;
+        missing values are left out.
+    """
+    classes = data[by].to_numpy()
+    labels = np.unique(classes)
+    histograms = {}
+    for feat in features:
+        values = data[feat].to_numpy(dtype=float)
+        present = ~np.isnan(values)
+        histograms[feat] = []
+        for label in labels:
+            counts, edges = np.histogram(values[present & (classes == label)], bins=bins)
+            histograms[feat].append((label, counts, edges))
+    return histograms
+
+
+def plot_histogram_grid(histograms, filepath, n_cols=3):
+    """
+    Draw pre-binned histograms in a grid, one panel per feature, and save it.
+
+    Parameters
+    ----------
+    histograms : dict
+        Output of `histogram_bins`.
+    filepath : str
+        Path of the PNG.
+    n_cols : int, optional
+        Number of panels per row. Default is 3.
+    """
+    n_rows = -(-len(histograms) // n_cols)
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(15, 5 * n_rows))
+    axes = axes.flatten()
+
+    for ax, (feat, classes) in zip(axes, histograms.items()):
+        for label, counts, edges in classes:
+            # One weighted value per bin redraws the bins exactly
+            ax.hist(edges[:-1], bins=edges, weights=counts, density=True, alpha=0.4, label=label)
+        ax.legend()
+        ax.set_title(feat)
+        ax.set_ylabel("Frequency")
+        ax.set_xlabel(feat)
+
+    # Hide any unused subplots if the grid is larger than the number of features
+    for ax in axes[len(histograms):]:
+        ax.axis('off')
+
+    plt.tight_layout()
+    plt.savefig(filepath)
+    plt.close(fig)
+
+
+def count_table(data, by):
+    """
+    Count the rows of each combination of the `by` columns.
+
+    Replaces `count()` encodings: the chart gets one row per combination
+    instead of every loan.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Input data.
+    by : str or list of str
+        Columns to count by.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The `by` columns and a `count` column, one row per observed
+        combination in order of first appearance.
+    """
+    return data.groupby(by, sort=False, observed=True).size().reset_index(name="count")
+
+
+def sort_by_count(counts, field, descending=False):
+    """
+    Order the values of `field` by their total count, as `sort="color"` orders
+    a `count()` chart (ties keep their order of first appearance).
+
+    Parameters
+    ----------
+    counts : pandas.DataFrame
+        Output of `count_table`.
+    field : str
+        Column whose values are ordered.
+    descending : bool, optional
+        Largest count first. Default is False.
+
+    Returns
+    -------
+    list
+        The values of `field`, for an explicit `sort` of the encoding.
+    """
+    totals = counts.groupby(field, sort=False, observed=True)["count"].sum()
+    return totals.sort_values(ascending=not descending, kind="stable").index.tolist()
+
+
+def boxplot_summary(data, value, by):
+    """
+    Compute the boxplot statistics of `value` for each group of `by`.
+
+    Matches Vega-Lite's `mark_boxplot`: linearly interpolated quartiles,
+    whiskers at the most extreme values within 1.5 IQR of the box, and
+    the values beyond the whiskers as outliers. One sort of all rows by
+    group and value gives every statistic.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Input data.
+    value : str
+        Numeric column summarised.
+    by : str
+        Grouping column.
+
+    Returns
+    -------
+    tuple of pandas.DataFrame
+        The boxes (one row per group with `lower_whisker`, `q1`, `median`,
+        `q3` and `upper_whisker`), and the outliers (`by` and `value`
+        columns in row order, each distinct outlier repeated as often as it
+        occurs, at most `MAX_OUTLIER_COPIES` times).
+    """
+    values = data[value].to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    groups, codes = np.unique(data[by].astype(str).to_numpy()[present], return_inverse=True)
+    values = values[present]
+    order = np.lexsort((values, codes))
+    sorted_values, sorted_codes = values[order], codes[order]
+
+    sizes = np.bincount(codes, minlength=len(groups))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    def quantile(p):
+        position = starts + (sizes - 1) * p
+        low = np.floor(position).astype(int)
+        high = np.minimum(low + 1, starts + sizes - 1)
+        return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+    q1, median, q3 = quantile(0.25), quantile(0.5), quantile(0.75)
+    iqr = q3 - q1
+    inside = (values >= (q1 - 1.5 * iqr)[codes]) & (values <= (q3 + 1.5 * iqr)[codes])
+    sorted_inside = inside[order]
+    boxes = pd.DataFrame({
+        by: groups,
+        "lower_whisker": np.minimum.reduceat(np.where(sorted_inside, sorted_values, np.inf), starts),
+        "q1": q1, "median": median, "q3": q3,
+        "upper_whisker": np.maximum.reduceat(np.where(sorted_inside, sorted_values, -np.inf), starts),
+    })
+
+    # Outliers keep their row order: overlapping points are blended in drawing order
+    outliers = pd.DataFrame({by: groups[codes[~inside]], value: values[~inside]})
+    outliers = outliers[outliers.groupby([by, value]).cumcount() < MAX_OUTLIER_COPIES]
+    return boxes, outliers.reset_index(drop=True)
+
+
+def boxplot_chart(boxes, outliers, value, by, x_title, y_title, domain, title=None):
+    """
+    Draw boxplots from `boxplot_summary` output.
+
+    Produces the same marks as a `mark_boxplot` chart with `value` on x,
+    `by` on y and colour, so the chart only carries one row per group plus
+    the outliers instead of every row.
+
+    Parameters
+    ----------
+    boxes, outliers : pandas.DataFrame
+        Output of `boxplot_summary`.
+    value, by : str
+        The summarised column and the grouping column.
+    x_title, y_title : str
+        Axis titles.
+    domain : list
+        Domain of the x scale.
+    title : str, optional
+        Chart title.
+
+    Returns
+    -------
+    altair.LayerChart
+    """
+    x = lambda field: alt.X(f"{field}:Q", title=x_title, scale=alt.Scale(domain=domain))
+    y = alt.Y(f"{by}:N", title=y_title)
+    color = alt.Color(f"{by}:N", legend=None)
+    box = alt.Chart(boxes).encode(y=y)
+
+    chart = alt.layer(
+        alt.Chart(outliers).mark_point().encode(x=x(value), y=y, color=color),
+        box.mark_rule(color="black").encode(x=x("lower_whisker"), x2="q1"),
+        box.mark_rule(color="black").encode(x=x("q3"), x2="upper_whisker"),
+        box.mark_bar(size=14).encode(x=x("q1"), x2="q3", color=color,
+                                     tooltip=[by, "lower_whisker", "q1", "median", "q3", "upper_whisker"]),
+        # The median tick takes the box colour when the box has no width
+        box.mark_tick(size=14, thickness=1).encode(
+            x=x("median"), color=alt.condition("datum.q1 >= datum.q3", color, alt.value("white"))),
+    ).properties(width=400, height=200)
+    return chart.properties(title=title) if title else chart
+
+
+def save_chart(chart, filepath):
+    """Save an Altair chart; a module-level function so charts can be rendered in worker processes."""
+    # A spawned worker does not inherit the parent's data transformer
+    alt.data_transformers.enable("vegafusion")
+    chart.save(filepath)
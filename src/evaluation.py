@@ -0,0 +1,256 @@
+import numpy as np
+import pandas as pd
+from src.read_data import iter_chunks
+
+
+def _merge_score_counts(scores, counts, new_scores, new_counts):
+    """Add the per-class counts of two sorted sets of distinct scores."""
+    merged, inverse = np.unique(np.concatenate([scores, new_scores]), return_inverse=True)
+    stacked = np.concatenate([counts, new_counts])
+    summed = np.column_stack([np.bincount(inverse, weights=stacked[:, c], minlength=len(merged)) for c in (0, 1)])
+    return merged, summed.astype(np.int64)
+
+
+class BinaryMetrics:
+    """
+    Mergeable accumulator of binary classification metrics.
+
+    Scored loans are added chunk by chunk with `update` (or whole
+    accumulators with `merge`), keeping only counts and sums:
+    - the confusion matrix at `threshold`, from one `np.bincount`,
+    - log-loss and Brier score sums,
+    - per-bin counts for the calibration table,
+    - the number of negatives and positives at every distinct score.
+
+    ROC-AUC, PR-AUC (average precision) and the threshold sweep all come
+    from one pass over the distinct scores in descending order, so no
+    metric needs the rows again. With the default `resolution=None` the
+    distinct scores are kept exactly and the metrics match scikit-learn's;
+    memory then grows with the number of distinct probabilities. For
+    hundreds of millions of loans pass e.g. `resolution=1_000_000`: scores
+    are counted on a fixed grid of that many bins and ties within a bin
+    count as half, so the AUCs are off by at most the share of
+    positive-negative pairs sharing a bin.
+
+    Parameters
+    ----------
+    threshold : float, optional
+        A loan is predicted to default when its probability is above this.
+        Default is 0.5, as `predict` of a logistic regression.
+    resolution : int or None, optional
+        Number of equal-width score bins, or None to keep exact scores.
+        Default is None.
+    n_calibration_bins : int, optional
+        Number of equal-width bins of the calibration table. Default is 10.
+    """
+
+    def __init__(self, threshold=0.5, resolution=None, n_calibration_bins=10):
+        self.threshold = threshold
+        self.resolution = resolution
+        self.n_calibration_bins = n_calibration_bins
+        self.n = 0
+        self.confusion = np.zeros((2, 2), dtype=np.int64)
+        self.log_loss_sum = 0.0
+        self.brier_sum = 0.0
+        self.calibration_counts = np.zeros(n_calibration_bins, dtype=np.int64)
+        self.calibration_prob_sum = np.zeros(n_calibration_bins)
+        self.calibration_positives = np.zeros(n_calibration_bins, dtype=np.int64)
+        if resolution is None:
+            self.scores, self.counts = np.empty(0), np.empty((0, 2), dtype=np.int64)
+        else:
+            self.scores, self.counts = np.arange(resolution) / resolution, np.zeros((resolution, 2), dtype=np.int64)
+
+    def update(self, y_true, y_prob):
+        """
+        Add a chunk of scored loans.
+
+        Parameters
+        ----------
+        y_true : array-like
+            True labels, 1 for a default and 0 otherwise.
+        y_prob : array-like
+            Predicted probabilities of a default.
+
+        Returns
+        -------
+        BinaryMetrics
+            self, for chaining.
+
+        Raises
+        ------
+        ValueError
+            If the labels are not 0/1, the probabilities are outside [0, 1]
+            or the lengths differ.
+        """
+        y_true = np.asarray(y_true)
+        y_prob = np.asarray(y_prob, dtype=float)
+        if len(y_true) != len(y_prob):
+            raise ValueError("y_true and y_prob must have the same length.")
+        if not np.isin(y_true, (0, 1)).all():
+            raise ValueError("y_true must only contain 0 and 1.")
+        if not ((y_prob >= 0) & (y_prob <= 1)).all():
+            raise ValueError("y_prob must be probabilities in [0, 1].")
+        y_true = y_true.astype(np.int64)
+
+        self.n += len(y_true)
+        predicted = (y_prob > self.threshold).astype(np.int64)
+        self.confusion += np.bincount(2 * y_true + predicted, minlength=4).reshape(2, 2)
+
+        eps = np.finfo(float).eps
+        clipped = np.clip(y_prob, eps, 1 - eps)
+        self.log_loss_sum -= np.sum(np.where(y_true == 1, np.log(clipped), np.log1p(-clipped)))
+        self.brier_sum += np.sum((y_prob - y_true) ** 2)
+
+        # A probability on a bin edge goes to the lower bin, as in sklearn's calibration_curve
+        edges = np.linspace(0, 1, self.n_calibration_bins + 1)
+        bins = np.searchsorted(edges[1:-1], y_prob)
+        self.calibration_counts += np.bincount(bins, minlength=self.n_calibration_bins)
+        self.calibration_prob_sum += np.bincount(bins, weights=y_prob, minlength=self.n_calibration_bins)
+        self.calibration_positives += np.bincount(bins, weights=y_true, minlength=self.n_calibration_bins).astype(np.int64)
+
+        if self.resolution is None:
+            scores, inverse = np.unique(y_prob, return_inverse=True)
+            counts = np.bincount(2 * inverse + y_true, minlength=2 * len(scores)).reshape(-1, 2)
+            self.scores, self.counts = _merge_score_counts(self.scores, self.counts, scores, counts)
+        else:
+            bins = np.minimum((y_prob * self.resolution).astype(np.int64), self.resolution - 1)
+            self.counts += np.bincount(2 * bins + y_true, minlength=2 * self.resolution).reshape(-1, 2)
+        return self
+
+    def merge(self, other):
+        """
+        Add the loans of another accumulator with the same settings.
+
+        Raises
+        ------
+        ValueError
+            If the threshold, resolution or calibration bins differ.
+        """
+        settings = lambda m: (m.threshold, m.resolution, m.n_calibration_bins)
+        if settings(self) != settings(other):
+            raise ValueError("Only accumulators with the same settings can be merged.")
+        self.n += other.n
+        self.confusion += other.confusion
+        self.log_loss_sum += other.log_loss_sum
+        self.brier_sum += other.brier_sum
+        self.calibration_counts += other.calibration_counts
+        self.calibration_prob_sum += other.calibration_prob_sum
+        self.calibration_positives += other.calibration_positives
+        if self.resolution is None:
+            self.scores, self.counts = _merge_score_counts(self.scores, self.counts, other.scores, other.counts)
+        else:
+            self.counts += other.counts
+        return self
+
+    def _sweep(self):
+        # Distinct scores from highest to lowest, with true and false positives at or above each
+        present = self.counts.sum(axis=1) > 0
+        scores, counts = self.scores[present][::-1], self.counts[present][::-1]
+        return scores, counts, np.cumsum(counts[:, 1]), np.cumsum(counts[:, 0])
+
+    def summary(self):
+        """
+        Compute the overall metrics.
+
+        Returns
+        -------
+        dict
+            `n`, `accuracy`, `roc_auc`, `pr_auc` (average precision),
+            `log_loss` and `brier_score`. The AUCs are NaN unless both
+            classes are present.
+        """
+        _, counts, tps, fps = self._sweep()
+        n_pos, n_neg = self.confusion[1].sum(), self.confusion[0].sum()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Each negative outranks the positives scored below it, and ties count as half
+            roc_auc = np.sum(counts[:, 0] * (tps - counts[:, 1] / 2)) / (n_pos * n_neg) if n_pos and n_neg else np.nan
+            pr_auc = np.sum(counts[:, 1] * tps / (tps + fps)) / n_pos if n_pos and n_neg else np.nan
+            return {
+                "n": self.n,
+                "accuracy": np.trace(self.confusion) / self.n,
+                "roc_auc": float(roc_auc),
+                "pr_auc": float(pr_auc),
+                "log_loss": self.log_loss_sum / self.n,
+                "brier_score": self.brier_sum / self.n,
+            }
+
+    def threshold_table(self):
+        """
+        Compute the confusion matrix at every distinct score.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per distinct score (per non-empty bin with a
+            `resolution`), highest first: `threshold` (loans scored at or
+            above it are predicted to default), `tp`, `fp`, `fn`, `tn`,
+            `precision`, `recall`, `fpr` and `f1`.
+        """
+        scores, _, tps, fps = self._sweep()
+        n_pos, n_neg = self.confusion[1].sum(), self.confusion[0].sum()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = tps / (tps + fps)
+            recall = tps / n_pos
+            return pd.DataFrame({
+                "threshold": scores, "tp": tps, "fp": fps, "fn": n_pos - tps, "tn": n_neg - fps,
+                "precision": precision, "recall": recall, "fpr": fps / n_neg,
+                "f1": 2 * tps / (2 * tps + fps + (n_pos - tps)),
+            })
+
+    def calibration_table(self):
+        """
+        Compute the reliability of the predicted probabilities.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per non-empty bin: `bin_lower`, `bin_upper`, `count`,
+            `mean_predicted` and `fraction_positive`, as `prob_pred` and
+            `prob_true` of sklearn's `calibration_curve` with
+            `strategy="uniform"`.
+        """
+        edges = np.linspace(0, 1, self.n_calibration_bins + 1)
+        present = self.calibration_counts > 0
+        counts = self.calibration_counts[present]
+        return pd.DataFrame({
+            "bin_lower": edges[:-1][present], "bin_upper": edges[1:][present], "count": counts,
+            "mean_predicted": self.calibration_prob_sum[present] / counts,
+            "fraction_positive": self.calibration_positives[present] / counts,
+        })
+
+
+def evaluate_file(data_from, target="not.fully.paid", probability="probability", chunksize=1_000_000, **kwargs):
+    """
+    Evaluate a file of scored loans chunk by chunk.
+
+    Parameters
+    ----------
+    data_from : str
+        Path to a `.csv` or `.parquet` file with the true labels and the
+        predicted probabilities, e.g. `batch_scoring` output with the target
+        kept.
+    target : str, optional
+        Column of true labels. Default is "not.fully.paid".
+    probability : str, optional
+        Column of predicted probabilities. Default is "probability".
+    chunksize : int, optional
+        Number of rows read at a time. Default is 1,000,000.
+    **kwargs
+        Passed to `BinaryMetrics`, e.g. `resolution`.
+
+    Returns
+    -------
+    BinaryMetrics
+        The accumulated metrics.
+
+    Raises
+    ------
+    ValueError
+        If the file has no rows.
+    """
+    metrics = BinaryMetrics(**kwargs)
+    for chunk in iter_chunks(data_from, chunksize):
+        metrics.update(chunk[target].to_numpy(), chunk[probability].to_numpy())
+    if metrics.n == 0:
+        raise ValueError("Input Dataframe cannot be empty.")
+    return metrics
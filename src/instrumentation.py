@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import time
+import functools
+import tracemalloc
+from datetime import datetime, timezone
+
+# Directory of the JSON metrics files; instrumentation is off unless it is set
+METRICS_DIR_ENV = "P2P_METRICS_DIR"
+# Set to 0 to skip memory tracing, which slows down allocation-heavy code such as to_csv
+METRICS_MEMORY_ENV = "P2P_METRICS_MEMORY"
+
+# Read once, so a disabled span costs one global lookup
+_metrics_dir = os.environ.get(METRICS_DIR_ENV) or None
+_trace_memory = os.environ.get(METRICS_MEMORY_ENV, "1") != "0"
+
+# Spans currently open in this process, outermost first
+_open_spans = []
+# Spans finished since the outermost one opened, in start order
+_finished = []
+
+
+def metrics_dir():
+    """Directory metrics files are written to, or None if instrumentation is off."""
+    return _metrics_dir
+
+
+def set_metrics_dir(directory, trace_memory=True):
+    """
+    Turn instrumentation on for this process, or off with `directory=None`.
+
+    Scripts are configured from `$P2P_METRICS_DIR` and `$P2P_METRICS_MEMORY`
+    when this module is imported; this overrides them, e.g. in tests.
+
+    Parameters
+    ----------
+    directory : str or None
+        Directory the metrics files are written to.
+    trace_memory : bool, optional
+        Record peak memory with tracemalloc. Default is True.
+    """
+    global _metrics_dir, _trace_memory
+    _metrics_dir, _trace_memory = directory, trace_memory
+
+
+def _rows(args, result):
+    """Length of the first data argument (DataFrame, Series or array), else of the result."""
+    for value in (*args, result):
+        if hasattr(value, "shape") and len(getattr(value, "shape", ())) > 0:
+            return int(value.shape[0])
+    return None
+
+
+class span:
+    """
+    Record the wall time, CPU time, peak traced memory and rows of a block.
+
+    Usable as a context manager (`with span("fit") as s: s.rows = len(X)`)
+    or through the `instrument` decorator. Spans nest: the peak memory of
+    a span includes its children's. When the outermost span with
+    `report=True` closes, every span recorded inside it is written to a
+    JSON file in `$P2P_METRICS_DIR`.
+
+    When `$P2P_METRICS_DIR` is not set, nothing is measured: entering and
+    leaving a span only checks a module flag. Peak memory comes from
+    tracemalloc, which slows down code making many small allocations;
+    with `$P2P_METRICS_MEMORY=0` it is not traced and left as None.
+
+    Parameters
+    ----------
+    name : str
+        Name of the span, e.g. "src.data_validation.validate".
+    rows : int, optional
+        Number of rows processed; can also be set on the span inside the
+        block.
+    report : bool, optional
+        Write the metrics file when this span closes. Default is False.
+    """
+
+    def __init__(self, name, rows=None, report=False):
+        self.name = name
+        self.rows = rows
+        self.report = report
+        self.enabled = False
+
+    def __enter__(self):
+        self.enabled = _metrics_dir is not None
+        if not self.enabled:
+            return self
+        self._traced = _trace_memory
+        self._started_tracing = self._traced and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        if self._traced:
+            # The running peak belongs to the spans already open; reset it so this span starts fresh
+            current, peak = tracemalloc.get_traced_memory()
+            for parent in _open_spans:
+                parent._peak = max(parent._peak, peak)
+            tracemalloc.reset_peak()
+            self._start_memory, self._peak = current, current
+
+        self._record = {"name": self.name, "depth": len(_open_spans)}
+        _finished.append(self._record)
+        _open_spans.append(self)
+        self._started_at = datetime.now(timezone.utc)
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.enabled:
+            return False
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        _open_spans.pop()
+        if self._traced:
+            _, peak = tracemalloc.get_traced_memory()
+            self._peak = max(self._peak, peak)
+            for parent in _open_spans:
+                parent._peak = max(parent._peak, self._peak)
+
+        self._record.update({
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "peak_memory_mb": (self._peak - self._start_memory) / 2 ** 20 if self._traced else None,
+            "rows": self.rows,
+            "rows_per_second": self.rows / wall if self.rows is not None and wall > 0 else None,
+            "error": exc_type.__name__ if exc_type is not None else None,
+        })
+        if self.report:
+            self._write_report()
+        if not _open_spans:
+            _finished.clear()
+            if self._started_tracing:
+                tracemalloc.stop()
+        return False
+
+    def _write_report(self):
+        spans = _finished[_finished.index(self._record):]
+        directory = _metrics_dir
+        os.makedirs(directory, exist_ok=True)
+        stamp = self._started_at.strftime("%Y%m%dT%H%M%S%f")
+        path = os.path.join(directory, f"{self.name}-{stamp}-{os.getpid()}.json")
+        with open(path, "w") as f:
+            json.dump({"name": self.name, "argv": sys.argv[1:], "started_at": self._started_at.isoformat(),
+                       "spans": spans}, f, indent=2)
+
+
+def instrument(func=None, *, name=None, report=False):
+    """
+    Decorate a function so each call is recorded as a `span`.
+
+    The span is named after the function's module and name, and its rows
+    are the length of the first DataFrame or array argument (or of the
+    returned one). Script entry points pass `report=True` so each run
+    writes a metrics file.
+
+    Parameters
+    ----------
+    func : callable
+        The function, when used as a bare `@instrument`.
+    name : str, optional
+        Name of the span. Default is "<module>.<function>".
+    report : bool, optional
+        Write the metrics file when the call returns. Default is False.
+
+    Example
+    -------
+    @instrument(name="preprocessing", report=True)
+    def main(...): ...
+    """
+    if func is None:
+        return functools.partial(instrument, name=name, report=report)
+    span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _metrics_dir is None:
+            return func(*args, **kwargs)
+        with span(span_name, report=report) as s:
+            result = func(*args, **kwargs)
+            s.rows = _rows((*args, *kwargs.values()), result)
+            return result
+
+    return wrapper
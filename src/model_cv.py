@@ -1,50 +1,157 @@
-
 import numpy as np
 import pandas as pd
 import os
-import pickle
-from sklearn.model_selection import cross_validate
+import time
+import hashlib
+from collections import namedtuple
+from joblib import Parallel, delayed
+from sklearn.base import clone, is_classifier
+from sklearn.model_selection import check_cv, cross_validate
 from sklearn.pipeline import Pipeline
+from src.preprocessing import PreprocessorArtifact, load_preprocessor
+from src.instrumentation import instrument
+
+Fold = namedtuple("Fold", ["X_fit", "y_fit", "X_val", "y_val"])
+
+
+def _take(data, indices):
+    return data.iloc[indices] if hasattr(data, "iloc") else data[indices]
+
 
-def model_cross_val(model, preprocessor, X_train, y_train):  
+def _data_key(X, y):
+    digest = hashlib.sha1()
+    for data in (X, y):
+        if isinstance(data, (pd.DataFrame, pd.Series)):
+            digest.update(pd.util.hash_pandas_object(data).to_numpy().tobytes())
+        else:
+            digest.update(np.ascontiguousarray(data).tobytes())
+    return digest.hexdigest()
+
+
+class FoldCache:
+    '''
+    Cache of preprocessed cross-validation folds shared across models.
+
+    Cross-validating several models with the same preprocessor refits the
+    identical preprocessing in every fold for every model. A `FoldCache`
+    loads each preprocessor artifact once, fits a clone of it on each
+    training fold once, and keeps the transformed training and validation
+    matrices so every candidate model is scored on the same precomputed
+    arrays. The folds are the ones `cross_validate` would use for the same
+    `cv`, so the scores are identical.
+
+    Entries are keyed on the preprocessor path and modification time (or on
+    the artifact object, for one passed in memory), a hash of the training data and the `cv`/classifier setting. The cache holds
+    `cv` transformed copies of the training data in memory.
+
+    Parameters:
+    -----------
+    cv : int or cross-validation generator, optional
+        Cross-validation splitting strategy, as in `cross_validate`. Default is 10.
+
+    Example:
+    --------
+    cache = FoldCache()
+    for model in models:
+        model_cross_val(model, 'preprocessor.pickle', X_train, y_train, fold_cache=cache)
+    '''
+
+    def __init__(self, cv=10):
+        self.cv = cv
+        self._folds = {}
+        self._artifacts = {}
+
+    def preprocessor(self, path):
+        '''The preprocessor stored at `path` (loaded once per file version by `load_preprocessor`) or in an artifact.'''
+        return load_preprocessor(path).preprocessor
+
+    def folds(self, preprocessor, X_train, y_train, classifier=True):
+        '''
+        Return the list of preprocessed `Fold`s for this data, fitting them on first use.
+        '''
+        if isinstance(preprocessor, PreprocessorArtifact):
+            # Keep the artifact alive so its id is not reused while it is cached
+            self._artifacts[id(preprocessor)] = preprocessor
+            source = (id(preprocessor),)
+        else:
+            source = (os.path.abspath(preprocessor), os.stat(preprocessor).st_mtime_ns)
+        key = (*source, _data_key(X_train, y_train), classifier)
+        if key not in self._folds:
+            transformer = self.preprocessor(preprocessor)
+            splitter = check_cv(self.cv, y_train, classifier=classifier)
+            folds = []
+            for fit_idx, val_idx in splitter.split(X_train, y_train):
+                fold_transformer = clone(transformer)
+                X_fit = fold_transformer.fit_transform(_take(X_train, fit_idx), _take(y_train, fit_idx))
+                X_val = fold_transformer.transform(_take(X_train, val_idx))
+                folds.append(Fold(X_fit, _take(y_train, fit_idx), X_val, _take(y_train, val_idx)))
+            self._folds[key] = folds
+        return self._folds[key]
+
+
+def _summarize(results):
+    '''Format each cross-validation metric as 'mean(+/-stdev)'.'''
+    mean_std = pd.DataFrame({"mean":results.mean(),
+                             "stdev":results.std()})
+
+    return {index: f"{mu:.3f}(+/-{std:.3f})" # Concat std with mean
+            for (index, mu, std) in mean_std.itertuples()}
+
+
+@instrument
+def model_cross_val(model, preprocessor, X_train, y_train, fold_cache=None):
     '''
     Perform 10-fold cross-validation on a given machine learning model using a preprocessing pipeline.
-    
-    This function loads a preprocessing pipeline from a pickle file, constructs a pipeline combining
+
+    This function loads a preprocessing pipeline artifact, constructs a pipeline combining
     it with the specified model, and evaluates the model's performance using 10-fold cross-validation
-    on the provided training data. The results are returned as a dictionary containing the mean and 
+    on the provided training data. The results are returned as a dictionary containing the mean and
     standard deviation of various cross-validation metrics.
-    
+
     Parameters:
     -----------
     model : sklearn.base.BaseEstimator
         A machine learning model that implements the fit and predict methods (e.g., classifiers, regressors).
-        
-    preprocessor : str
-        Path to the pickle file containing the preprocessing pipeline.
-        
+
+    preprocessor : str or PreprocessorArtifact
+        Path to the pickle file containing the preprocessing pipeline, or the loaded artifact.
+
     X_train : pandas.DataFrame or numpy.ndarray
         Training features, where rows represent samples and columns represent features.
-        
+
     y_train : pandas.Series or numpy.ndarray
         Target labels corresponding to the rows of `X_train`.
-    
+
+    fold_cache : FoldCache, optional
+        Cache of preprocessed folds shared between calls. When given, the
+        preprocessing is fitted once per fold and reused by every model
+        cross-validated with the same cache; `fit_time` then covers the
+        model fit only. Default is None (refit the pipeline in each fold).
+
     Returns:
     --------
     result_dict : dict
-        A dictionary where each key corresponds to a metric from the cross-validation results and each value is a string of the form 'mean(+/-stdev)', indicating the 
+        A dictionary where each key corresponds to a metric from the cross-validation results and each value is a string of the form 'mean(+/-stdev)', indicating the
         mean and standard deviation of that metric across the folds.
-        
+
     Example:
     --------
     model = DummyClassifier()
-    preprocessor = 'preprocessor.pickle'  
+    preprocessor = 'preprocessor.pickle'
     result = model_cross_val(model, preprocessor, X_train, y_train)
     print(result)
     '''
-    preprocessor = pickle.load(open(preprocessor, "rb"))
+    if fold_cache is not None:
+        results = pd.DataFrame([
+            _fit_and_score(model, fold)
+            for fold in fold_cache.folds(preprocessor, X_train, y_train, classifier=is_classifier(model))
+        ])
+        return _summarize(results)
+
+    # cross_validate fits clones, so the shared artifact is never modified
+    preprocessor = load_preprocessor(preprocessor).preprocessor
     model_pipeline = Pipeline([
-            ('preprocessor', preprocessor),  
+            ('preprocessor', preprocessor),
             ('model', model)
     ])
 
@@ -52,10 +159,102 @@ def model_cross_val(model, preprocessor, X_train, y_train):
         model_pipeline, X_train, y_train, return_train_score=True, cv=10
     ))
 
-    mean_std = pd.DataFrame({"mean":results.mean(),
-                             "stdev":results.std()})
-    
-    result_dict = {index: f"{mu:.3f}(+/-{std:.3f})" # Concat std with mean
-                   for (index, mu, std) in mean_std.itertuples()}
-    
-    return result_dict
\ No newline at end of file
+    return _summarize(results)
+
+
+def _fit_and_score(model, fold):
+    '''Fit a clone of `model` on a preprocessed fold and score it like `cross_validate`.'''
+    fold_model = clone(model)
+
+    start = time.perf_counter()
+    fold_model.fit(fold.X_fit, fold.y_fit)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    test_score = fold_model.score(fold.X_val, fold.y_val)
+    score_time = time.perf_counter() - start
+
+    return {"fit_time": fit_time,
+            "score_time": score_time,
+            "test_score": test_score,
+            "train_score": fold_model.score(fold.X_fit, fold.y_fit)}
+
+
+def _estimated_cost(model, n_samples):
+    '''
+    Rough relative cost of cross-validating `model` on one fold.
+
+    Only the ordering matters: it lets the scheduler start the slowest
+    (model, fold) tasks first so they do not end up running alone at the end.
+    '''
+    params = model.get_params()
+    if "kernel" in params:  # Kernel methods: quadratic (or worse) fit
+        return float(n_samples) ** 2
+    if "n_neighbors" in params:  # Brute-force neighbour search when scoring the training fold
+        return float(n_samples) ** 2 / 10
+    if "max_depth" in params:  # Trees: sort-based splits
+        return n_samples * np.log2(max(n_samples, 2)) * 10
+    return float(n_samples)
+
+
+@instrument
+def parallel_model_cross_val(models, preprocessor, X_train, y_train, n_jobs=-1, fold_cache=None):
+    '''
+    Cross-validate several models in parallel over (model, fold) tasks.
+
+    Every (model, fold) pair is an independent task run in a process pool.
+    The folds are preprocessed once through a `FoldCache` and shared by all
+    models, and the tasks are dispatched longest first (estimated from the
+    model family), so one slow model such as an SVC is spread over all
+    workers instead of finishing last on a single core. The scores are the
+    same as calling `model_cross_val` on each model in turn.
+
+    Parameters:
+    -----------
+    models : dict
+        Mapping of model name to an unfitted sklearn estimator.
+
+    preprocessor : str or PreprocessorArtifact
+        Path to the pickle file containing the preprocessing pipeline, or the loaded artifact.
+
+    X_train : pandas.DataFrame or numpy.ndarray
+        Training features.
+
+    y_train : pandas.Series or numpy.ndarray
+        Target labels corresponding to the rows of `X_train`.
+
+    n_jobs : int, optional
+        Number of worker processes, as in joblib (-1 uses all cores). Default is -1.
+
+    fold_cache : FoldCache, optional
+        Cache of preprocessed folds to use. Default creates a 10-fold cache.
+
+    Returns:
+    --------
+    dict
+        Mapping of model name to the result dictionary `model_cross_val` returns.
+
+    Example:
+    --------
+    results = parallel_model_cross_val({"Dummy": DummyClassifier()}, 'preprocessor.pickle', X_train, y_train, n_jobs=4)
+    '''
+    if fold_cache is None:
+        fold_cache = FoldCache()
+
+    folds = {name: fold_cache.folds(preprocessor, X_train, y_train, classifier=is_classifier(model))
+             for (name, model) in models.items()}
+    tasks = sorted(
+        ((name, i) for name in models for i in range(len(folds[name]))),
+        key=lambda task: _estimated_cost(models[task[0]], len(folds[task[0]][task[1]].y_fit)),
+        reverse=True
+    )
+
+    scores = Parallel(n_jobs=n_jobs, pre_dispatch="all")(
+        delayed(_fit_and_score)(models[name], folds[name][i]) for (name, i) in tasks
+    )
+
+    by_model = {name: [None] * len(folds[name]) for name in models}
+    for (name, i), score in zip(tasks, scores):
+        by_model[name][i] = score
+
+    return {name: _summarize(pd.DataFrame(by_model[name])) for name in models}
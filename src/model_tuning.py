@@ -0,0 +1,379 @@
+import math
+import time
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from src.model_cv import FoldCache
+from src.read_data import file_sha256, iter_chunks
+from src.preprocessing import fit_out_of_core, load_preprocessor, FeatureDigest
+
+
+class TunedModel:
+    '''
+    Result of a hyperparameter search, usable like a fitted `GridSearchCV`.
+
+    Exposes the attributes downstream code reads from a fitted search
+    (`best_estimator_`, `best_params_`, `best_score_`, `best_index_`,
+    `cv_results_`) and delegates prediction to the refitted best pipeline,
+    so it can be pickled to `pipeline.pickle` in place of a `GridSearchCV`.
+    '''
+
+    def __init__(self, best_estimator, cv_results, refit_time=None):
+        self.cv_results_ = cv_results
+        self.best_index_ = int(np.argmin(cv_results["rank_test_score"]))
+        self.best_params_ = cv_results["params"][self.best_index_]
+        self.best_score_ = cv_results["mean_test_score"][self.best_index_]
+        self.best_estimator_ = best_estimator
+        self.refit_time_ = refit_time
+
+    @property
+    def classes_(self):
+        return self.best_estimator_.classes_
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.best_estimator_.predict_proba(X)
+
+    def decision_function(self, X):
+        return self.best_estimator_.decision_function(X)
+
+    def score(self, X, y):
+        return self.best_estimator_.score(X, y)
+
+
+def _c_path_scores(fold, Cs, random_state, max_iter):
+    '''
+    Fit a warm-started logistic regression path over ascending `Cs` on one fold.
+
+    Each fit starts from the coefficients of the previous, more regularized,
+    solution, so most of the path converges in a few iterations.
+    '''
+    model = LogisticRegression(random_state=random_state, max_iter=max_iter, warm_start=True)
+    test_scores, train_scores = [], []
+    for C in Cs:
+        model.set_params(C=C).fit(fold.X_fit, fold.y_fit)
+        test_scores.append(model.score(fold.X_val, fold.y_val))
+        train_scores.append(model.score(fold.X_fit, fold.y_fit))
+    return test_scores, train_scores
+
+
+def _path_cv_results(preprocessor, X_train, y_train, Cs, cv, random_state, max_iter, n_jobs):
+    '''Cross-validate the C path and return `GridSearchCV`-style results in the order of `Cs`.'''
+    Cs = np.asarray(Cs, dtype=float)
+    order = np.argsort(Cs)
+    folds = FoldCache(cv=cv).folds(preprocessor, X_train, y_train)
+
+    paths = Parallel(n_jobs=n_jobs)(
+        delayed(_c_path_scores)(fold, Cs[order], random_state, max_iter) for fold in folds
+    )
+    test_scores = np.empty((len(folds), len(Cs)))
+    train_scores = np.empty((len(folds), len(Cs)))
+    for i, (test, train) in enumerate(paths):
+        test_scores[i, order] = test
+        train_scores[i, order] = train
+
+    results = {"param_LogReg__C": Cs, "params": [{"LogReg__C": C} for C in Cs]}
+    for i in range(len(folds)):
+        results[f"split{i}_test_score"] = test_scores[i]
+    results["mean_test_score"] = test_scores.mean(axis=0)
+    results["std_test_score"] = test_scores.std(axis=0)
+    for i in range(len(folds)):
+        results[f"split{i}_train_score"] = train_scores[i]
+    results["mean_train_score"] = train_scores.mean(axis=0)
+    results["std_train_score"] = train_scores.std(axis=0)
+    results["rank_test_score"] = _rank(results["mean_test_score"])
+    return results
+
+
+def _rank(scores):
+    '''Rank scores from best (1) down, ties sharing the smallest rank, as `GridSearchCV` does.'''
+    return (scores[None, :] > scores[:, None]).sum(axis=1).astype(np.int32) + 1
+
+
+def _refit(preprocessor, X_train, y_train, C, random_state, max_iter):
+    '''
+    Refit the best C on the whole training set, as `GridSearchCV(refit=True)` does.
+
+    When the preprocessor artifact was fitted on exactly these features, its
+    fitted state is what a refit would produce, so only the model is fitted.
+    '''
+    artifact = load_preprocessor(preprocessor)
+    model = LogisticRegression(random_state=random_state, max_iter=max_iter, C=C)
+    features = FeatureDigest()
+    features.update(X_train)
+    start = time.perf_counter()
+    if artifact.metadata.get("features_sha256") == features.hexdigest():
+        model.fit(artifact.preprocessor.transform(X_train), y_train)
+        pipeline = Pipeline(steps=[('preprocessor', artifact.preprocessor), ('LogReg', model)])
+    else:
+        pipeline = Pipeline(steps=[('preprocessor', clone(artifact.preprocessor)), ('LogReg', model)])
+        pipeline.fit(X_train, y_train)
+    return pipeline, time.perf_counter() - start
+
+
+def c_path_search(preprocessor, X_train, y_train, Cs, cv=10, random_state=123, max_iter=20000, n_jobs=-1):
+    '''
+    Tune the logistic regression C with a warm-started regularization path per fold.
+
+    Replaces `GridSearchCV` over `LogReg__C` for the preprocessor + logistic
+    regression pipeline. Each fold's preprocessing is fitted once, and the
+    whole C path is then fitted on that fold's transformed matrix in
+    ascending C order, each fit warm-started from the previous coefficients.
+    The folds run in parallel. Solutions agree with cold-start fits to the
+    solver tolerance, so the fold scores match `GridSearchCV` up to the odd
+    validation loan sitting exactly on the decision boundary.
+
+    Parameters:
+    -----------
+    preprocessor : str or PreprocessorArtifact
+        Path to the pickle file containing the preprocessing pipeline, or the loaded artifact.
+
+    X_train : pandas.DataFrame
+        Training features.
+
+    y_train : pandas.Series
+        Training labels.
+
+    Cs : array-like
+        Candidate values of the inverse regularization strength C.
+
+    cv : int, optional
+        Number of stratified folds. Default is 10.
+
+    random_state : int, optional
+        Random state of the logistic regression. Default is 123.
+
+    max_iter : int, optional
+        Maximum solver iterations per fit. Default is 20000.
+
+    n_jobs : int, optional
+        Number of folds fitted in parallel (-1 uses all cores). Default is -1.
+
+    Returns:
+    --------
+    TunedModel
+        The search result with the best pipeline refitted on all of `X_train`.
+
+    Example:
+    --------
+    search = c_path_search('preprocessor.pickle', X_train, y_train, np.logspace(-5, 5))
+    search.best_params_
+    '''
+    cv_results = _path_cv_results(preprocessor, X_train, y_train, Cs, cv, random_state, max_iter, n_jobs)
+    best_C = cv_results["param_LogReg__C"][np.argmin(cv_results["rank_test_score"])]
+    best_estimator, refit_time = _refit(preprocessor, X_train, y_train, best_C, random_state, max_iter)
+    return TunedModel(best_estimator, cv_results, refit_time)
+
+
+def halving_c_search(preprocessor, X_train, y_train, Cs, cv=10, factor=3, min_resources=None,
+                     random_state=123, max_iter=20000, n_jobs=-1):
+    '''
+    Tune the logistic regression C by successive halving over data subsamples.
+
+    The candidates are first cross-validated with `c_path_search`'s warm
+    started path on a small stratified subsample. Only the best
+    `1 / factor` of them move on to the next rung, which uses `factor` times
+    more rows. The last rung always uses the whole training set, so the
+    finalists are scored on all rows as in `c_path_search`.
+
+    Parameters:
+    -----------
+    preprocessor : str or PreprocessorArtifact
+        Path to the pickle file containing the preprocessing pipeline, or the loaded artifact.
+
+    X_train : pandas.DataFrame
+        Training features.
+
+    y_train : pandas.Series
+        Training labels.
+
+    Cs : array-like
+        Candidate values of the inverse regularization strength C.
+
+    cv : int, optional
+        Number of stratified folds per rung. Default is 10.
+
+    factor : int, optional
+        Fraction of candidates kept (1 / factor) and growth of the subsample per rung. Default is 3.
+
+    min_resources : int, optional
+        Minimum number of rows in the first rung. Default is the size that makes the
+        last rung use all rows, but at least enough rows for every fold to
+        hold two loans of the minority class.
+
+    random_state : int, optional
+        Random state of the subsampling and the logistic regression. Default is 123.
+
+    max_iter : int, optional
+        Maximum solver iterations per fit. Default is 20000.
+
+    n_jobs : int, optional
+        Number of folds fitted in parallel (-1 uses all cores). Default is -1.
+
+    Returns:
+    --------
+    TunedModel
+        The search result with the best pipeline refitted on all of `X_train`.
+        `cv_results_` holds, for each candidate, the scores of the last rung
+        it reached, with that rung in "iter" and its row count in "n_resources".
+    '''
+    Cs = np.asarray(Cs, dtype=float)
+    n_samples = len(y_train)
+    n_rungs = 1 + math.floor(math.log(len(Cs), factor))
+    if min_resources is None:
+        minority_share = pd.Series(y_train).value_counts(normalize=True).min()
+        min_resources = max(n_samples // factor ** (n_rungs - 1), math.ceil(2 * cv / minority_share))
+    n_rungs = min(n_rungs, 1 + math.floor(math.log(max(n_samples / min_resources, 1), factor)))
+
+    columns = {}
+    candidates = np.arange(len(Cs))
+    for rung in range(n_rungs):
+        n_resources = n_samples if rung == n_rungs - 1 else n_samples // factor ** (n_rungs - 1 - rung)
+        if n_resources < n_samples:
+            rows, _ = train_test_split(np.arange(n_samples), train_size=n_resources,
+                                       stratify=y_train, random_state=random_state)
+            X_rung, y_rung = X_train.iloc[rows], y_train.iloc[rows]
+        else:
+            X_rung, y_rung = X_train, y_train
+
+        results = _path_cv_results(preprocessor, X_rung, y_rung, Cs[candidates], cv, random_state, max_iter, n_jobs)
+        for key in ("mean_test_score", "std_test_score", "mean_train_score", "std_train_score"):
+            columns.setdefault(key, np.full(len(Cs), np.nan))[candidates] = results[key]
+        columns.setdefault("iter", np.zeros(len(Cs), dtype=int))[candidates] = rung
+        columns.setdefault("n_resources", np.zeros(len(Cs), dtype=int))[candidates] = n_resources
+
+        if rung < n_rungs - 1:
+            keep = math.ceil(len(candidates) / factor)
+            candidates = candidates[np.argsort(-results["mean_test_score"], kind="stable")[:keep]]
+
+    # Rank the finalists first, then the candidates dropped at each earlier rung
+    order = np.lexsort((-columns["mean_test_score"], -columns["iter"]))
+    rank = np.empty(len(Cs), dtype=np.int32)
+    rank[order] = np.arange(1, len(Cs) + 1)
+    final = columns["iter"] == n_rungs - 1
+    rank[final] = _rank(columns["mean_test_score"][final])
+
+    cv_results = {"param_LogReg__C": Cs, "params": [{"LogReg__C": C} for C in Cs], **columns,
+                  "rank_test_score": rank}
+    best_C = Cs[np.argmin(rank)]
+    best_estimator, refit_time = _refit(preprocessor, X_train, y_train, best_C, random_state, max_iter)
+    return TunedModel(best_estimator, cv_results, refit_time)
+
+
+def streaming_alpha_search(preprocessor, data_from, alphas, target="not.fully.paid", classes=(0, 1),
+                           chunksize=100_000, n_epochs=5, validation_fraction=0.1, random_state=123):
+    '''
+    Tune a logistic regression trained by SGD on a training file streamed in chunks.
+
+    Out-of-core counterpart of `c_path_search` for training sets that do not
+    fit in memory. The preprocessor artifact is used as is if it was fitted
+    on this file (same SHA-256); otherwise it is first fitted with
+    `fit_out_of_core` in one streaming pass. Then, for `n_epochs` passes
+    over the file, each chunk is transformed once and fed to one averaged
+    `SGDClassifier(loss='log_loss')` per candidate `alpha` with
+    `partial_fit`, so the whole regularization sweep shares every read and
+    every transform.
+
+    A fixed random `validation_fraction` of the rows (the same rows in every
+    epoch) is held out and never trained on. In each epoch, every model
+    scores the held-out rows of a chunk before training on the rest of it;
+    the accuracy over the last epoch is the test score of each alpha, and the
+    accuracy on the training rows just before fitting them is its train
+    score. The first epoch scores from the second chunk on, so a single
+    epoch over a file that fits in one chunk scores nothing. Memory use is
+    bounded by the chunk size, whatever the file size.
+
+    Parameters:
+    -----------
+    preprocessor : str or PreprocessorArtifact
+        Path to the pickle file containing the preprocessing pipeline, or the loaded artifact.
+
+    data_from : str
+        Path to the `.csv` or `.parquet` training file, features and target.
+
+    alphas : array-like
+        Candidate values of the SGD regularization strength alpha.
+
+    target : str, optional
+        Name of the target column. Default is "not.fully.paid".
+
+    classes : array-like, optional
+        All target classes, which `partial_fit` needs up front. Default is (0, 1).
+
+    chunksize : int, optional
+        Number of rows read and trained on at a time. Default is 100,000.
+
+    n_epochs : int, optional
+        Number of passes over the training file. Default is 5.
+
+    validation_fraction : float, optional
+        Share of the rows held out for validation. Default is 0.1.
+
+    random_state : int, optional
+        Random state of the held-out rows and the SGD shuffling. Default is 123.
+
+    Returns:
+    --------
+    TunedModel
+        The search result; `best_estimator_` is the fitted preprocessor and the
+        best model (step "LogReg"), trained on all rows but the held-out ones.
+
+    Raises:
+    -------
+    ValueError
+        If `validation_fraction` is not between 0 and 1, `n_epochs` is below
+        1, or no held-out or training rows were scored.
+
+    Example:
+    --------
+    search = streaming_alpha_search('preprocessor.pickle', 'loan_history.parquet', np.logspace(-6, -1, 6))
+    search.best_params_
+    '''
+    if not 0 < validation_fraction < 1:
+        raise ValueError(f"validation_fraction must be between 0 and 1, got {validation_fraction}")
+    if n_epochs < 1:
+        raise ValueError(f"n_epochs must be at least 1, got {n_epochs}")
+    alphas = np.asarray(alphas, dtype=float)
+    artifact = load_preprocessor(preprocessor)
+    if artifact.metadata.get("data_sha256") == file_sha256(data_from):
+        transformer = artifact.preprocessor
+    else:
+        transformer = clone(artifact.preprocessor)
+        fit_out_of_core(transformer, (chunk.drop(columns=target) for chunk in iter_chunks(data_from, chunksize)))
+
+    models = [SGDClassifier(loss="log_loss", alpha=alpha, average=True, random_state=random_state)
+              for alpha in alphas]
+    for _ in range(n_epochs):
+        # Restarting the generator each epoch holds out the same rows
+        rng = np.random.default_rng(random_state)
+        correct, scored = np.zeros((2, len(alphas))), np.zeros((2, 1))
+        for chunk in iter_chunks(data_from, chunksize):
+            held_out = rng.random(len(chunk)) < validation_fraction
+            X = transformer.transform(chunk.drop(columns=target))
+            y = chunk[target].to_numpy()
+            splits = [(X[held_out], y[held_out]), (X[~held_out], y[~held_out])]
+            # Score before training, so no row is scored by a model that has just fitted it
+            if hasattr(models[0], "coef_"):
+                for split, (X_split, y_split) in enumerate(splits):
+                    if len(y_split):
+                        scored[split] += len(y_split)
+                        correct[split] += [(model.predict(X_split) == y_split).sum() for model in models]
+            if len(splits[1][1]):
+                for model in models:
+                    model.partial_fit(*splits[1], classes=classes)
+    if not scored.all():
+        raise ValueError("No held-out or training rows were scored: the first epoch only trains on the first "
+                         "chunk, so use n_epochs >= 2 or a smaller chunksize")
+    test_scores, train_scores = correct / scored
+
+    cv_results = {"param_LogReg__alpha": alphas, "params": [{"LogReg__alpha": alpha} for alpha in alphas],
+                  "mean_test_score": test_scores, "mean_train_score": train_scores,
+                  "rank_test_score": _rank(test_scores)}
+    best_model = models[np.argmin(cv_results["rank_test_score"])]
+    return TunedModel(Pipeline(steps=[('preprocessor', transformer), ('LogReg', best_model)]), cv_results)
@@ -0,0 +1,267 @@
+import os
+import re
+import json
+import time
+import hashlib
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from src.read_data import file_sha256
+
+# One Makefile rule with a recipe: the files it builds, the files it reads and its shell commands
+Stage = namedtuple("Stage", ["name", "targets", "prerequisites", "commands"])
+
+
+def parse_makefile(path="Makefile"):
+    """
+    Read the stage graph from a Makefile.
+
+    Supports the subset of Make syntax the project's Makefile uses: explicit
+    rules with one or more file targets, backslash line continuations, tab
+    indented recipes and `.PHONY` declarations. Phony rules (`all`, `clean`,
+    ...) are not stages; the prerequisites of the first rule are the default
+    goal.
+
+    Parameters
+    ----------
+    path : str, optional
+        Path to the Makefile. Default is "Makefile".
+
+    Returns
+    -------
+    tuple
+        The list of `Stage`s in file order, and the default goal as a list
+        of file targets.
+    """
+    with open(path) as f:
+        text = f.read()
+    lines = re.sub(r"[ \t]*\\\n[ \t]*", " ", text).splitlines()
+
+    phony, rules, current = set(), [], None
+    for line in lines:
+        if line.startswith("\t"):
+            command = line.strip()
+            if current is not None and command and not command.startswith("#"):
+                current["commands"].append(command)
+            continue
+        line = line.split("#", 1)[0].rstrip()
+        if not line.strip():
+            continue
+        match = re.match(r"^([^:=]+?)\s*:(?!=)\s*(.*)$", line)
+        if match is None:
+            current = None
+            continue
+        targets, prerequisites = match.group(1).split(), match.group(2).split()
+        if targets == [".PHONY"]:
+            phony.update(prerequisites)
+            current = None
+            continue
+        current = {"targets": targets, "prerequisites": prerequisites, "commands": []}
+        rules.append(current)
+
+    default_goal = rules[0]["prerequisites"] if rules and set(rules[0]["targets"]) <= phony else \
+        (rules[0]["targets"] if rules else [])
+    stages = []
+    for rule in rules:
+        if set(rule["targets"]) & phony or not rule["commands"]:
+            continue
+        script = re.search(r"scripts/(\w+)\.py", " ".join(rule["commands"]))
+        name = script.group(1) if script else os.path.splitext(os.path.basename(rule["targets"][0]))[0]
+        stages.append(Stage(name, rule["targets"], rule["prerequisites"], rule["commands"]))
+    return stages, default_goal
+
+
+def _code_files(commands, root="."):
+    """The Python scripts a stage runs plus the src/ modules they import, recursively."""
+    pending = re.findall(r"\S+\.py\b", " ".join(commands))
+    seen = []
+    while pending:
+        path = pending.pop()
+        if path in seen or not os.path.exists(os.path.join(root, path)):
+            continue
+        seen.append(path)
+        with open(os.path.join(root, path)) as f:
+            source = f.read()
+        pending += [f"src/{module}.py" for module in re.findall(r"^\s*(?:from|import)\s+src\.(\w+)", source, re.M)]
+    return sorted(seen)
+
+
+def _hash(path):
+    """Content hash of a file, a directory's files, or None if it does not exist."""
+    if os.path.isdir(path):
+        digest = hashlib.sha256()
+        for directory, _, files in sorted(os.walk(path)):
+            for name in sorted(files):
+                file_path = os.path.join(directory, name)
+                digest.update(f"{os.path.relpath(file_path, path)}:{file_sha256(file_path)}".encode())
+        return digest.hexdigest()
+    return file_sha256(path) if os.path.exists(path) else None
+
+
+def stage_key(stage, root="."):
+    """
+    Cache key of a stage: a hash of its commands (which carry its parameters),
+    the contents of its prerequisites and of the code it runs.
+    """
+    digest = hashlib.sha256()
+    digest.update("\n".join(stage.commands).encode())
+    for path in sorted(set(stage.prerequisites) | set(_code_files(stage.commands, root))):
+        digest.update(f"\n{path}:{_hash(os.path.join(root, path))}".encode())
+    return digest.hexdigest()
+
+
+def _needed(stages, goals):
+    """Names of the stages needed to build `goals` (targets or stage names), in file order."""
+    producer = {target: stage for stage in stages for target in stage.targets}
+    by_name = {stage.name: stage for stage in stages}
+    needed, pending = set(), list(goals)
+    while pending:
+        goal = pending.pop()
+        stage = by_name.get(goal) or producer.get(goal)
+        if stage is None or stage.name in needed:
+            continue
+        needed.add(stage.name)
+        pending += stage.prerequisites
+    return [stage.name for stage in stages if stage.name in needed]
+
+
+def _up_to_date_by_mtime(stage, root):
+    """Make's own rule: every target exists and is newer than every prerequisite."""
+    targets = [os.path.join(root, target) for target in stage.targets]
+    prerequisites = [os.path.join(root, path) for path in stage.prerequisites]
+    if not all(os.path.exists(path) for path in targets + prerequisites):
+        return False
+    return min(map(os.path.getmtime, targets)) >= max(map(os.path.getmtime, prerequisites), default=0)
+
+
+def run_pipeline(stages, goals, jobs=None, force=False, dry_run=False, root=".", cache_dir=".cache/pipeline"):
+    """
+    Build `goals` by running the stages they need, in parallel where the graph allows.
+
+    A stage runs once all stages producing its prerequisites have finished.
+    Before running, its `stage_key` is compared with the key recorded after
+    its last successful run; if they match and its targets still have the
+    recorded contents, the stage is skipped. Because keys hash contents, not
+    timestamps, touching a file or rerunning a stage that rewrites identical
+    outputs does not invalidate anything downstream. A stage without a
+    record whose targets are newer than its prerequisites (Make's rule) is
+    recorded as up to date without running, so switching from `make` does
+    not rebuild everything.
+
+    Independent ready stages run concurrently as separate processes, at most
+    `jobs` at a time. Each stage's output goes to `<cache_dir>/<name>.log`.
+    When a stage fails, the stages depending on it are skipped and the
+    others carry on.
+
+    Parameters
+    ----------
+    stages : list of Stage
+        The stage graph, e.g. from `parse_makefile`.
+    goals : list of str
+        Targets or stage names to build.
+    jobs : int, optional
+        Maximum number of stages running at once. Default is the number of CPUs.
+    force : bool, optional
+        Run every needed stage even if its cached outputs are valid. Default is False.
+    dry_run : bool, optional
+        Only report which stages would run. Default is False.
+    root : str, optional
+        Directory the commands run in and paths are relative to. Default is ".".
+    cache_dir : str, optional
+        Directory for the stage records and logs, relative to `root`.
+
+    Returns
+    -------
+    list of dict
+        The timing report: one entry per needed stage with its `name`,
+        `status` ("ran", "cached", "adopted", "failed", "skipped" or
+        "would run"), `seconds` and `start`/`end` offsets in seconds from
+        the start of the run.
+    """
+    cache_dir = os.path.join(root, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    by_name = {stage.name: stage for stage in stages}
+    producer = {target: stage.name for stage in stages for target in stage.targets}
+    needed = _needed(stages, goals)
+    upstream = {name: {producer[path] for path in by_name[name].prerequisites if path in producer} & set(needed)
+                for name in needed}
+
+    report = {}
+    run_start = time.perf_counter()
+
+    def record_path(name):
+        return os.path.join(cache_dir, f"{name}.json")
+
+    def entry(name, status, start, end):
+        report[name] = {"name": name, "status": status, "seconds": end - start,
+                        "start": start - run_start, "end": end - run_start}
+
+    def outputs(stage):
+        return {target: _hash(os.path.join(root, target)) for target in stage.targets}
+
+    def is_cached(stage, key):
+        try:
+            with open(record_path(stage.name)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return record.get("key") == key and record.get("outputs") == outputs(stage)
+
+    def save_record(stage, key):
+        with open(record_path(stage.name), "w") as f:
+            json.dump({"key": key, "outputs": outputs(stage)}, f, indent=2)
+
+    def execute(stage):
+        start = time.time()
+        with open(os.path.join(cache_dir, f"{stage.name}.log"), "w") as log:
+            for command in stage.commands:
+                if subprocess.run(command, shell=True, cwd=root, stdout=log, stderr=subprocess.STDOUT).returncode:
+                    return False
+        # Some scripts report errors and exit 0, so a stage only succeeds if it wrote all its targets
+        targets = [os.path.join(root, target) for target in stage.targets]
+        return all(os.path.exists(path) and os.path.getmtime(path) >= start - 1 for path in targets)
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        running, started = {}, {}
+        while len(report) < len(needed):
+            progressed = False
+            for name in needed:
+                states = [report.get(dependency, {}).get("status") for dependency in upstream[name]]
+                if name in report or name in started or None in states:
+                    continue
+                stage, now, progressed = by_name[name], time.perf_counter(), True
+                if "failed" in states or "skipped" in states:
+                    entry(name, "skipped", now, now)
+                    continue
+                if "would run" in states:
+                    entry(name, "would run", now, now)
+                    continue
+                key = stage_key(stage, root)
+                if not force and is_cached(stage, key):
+                    entry(name, "cached", now, time.perf_counter())
+                elif not force and not os.path.exists(record_path(name)) and _up_to_date_by_mtime(stage, root):
+                    if not dry_run:
+                        save_record(stage, key)
+                    entry(name, "adopted", now, time.perf_counter())
+                elif dry_run:
+                    entry(name, "would run", now, now)
+                else:
+                    running[pool.submit(execute, stage)] = name
+                    started[name] = now
+            if not running:
+                if not progressed and len(report) < len(needed):
+                    raise ValueError(f"Circular dependency between stages {sorted(set(needed) - set(report))}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                stage, start = by_name[name], started.pop(name)
+                if future.result():
+                    save_record(stage, stage_key(stage, root))
+                    entry(name, "ran", start, time.perf_counter())
+                else:
+                    if os.path.exists(record_path(name)):
+                        os.remove(record_path(name))
+                    entry(name, "failed", start, time.perf_counter())
+
+    return [report[name] for name in needed]
@@ -0,0 +1,366 @@
+import os
+import pickle
+import hashlib
+from collections import namedtuple
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.base import clone
+from src.read_data import iter_chunks
+
+# Version of the artifact layout written by `save_preprocessor`
+ARTIFACT_VERSION = 1
+
+# A preprocessor loaded by `load_preprocessor` and the metadata it was published with
+PreprocessorArtifact = namedtuple("PreprocessorArtifact", ["preprocessor", "metadata"])
+
+# Artifacts loaded in this process, keyed on path and file version
+_artifacts = {}
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with a relative error bound (DDSketch).
+
+    Values are counted in logarithmic buckets: with
+    `gamma = (1 + relative_accuracy) / (1 - relative_accuracy)`, bucket `k`
+    holds the values whose magnitude lies in `(gamma**(k - 1), gamma**k]`,
+    positive and negative values in separate buckets and zeros counted
+    exactly. Every order statistic read back from the sketch is within
+    `relative_accuracy * |x|` of the true order statistic `x` at that rank,
+    whatever the distribution and the number of values; `quantile`
+    interpolates between two such estimates, so its error is at most
+    `relative_accuracy` times the larger of the two. When every value is an
+    integer, estimates whose error bound is below 0.5 are rounded, which
+    makes them exact (e.g. FICO scores, counts and flags).
+
+    All state is bucket counts, so sketches of separate chunks `merge` into
+    the sketch of their union regardless of chunking and order. The size
+    grows with the logarithm of the value range, not with the number of
+    values: about `ln(max / min) / (2 * relative_accuracy)` buckets per sign.
+
+    Parameters
+    ----------
+    relative_accuracy : float, optional
+        Relative error bound, between 0 and 1. Default is 0.0005.
+    """
+
+    def __init__(self, relative_accuracy=0.0005):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be between 0 and 1, got {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.count = 0
+        self.zeros = 0
+        self.integers = True
+        # Sorted bucket keys and their counts, for positive and negative values
+        self.positive = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        self.negative = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+    @staticmethod
+    def _add(buckets, keys, counts):
+        keys, inverse = np.unique(np.concatenate([buckets[0], keys]), return_inverse=True)
+        return keys, np.bincount(inverse, weights=np.concatenate([buckets[1], counts])).astype(np.int64)
+
+    def _keys(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / np.log(self.gamma)).astype(np.int64)
+
+    def update(self, values):
+        """Add an array of values to the sketch; missing values are ignored."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.zeros += int(np.count_nonzero(values == 0))
+        self.integers = self.integers and bool(np.all(values == np.round(values)))
+        for sign, attr in ((1, "positive"), (-1, "negative")):
+            keys, counts = np.unique(self._keys(values[sign * values > 0] * sign), return_counts=True)
+            setattr(self, attr, self._add(getattr(self, attr), keys, counts))
+        return self
+
+    def merge(self, other):
+        """Add the values counted by another sketch with the same accuracy."""
+        if other.gamma != self.gamma:
+            raise ValueError("Only sketches with the same relative_accuracy can be merged")
+        self.count += other.count
+        self.zeros += other.zeros
+        self.integers = self.integers and other.integers
+        self.positive = self._add(self.positive, *other.positive)
+        self.negative = self._add(self.negative, *other.negative)
+        return self
+
+    def _order_statistic(self, ranks):
+        # Buckets in increasing order of value: negatives by decreasing magnitude, zeros, positives
+        keys = np.concatenate([self.negative[0][::-1], [0], self.positive[0]])
+        counts = np.concatenate([self.negative[1][::-1], [self.zeros], self.positive[1]])
+        signs = np.concatenate([-np.ones(len(self.negative[0])), [0], np.ones(len(self.positive[0]))])
+        # The value halfway (in relative terms) between the bucket bounds is within the bound of both
+        values = signs * 2 * self.gamma ** keys.astype(float) / (self.gamma + 1)
+        if self.integers:
+            # |estimate - x| <= relative_accuracy * |estimate| / (1 - relative_accuracy) < 0.5 pins x
+            exact = self.relative_accuracy * np.abs(values) < 0.5 * (1 - self.relative_accuracy)
+            values = np.where(exact, np.round(values), values)
+        return values[np.searchsorted(np.cumsum(counts), ranks, side="right")]
+
+    def quantile(self, q):
+        """
+        Estimate the `q`-quantile, interpolating between order statistics like `numpy.quantile`.
+
+        Returns NaN for an empty sketch.
+        """
+        if self.count == 0:
+            return np.nan
+        rank = q * (self.count - 1)
+        low, high = self._order_statistic(np.array([np.floor(rank), np.ceil(rank)]))
+        return low + (high - low) * (rank - np.floor(rank))
+
+
+def _most_frequent(counts):
+    """The value `SimpleImputer(strategy='most_frequent')` picks: the most frequent, ties to the smallest."""
+    return counts[counts == counts.max()].index.min()
+
+
+def fit_out_of_core(preprocessor, chunks, relative_accuracy=0.0005):
+    """
+    Fit the project's preprocessor on training data streamed in chunks.
+
+    `preprocessor` is a `ColumnTransformer` with two pipelines, as built by
+    `scripts/preprocessing.py`: numeric columns go through
+    `SimpleImputer(strategy='median')` and `StandardScaler`, categorical
+    columns through `SimpleImputer(strategy='most_frequent')` and
+    `OneHotEncoder`. In one pass over the chunks:
+    - the numeric medians are estimated with a `QuantileSketch` per column,
+    - the scaler moments are accumulated with `StandardScaler.partial_fit`,
+      skipping missing values; once the medians are known, the imputed
+      values are added as one weighted row per column, so the moments are
+      those of the imputed data,
+    - the categories are counted.
+
+    The fitted preprocessor then equals `preprocessor.fit(train_df)` on the
+    whole data except for the medians, which are within `relative_accuracy`
+    relative error, and the scaler statistics, which shift accordingly
+    (only through the imputed values) and up to rounding. Memory use is
+    bounded by the chunk size and the sketches, not the number of rows.
+
+    Parameters
+    ----------
+    preprocessor : sklearn.compose.ColumnTransformer
+        The unfitted preprocessor; it is fitted in place.
+    chunks : iterable of pandas.DataFrame
+        The training data, e.g. `iter_chunks(path, chunksize)`.
+    relative_accuracy : float, optional
+        Relative error bound of the medians. Default is 0.0005.
+
+    Returns
+    -------
+    sklearn.compose.ColumnTransformer
+        The fitted `preprocessor`.
+
+    Raises
+    ------
+    ValueError
+        If the preprocessor does not have this structure or `chunks` has no rows.
+    """
+    try:
+        (numeric_name, numeric_pipeline, numeric), (_, categorical_pipeline, categorical) = preprocessor.transformers
+        strategies = [numeric_pipeline.steps[0][1].strategy, categorical_pipeline.steps[0][1].strategy]
+    except (ValueError, AttributeError):
+        strategies = None
+    if strategies != ["median", "most_frequent"]:
+        raise ValueError("Expected a median-imputed, scaled numeric pipeline followed by a "
+                         "most-frequent-imputed, encoded categorical pipeline")
+    numeric, categorical = list(numeric), list(categorical)
+
+    sketches = [QuantileSketch(relative_accuracy) for _ in numeric]
+    scaler = clone(numeric_pipeline.steps[1][1])
+    n_missing = np.zeros(len(numeric), dtype=np.int64)
+    category_counts = {column: pd.Series(dtype=np.int64) for column in categorical}
+    first, n_rows = None, 0
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        if first is None:
+            first = chunk.iloc[:1]
+        n_rows += len(chunk)
+        values = chunk[numeric].to_numpy(dtype=float)
+        scaler.partial_fit(values)
+        n_missing += np.isnan(values).sum(axis=0)
+        for sketch, column in zip(sketches, values.T):
+            sketch.update(column)
+        for column in categorical:
+            category_counts[column] = category_counts[column].add(chunk[column].value_counts(), fill_value=0)
+    if first is None:
+        raise ValueError("Input Dataframe cannot be empty.")
+
+    medians = np.array([sketch.quantile(0.5) for sketch in sketches])
+    imputed = np.flatnonzero(n_missing)
+    if len(imputed):
+        streamed = {attr: getattr(scaler, attr) for attr in ("mean_", "var_", "scale_")}
+        rows = np.full((len(imputed), len(numeric)), np.nan)
+        rows[np.arange(len(imputed)), imputed] = medians[imputed]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scaler.partial_fit(rows, sample_weight=n_missing[imputed].astype(float))
+        # Columns without missing values get no weight in that update and keep their moments
+        complete = n_missing == 0
+        for attr, values in streamed.items():
+            if values is not None:
+                getattr(scaler, attr)[complete] = values[complete]
+        scaler.n_samples_seen_ = n_rows
+
+    # A few rows on which an ordinary fit yields the streamed statistics: constant numeric
+    # columns at the medians, and every category once with the most frequent one repeated
+    n_summary = max(len(counts) for counts in category_counts.values()) + 1
+    summary = pd.DataFrame({column: np.repeat(first[column].to_numpy(), n_summary) for column in first.columns})
+    summary[numeric] = np.tile(medians, (n_summary, 1))
+    for column, counts in category_counts.items():
+        categories = sorted(counts.index)
+        summary[column] = categories + [_most_frequent(counts)] * (n_summary - len(categories))
+    preprocessor.fit(summary)
+
+    fitted_scaler = preprocessor.named_transformers_[numeric_name].steps[1][1]
+    for attr in ("mean_", "var_", "scale_", "n_samples_seen_"):
+        setattr(fitted_scaler, attr, getattr(scaler, attr))
+    return preprocessor
+
+
+def transform_file(preprocessor, data_from, data_to, chunksize=100_000):
+    """
+    Transform a CSV or Parquet file chunk by chunk with a fitted preprocessor and write a CSV.
+
+    The output is written under a temporary name and renamed when complete.
+
+    Parameters
+    ----------
+    preprocessor : fitted sklearn transformer
+        Transformer with `get_feature_names_out`, which names the output columns.
+    data_from : str
+        Path to the `.csv` or `.parquet` input.
+    data_to : str
+        Path to the `.csv` output.
+    chunksize : int, optional
+        Number of rows transformed at a time. Default is 100,000.
+    """
+    tmp_path = f"{data_to}.{os.getpid()}.tmp"
+    columns = preprocessor.get_feature_names_out()
+    header = True
+    try:
+        for chunk in iter_chunks(data_from, chunksize):
+            pd.DataFrame(preprocessor.transform(chunk), columns=columns).to_csv(
+                tmp_path, mode="w" if header else "a", header=header, index=False)
+            header = False
+        os.replace(tmp_path, data_to)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class FeatureDigest:
+    """
+    Running SHA-256 content hash of feature rows.
+
+    Hashes the column names and the values of every row in order, so a
+    frame and any split of it into consecutive chunks give the same digest.
+    `update` returns its input, so the digest can be taken while chunks
+    stream through, e.g. into `fit_out_of_core`. `n_rows` counts the rows
+    hashed.
+    """
+
+    def __init__(self):
+        self._digest = hashlib.sha256()
+        self._columns = None
+        self.n_rows = 0
+
+    def update(self, X):
+        if self._columns is None:
+            self._columns = list(X.columns)
+            self._digest.update("\x1f".join(map(str, self._columns)).encode())
+        self._digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+        self.n_rows += len(X)
+        return X
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+
+def save_preprocessor(preprocessor, path, data_sha256, features_sha256, n_rows):
+    """
+    Publish a fitted preprocessor as a versioned artifact.
+
+    The preprocessor is written with `joblib.dump`, uncompressed, so its
+    numeric arrays are stored raw and can be memory-mapped by
+    `load_preprocessor`. The metadata records what it was fitted on. No
+    timestamp is stored: refitting on the same data writes the same bytes,
+    so downstream pipeline stages stay cached.
+
+    Parameters
+    ----------
+    preprocessor : fitted sklearn transformer
+        The fitted preprocessor.
+    path : str
+        Path of the artifact, e.g. "results/models/preprocessor.pickle".
+    data_sha256 : str
+        SHA-256 of the training data file (`file_sha256`).
+    features_sha256 : str
+        `FeatureDigest` of the training features the preprocessor was fitted on.
+    n_rows : int
+        Number of training rows.
+    """
+    metadata = {"artifact_version": ARTIFACT_VERSION, "sklearn_version": sklearn.__version__,
+                "data_sha256": data_sha256, "features_sha256": features_sha256, "n_rows": int(n_rows)}
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump({"metadata": metadata, "preprocessor": preprocessor}, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_preprocessor(path, mmap_mode="r"):
+    """
+    Load a preprocessor artifact, once per file version in this process.
+
+    Artifacts are memoized on their path, modification time and size, so
+    every stage, fold and search in a process shares one copy; callers that
+    fit it must `clone` it first. Plain pickles of a preprocessor (the
+    format before artifacts were versioned) load with empty metadata. An
+    artifact already in memory (e.g. handed over by `src.stages`) is
+    returned as is, so the functions taking a preprocessor path also
+    accept one.
+
+    Parameters
+    ----------
+    path : str or PreprocessorArtifact
+        Path written by `save_preprocessor`, or an artifact.
+    mmap_mode : str or None, optional
+        How numeric arrays are mapped, as in `joblib.load`. Default is "r"
+        (read-only memory map); None reads them into memory.
+
+    Returns
+    -------
+    PreprocessorArtifact
+        The preprocessor and its metadata.
+
+    Raises
+    ------
+    FileNotFoundError
+        If `path` does not exist.
+    pickle.UnpicklingError
+        If the file is not a pickle.
+    ValueError
+        If the artifact was written by a newer version of this code.
+    """
+    if isinstance(path, PreprocessorArtifact):
+        return path
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, mmap_mode)
+    if key not in _artifacts:
+        try:
+            loaded = joblib.load(path, mmap_mode=mmap_mode)
+        except KeyError as e:
+            # joblib reports a file that is not a pickle as an unknown opcode
+            raise pickle.UnpicklingError(f"{path} is not a pickle file") from e
+        if isinstance(loaded, dict) and "metadata" in loaded:
+            if loaded["metadata"]["artifact_version"] > ARTIFACT_VERSION:
+                raise ValueError(f"{path} has artifact version {loaded['metadata']['artifact_version']}, "
+                                 f"this code reads up to {ARTIFACT_VERSION}")
+            _artifacts[key] = PreprocessorArtifact(loaded["preprocessor"], loaded["metadata"])
+        else:
+            _artifacts[key] = PreprocessorArtifact(loaded, {})
+    return _artifacts[key]
@@ -0,0 +1,187 @@
+import os
+import glob
+import hashlib
+import pandas as pd
+from src.data_validation import compact_dtypes
+from src.instrumentation import instrument
+
+
+def file_sha256(filepath):
+    """
+    Compute the SHA-256 hex digest of a file's contents.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the file.
+
+    Returns
+    -------
+    str
+        The hex digest.
+    """
+    with open(filepath, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def read_data(filepath: str, columns=None, cache_dir=None):
+    """
+    Read a CSV file into a DataFrame through a typed Parquet cache.
+
+    The first read parses the CSV with `pandas.read_csv` and stores a Parquet
+    copy named after the source file, a hash of its path and its SHA-256
+    content hash. Later reads of the same content load the Parquet copy
+    instead, which keeps the dtypes `read_csv` inferred and only
+    materializes the requested columns. Editing the CSV changes its hash, so
+    the stale copy is ignored and replaced; files with the same name in
+    other directories keep their own copies in a shared `cache_dir`.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the CSV file.
+    columns : list of str, optional
+        Subset of columns to load. Default loads all columns.
+    cache_dir : str, optional
+        Directory holding the Parquet copies. Default is a `.cache` directory
+        next to the CSV file.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The same frame `pandas.read_csv(filepath, usecols=columns)` returns.
+
+    Raises
+    ------
+    FileNotFoundError
+        If `filepath` does not exist.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(filepath)), ".cache")
+
+    # The stem is for display; the path hash keeps same-named files sharing a cache_dir from evicting each other
+    stem = os.path.splitext(os.path.basename(filepath))[0]
+    source = f"{stem}-{hashlib.sha256(os.path.abspath(filepath).encode()).hexdigest()[:16]}"
+    cache_path = os.path.join(cache_dir, f"{source}-{file_sha256(filepath)}.parquet")
+
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path, columns=columns)
+        except FileNotFoundError:
+            pass  # Removed since the check, e.g. by a concurrent reader; treat as a miss
+
+    df = pd.read_csv(filepath)
+    # Write under a temporary name so concurrent readers never see a partial file
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for stale in glob.glob(os.path.join(cache_dir, f"{glob.escape(source)}-*.parquet")):
+            # The current copy may just have been written by another process, so it is kept
+            if stale != cache_path:
+                os.remove(stale)
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        # The cache is an optimization only, e.g. on a read-only file system or
+        # for a mixed-type column that Parquet cannot store
+        pass
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return df if columns is None else df[list(columns)]
+
+
+def iter_chunks(filepath, chunksize):
+    """
+    Read a CSV or Parquet file as a sequence of DataFrames of at most `chunksize` rows.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to a `.csv` or `.parquet` file.
+    chunksize : int
+        Maximum number of rows per chunk.
+
+    Yields
+    ------
+    pandas.DataFrame
+        The next chunk of rows. A file without rows yields one empty chunk
+        with its columns, as `pandas.read_csv` does.
+    """
+    if filepath.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(filepath)
+        if parquet.metadata.num_rows == 0:
+            yield parquet.schema_arrow.empty_table().to_pandas()
+            return
+        for batch in parquet.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(filepath, chunksize=chunksize)
+
+
+@instrument
+def read_loan_data(filepath: str, columns=None, float32=False, cache_dir=None):
+    """
+    Read loan data with the compact dtypes derived from the validation schema.
+
+    Loads the file like `read_data`, then narrows the 0/1 flags and counts to
+    int8/int16/int32, `purpose` to `category` and, optionally, the float
+    columns to float32 (see `compact_dtypes`). The frame still passes
+    `validate` and holds the same values, apart from float32 rounding.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the CSV file.
+    columns : list of str, optional
+        Subset of columns to load. Default loads all columns.
+    float32 : bool, optional
+        Whether to downcast float columns to float32. Default is False.
+    cache_dir : str, optional
+        Directory holding the Parquet copies, see `read_data`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The loan data with compact dtypes.
+    """
+    df = read_data(filepath, columns=columns, cache_dir=cache_dir)
+    return df.astype(compact_dtypes(df, float32=float32))
+
+
+def memory_report(data, baseline=None):
+    """
+    Report the in-memory size of each column of a DataFrame.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        The frame to measure. String and category memory is measured deeply.
+    baseline : pandas.DataFrame, optional
+        A frame with the same columns to compare against, e.g. the same data
+        read with default dtypes.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per column plus a "total" row, with the `dtype` and `bytes` of
+        each column and, given a baseline, its `baseline_dtype`,
+        `baseline_bytes` and the `reduction` factor (baseline / current bytes).
+    """
+    def sizes(df):
+        usage = df.memory_usage(index=False, deep=True)
+        usage["total"] = usage.sum()
+        return usage
+
+    report = pd.DataFrame({"dtype": data.dtypes.astype(str), "bytes": sizes(data)},
+                          index=[*data.columns, "total"])
+    report.loc["total", "dtype"] = ""
+    if baseline is not None:
+        report["baseline_dtype"] = baseline.dtypes.astype(str)
+        report.loc["total", "baseline_dtype"] = ""
+        report["baseline_bytes"] = sizes(baseline)
+        report["reduction"] = report["baseline_bytes"] / report["bytes"]
+    return report
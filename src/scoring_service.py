@@ -0,0 +1,71 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _scores(scorer, loan):
+    probability, prediction = scorer.score_one(loan)
+    return {"probability": probability, "prediction": int(prediction)}
+
+
+def make_server(scorer, host="127.0.0.1", port=8000):
+    """
+    Create an HTTP server that scores loans with a compiled scorer.
+
+    Endpoints:
+    - `GET /health` returns `{"status": "ok"}`.
+    - `POST /score` takes one loan as a JSON object of raw features and
+      returns `{"probability": ..., "prediction": ...}`, or a JSON list of
+      loans and returns a list of such objects. Missing or null features are
+      imputed as in the training pipeline.
+
+    Parameters
+    ----------
+    scorer : CompiledLinearScorer
+        The scorer used for every request.
+    host : str, optional
+        Interface to bind. Default is "127.0.0.1" (local only).
+    port : int, optional
+        Port to bind, 0 for any free port. Default is 8000.
+
+    Returns
+    -------
+    http.server.ThreadingHTTPServer
+        The server; call `serve_forever()` to start it.
+    """
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, {"status": "ok"})
+            else:
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/score":
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if isinstance(request, list):
+                    self._reply(200, [_scores(scorer, loan) for loan in request])
+                elif isinstance(request, dict):
+                    self._reply(200, _scores(scorer, request))
+                else:
+                    self._reply(400, {"error": "Expected a JSON object or a list of objects."})
+            except (ValueError, TypeError, AttributeError) as e:
+                self._reply(400, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass  # Keep per-request logging off the hot path
+
+    return ThreadingHTTPServer((host, port), ScoringHandler)
@@ -0,0 +1,466 @@
+import os
+import pickle
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.svm import SVC
+from sklearn.tree import DecisionTreeClassifier
+from src.bootstrap import bootstrap_metrics
+from src.data_validation import validate
+from src.evaluation import BinaryMetrics
+from src.instrumentation import instrument
+from src.model_cv import parallel_model_cross_val
+from src.model_tuning import c_path_search, halving_c_search
+from src.preprocessing import FeatureDigest, PreprocessorArtifact, load_preprocessor, save_preprocessor
+from src.read_data import read_loan_data, file_sha256
+from src.write_csv import write_csv
+
+TARGET = "not.fully.paid"
+NUMERIC_FEATURES = [
+    'int.rate', 'installment', 'log.annual.inc', 'dti',
+    'days.with.cr.line', 'revol.bal', 'revol.util', "fico",
+    'inq.last.6mths', 'delinq.2yrs', 'pub.rec', "credit.policy"
+]
+CATEGORICAL_FEATURES = ['purpose']
+# Regularization strengths searched by `tune`
+CS = np.logspace(-5, 5)
+
+
+def write_tables(tables, directory):
+    """
+    Write the tables a stage returns.
+
+    Parameters
+    ----------
+    tables : dict
+        Filename -> `(DataFrame, index)`, `index` as in `write_csv`.
+    directory : str
+        Directory the tables are written to.
+    """
+    for filename, (table, index) in tables.items():
+        write_csv(table, directory, filename, index=index)
+
+
+@instrument
+def split(raw_df):
+    """
+    Validate the raw loans and split them into train and test sets.
+
+    Parameters
+    ----------
+    raw_df : pandas.DataFrame
+        Raw loan data.
+
+    Returns
+    -------
+    tuple of pandas.DataFrame
+        The train and test sets (80/20, `random_state=522`), with fresh
+        indexes as if read back from their CSV files.
+    """
+    validate(raw_df)
+    train_df, test_df = train_test_split(raw_df, test_size=0.2, random_state=522)
+    return train_df.reset_index(drop=True), test_df.reset_index(drop=True)
+
+
+@instrument
+def split_csv(filepath, directory, positions, chunksize=100_000):
+    """
+    Write the train and test sets of a raw loan CSV file in bounded memory.
+
+    Streaming counterpart of `split` for files that do not fit in memory,
+    given the split positions from `validate_csv`. A first pass over the file
+    spreads the rows over temporary buckets of `chunksize` consecutive output
+    rows; each bucket is then put in order and appended to its output. The
+    files hold the same rows in the same order as those `split` gives, and
+    memory is bounded by a few chunks plus the positions (9 bytes per row).
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the raw loan CSV file.
+    directory : str
+        Directory `loan_train.csv` and `loan_test.csv` are written to.
+    positions : tuple of numpy.ndarray
+        Row positions of the train and test sets, in split order.
+    chunksize : int, optional
+        Rows read at a time, and output rows per bucket. Default is 100,000.
+    """
+    n_rows = sum(len(split_positions) for split_positions in positions)
+    split_of = np.empty(n_rows, dtype=np.int8)
+    rank = np.empty(n_rows, dtype=np.int64)
+    for i, split_positions in enumerate(positions):
+        split_of[split_positions] = i
+        rank[split_positions] = np.arange(len(split_positions))
+
+    with tempfile.TemporaryDirectory(dir=directory) as buckets:
+        start = 0
+        for chunk in pd.read_csv(filepath, chunksize=chunksize):
+            chunk_rank = rank[start:start + len(chunk)]
+            chunk_split = split_of[start:start + len(chunk)]
+            start += len(chunk)
+            # Index each row by its position in its output file
+            chunk = chunk.set_axis(chunk_rank)
+            for (i, bucket), rows in chunk.groupby([chunk_split, chunk_rank // chunksize]):
+                with open(os.path.join(buckets, f"{i}-{bucket}.pickle"), "ab") as f:
+                    pickle.dump(rows, f)
+
+        for i, filename in enumerate(["loan_train.csv", "loan_test.csv"]):
+            file_path = os.path.join(directory, filename)
+            tmp_path = f"{file_path}.{os.getpid()}.tmp"
+            try:
+                for bucket in range(-(-len(positions[i]) // chunksize)):
+                    pieces = []
+                    with open(os.path.join(buckets, f"{i}-{bucket}.pickle"), "rb") as f:
+                        while True:
+                            try:
+                                pieces.append(pickle.load(f))
+                            except EOFError:
+                                break
+                    pd.concat(pieces).sort_index().to_csv(tmp_path, mode="a" if bucket else "w",
+                                                          header=bucket == 0, index=False)
+                os.replace(tmp_path, file_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+
+def make_preprocessor():
+    """The unfitted preprocessor: median-imputed scaled numbers and a one-hot `purpose`."""
+    numeric_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='median')),  # Handle missing values
+        ('scaler', StandardScaler())                   # Scale numeric features
+    ])
+
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='most_frequent')),  # Handle missing values
+        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))     # Encode categorical features
+    ])
+
+    return ColumnTransformer(
+        transformers=[
+            ('num', numeric_transformer, NUMERIC_FEATURES),
+            ('cat', categorical_transformer, CATEGORICAL_FEATURES)
+        ]
+    )
+
+
+@instrument
+def preprocess(train_df, test_df):
+    """
+    Fit the preprocessor on the training features and scale both sets.
+
+    Returns
+    -------
+    tuple
+        The fitted `PreprocessorArtifact` (its metadata holds the feature
+        digest and row count; `data_sha256` is added when it is saved) and
+        the tables `scaled_loan_train.csv` and `scaled_loan_test.csv`.
+    """
+    features = FeatureDigest()
+    # Fitted with the default (array) output, as the model pipelines reusing it transform
+    preprocessor = make_preprocessor().fit(features.update(train_df.drop(columns=[TARGET])))
+    columns = preprocessor.get_feature_names_out()
+    tables = {"scaled_loan_train.csv": (pd.DataFrame(preprocessor.transform(train_df), columns=columns), False),
+              "scaled_loan_test.csv": (pd.DataFrame(preprocessor.transform(test_df), columns=columns), False)}
+    metadata = {"features_sha256": features.hexdigest(), "n_rows": features.n_rows}
+    return PreprocessorArtifact(preprocessor, metadata), tables
+
+
+def save_artifact(artifact, path, train_path):
+    """Save an artifact from `preprocess`, recording the hash of the training file it came from."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    save_preprocessor(artifact.preprocessor, path, data_sha256=file_sha256(train_path),
+                      features_sha256=artifact.metadata["features_sha256"], n_rows=artifact.metadata["n_rows"])
+
+
+@instrument
+def compare_models(preprocessor, train_df, n_jobs=-1):
+    """
+    Cross-validate the candidate classifiers.
+
+    Parameters
+    ----------
+    preprocessor : str or PreprocessorArtifact
+        Preprocessor path or artifact.
+    train_df : pandas.DataFrame
+        Training set, with the target.
+    n_jobs : int, optional
+        Worker processes for the (model, fold) tasks. Default is -1.
+
+    Returns
+    -------
+    dict
+        The tables `cv_results.csv` and `target_dist.csv`.
+    """
+    X_train = train_df.drop(columns=TARGET)
+    y_train = train_df[TARGET]
+
+    # Define Models
+    dt = DecisionTreeClassifier(random_state=123)
+    # Each (model, fold) task already runs in its own worker, so the models stay single-threaded
+    knn = KNeighborsClassifier(n_jobs=1)
+    svc = SVC(random_state=123)
+    log_reg = LogisticRegression(random_state=123)
+
+    models = {"Decision Tree": dt,
+            "kNN": knn,
+            "SVC": svc,
+            "Logistic Regression": log_reg}
+    cv_results = pd.DataFrame(
+        parallel_model_cross_val(models, preprocessor, X_train, y_train, n_jobs=n_jobs)
+    )
+    return {"cv_results.csv": (np.round(cv_results.T, decimals=4), False),
+            "target_dist.csv": (pd.DataFrame(train_df[TARGET].value_counts(normalize=True)), True)}
+
+
+@instrument
+def tune(preprocessor, train_df, search="grid"):
+    """
+    Tune C of the logistic regression over `CS` with 10-fold cross-validation.
+
+    Parameters
+    ----------
+    preprocessor : str or PreprocessorArtifact
+        Preprocessor path or artifact.
+    train_df : pandas.DataFrame
+        Training set, with the target.
+    search : str, optional
+        "grid" (`GridSearchCV`, which the published results use), or the
+        faster "path" (`c_path_search`), whose scores can differ within the
+        solver tolerance, or "halving" (`halving_c_search`), which scores
+        most candidates on subsamples and can select another C. Default
+        is "grid".
+
+    Returns
+    -------
+    TunedModel or GridSearchCV
+        The fitted search.
+    """
+    X_train = train_df.drop(columns=TARGET)
+    y_train = train_df[TARGET]
+    if search == "path":
+        return c_path_search(preprocessor, X_train, y_train, CS, cv=10, n_jobs=-1)
+    if search == "halving":
+        return halving_c_search(preprocessor, X_train, y_train, CS, cv=10, n_jobs=-1)
+
+    log_reg_pipe = Pipeline(steps=[
+                ('preprocessor', load_preprocessor(preprocessor).preprocessor),
+                ('LogReg', LogisticRegression(random_state=123, max_iter=20000))
+    ])
+    log_reg_search = GridSearchCV(
+        log_reg_pipe,
+        param_grid={"LogReg__C": CS},
+        cv=10,
+        n_jobs=-1,
+        return_train_score=True
+    )
+    return log_reg_search.fit(X_train, y_train)
+
+
+def tuning_report(log_reg_search, param="C"):
+    """
+    Summarize a fitted search.
+
+    Parameters
+    ----------
+    log_reg_search : fitted search
+        Output of `tune` or `streaming_alpha_search`.
+    param : str, optional
+        Tuned parameter of the `LogReg` step, "C" or "alpha" (for the
+        streaming search, where a larger value means more regularization).
+        Default is "C".
+
+    Returns
+    -------
+    tuple
+        The tables (`model_results.csv`) and the Altair chart of the mean
+        test score against `param`.
+    """
+    import altair as alt
+
+    cv_results = pd.DataFrame(log_reg_search.cv_results_)[[
+        "rank_test_score",
+        f"param_LogReg__{param}",
+        "mean_test_score",
+        "mean_train_score"
+    ]]
+    score_scale = alt.Scale(zero=False) if param == "alpha" else alt.Scale(zero=False, domain=(0.839, 0.8401))
+    cv_graph = alt.Chart(cv_results).mark_line().encode(
+        x=alt.X(f'param_LogReg__{param}:Q', scale=alt.Scale(type='log'), title=param),
+        y=alt.Y('mean_test_score:Q', scale=score_scale, title='Accuracy Score'),
+    ).properties(
+        width=500
+    )
+    cv_results =  cv_results.round({column: 6 for column in cv_results if column != "param_LogReg__alpha"})
+    cv_results = cv_results.sort_values(by="rank_test_score").head(1)
+    cv_results = pd.DataFrame(
+    data={
+        f"Best {param}": cv_results.iloc[:,1],
+        "Mean Test Score": cv_results.iloc[:,2],
+        "Mean Train Score": cv_results.iloc[:,3]}).reset_index(drop=True)
+    return {"model_results.csv": (cv_results, True)}, cv_graph
+
+
+def save_pipeline(log_reg_search, path):
+    """Pickle a fitted search to `path`."""
+    with open(path, "wb") as f:
+        pickle.dump(log_reg_search, f)
+
+
+@instrument
+def evaluate(log_reg_search, test_df, n_bootstrap=10000, n_jobs=-1):
+    """
+    Evaluate a fitted search on the test set.
+
+    Parameters
+    ----------
+    log_reg_search : fitted search
+        Output of `tune`, or the unpickled `pipeline.pickle`.
+    test_df : pandas.DataFrame
+        Test set, with the target.
+    n_bootstrap : int, optional
+        Bootstrap resamples for the confidence intervals. Default is 10,000.
+    n_jobs : int, optional
+        Processes for the bootstrap. Default is -1.
+
+    Returns
+    -------
+    dict
+        The tables `test_results.csv`, `test_metrics.csv`, `calibration.csv`,
+        `threshold_sweep.csv`, `test_ci.csv`, `confusion_matrix.csv`,
+        `positive_coef.csv` and `negative_coef.csv`.
+    """
+    X_test = test_df.drop(columns=TARGET)
+    y_test = test_df[TARGET]
+
+    # One predict_proba call; every metric is accumulated from the probabilities
+    y_prob = log_reg_search.predict_proba(X_test)[:, 1]
+    metrics = BinaryMetrics().update(y_test, y_prob)
+    summary = metrics.summary()
+    tables = {
+        "test_results.csv": (pd.DataFrame({"Accuracy Score":[round(summary["accuracy"], 4)]}), True),
+        "test_metrics.csv": (pd.DataFrame([summary]).round(4), False),
+        "calibration.csv": (metrics.calibration_table().round(4), False),
+        "threshold_sweep.csv": (metrics.threshold_table().round(4), False),
+    }
+    # 95% percentile intervals: one number from ~2k test loans says little on its own
+    intervals = bootstrap_metrics(y_test, y_prob, n_replicates=n_bootstrap, n_jobs=n_jobs)
+    tables["test_ci.csv"] = (intervals.round(4), False)
+
+    (tn, fp), (fn, tp) = metrics.confusion
+    tables["confusion_matrix.csv"] = (pd.DataFrame(
+        {
+            " ": ["True Positive (defaulted)", "True Negative (fully paid)"],
+            "Predict Positive (defaulted)": [tp, fp],
+            "Predict Negative (fully paid)": [fn, tn]
+        }
+    ), False)
+
+    # The tuned pipeline holds the preprocessor fitted on the training set
+    preprocessor = log_reg_search.best_estimator_.named_steps['preprocessor']
+    coefficients = log_reg_search.best_estimator_.named_steps['LogReg'].coef_[0]
+
+    tables["positive_coef.csv"] = (pd.DataFrame(
+        {"features":preprocessor.get_feature_names_out(),
+        "positive coefficient": np.round(coefficients, decimals=4)}
+    ).sort_values(by="positive coefficient", ascending=True, ignore_index=True), False)
+
+    tables["negative_coef.csv"] = (pd.DataFrame(
+        {"features":preprocessor.get_feature_names_out(),
+        "negative coefficient": np.round(coefficients,decimals=4)}
+    ).sort_values(by="negative coefficient", ascending=False, ignore_index=True), False)
+    return tables
+
+
+class BackgroundWriter:
+    """
+    Run file writes on a background thread, in submission order.
+
+    Writes are queued on one thread, so a write can rely on the files
+    queued before it (e.g. hash the training CSV it describes). Leaving the
+    `with` block waits for every write and re-raises the first failure.
+    """
+
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self._futures = []
+
+    def submit(self, func, *args, **kwargs):
+        self._futures.append(self._pool.submit(func, *args, **kwargs))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._pool.shutdown(wait=True)
+        if exc_type is None:
+            for future in self._futures:
+                future.result()
+        return False
+
+
+@instrument
+def run_in_process(raw_from, processed_to, tables_to, figures_to, models_to, search="grid",
+                   n_jobs=-1, n_bootstrap=10000):
+    """
+    Run the stages from the split to the evaluation in one process.
+
+    Calls the same stage functions as `split_validation.py`,
+    `preprocessing.py`, `model_training.py`, `model_tuning.py` and
+    `model_evaluation.py`, passing the DataFrames, the fitted preprocessor
+    and the tuned pipeline from one stage to the next in memory instead of
+    writing and re-parsing CSV files and pickles. The files the scripts
+    write are still produced, with the same contents, by a background
+    writer while the next stages compute.
+
+    Parameters
+    ----------
+    raw_from : str
+        Raw loan data CSV.
+    processed_to, tables_to, figures_to, models_to : str
+        Directories of the split and scaled data, the result tables, the
+        tuning figure and the preprocessor and pipeline pickles.
+    search : str, optional
+        Search of `tune`. Default is "grid".
+    n_jobs : int, optional
+        Worker processes for model comparison and the bootstrap. Default is -1.
+    n_bootstrap : int, optional
+        Bootstrap resamples. Default is 10,000.
+
+    Returns
+    -------
+    GridSearchCV or TunedModel
+        The tuned pipeline.
+    """
+    for directory in (processed_to, tables_to, figures_to, models_to):
+        os.makedirs(directory, exist_ok=True)
+
+    with BackgroundWriter() as writer:
+        train_df, test_df = split(read_loan_data(raw_from))
+        writer.submit(write_tables, {"loan_train.csv": (train_df, False), "loan_test.csv": (test_df, False)},
+                      processed_to)
+
+        artifact, tables = preprocess(train_df, test_df)
+        writer.submit(write_tables, tables, processed_to)
+        writer.submit(save_artifact, artifact, os.path.join(models_to, "preprocessor.pickle"),
+                      os.path.join(processed_to, "loan_train.csv"))
+
+        writer.submit(write_tables, compare_models(artifact, train_df, n_jobs=n_jobs), tables_to)
+
+        log_reg_search = tune(artifact, train_df, search=search)
+        writer.submit(save_pipeline, log_reg_search, os.path.join(models_to, "pipeline.pickle"))
+        tables, chart = tuning_report(log_reg_search)
+        writer.submit(write_tables, tables, tables_to)
+        writer.submit(chart.save, os.path.join(figures_to, "param_C_tuning.png"))
+
+        writer.submit(write_tables, evaluate(log_reg_search, test_df, n_bootstrap=n_bootstrap, n_jobs=n_jobs),
+                      tables_to)
+    return log_reg_search
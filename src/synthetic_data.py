@@ -0,0 +1,275 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from scipy.special import ndtr, ndtri
+from src.data_validation import build_schema
+
+
+def _decimals(values, max_decimals=8):
+    """Number of decimals the values are recorded with, or None if they use full precision."""
+    for decimals in range(max_decimals + 1):
+        if np.array_equal(np.round(values, decimals), values):
+            return decimals
+    return None
+
+
+class LoanDataGenerator:
+    """
+    Gaussian copula model of the loan data for generating synthetic loans.
+
+    Each column keeps its own marginal distribution:
+    - `purpose` and the numeric columns with few distinct values (the 0/1
+      flags, `fico`, the counts) are discrete: a value is drawn with its
+      observed frequency, so the target rate and the category mix match
+      the source,
+    - the other columns are continuous: values are interpolated between
+      `n_quantiles` empirical quantiles and rounded like the source
+      (integers stay integers, `int.rate` keeps 4 decimals).
+
+    The dependence between columns is measured as the correlation of their
+    normal scores (`ndtri` of each value's mid-rank; `purpose` categories
+    are ranked by their default rate). Discrete margins weaken correlations
+    passed through the copula, so the latent correlation is calibrated by
+    simulation until the generated data reproduces the source's.
+
+    Every generated value lies within the range observed in the source, and
+    every category was observed, so data generated from a frame that passes
+    `validate` stays within the schema's domains. Missing values are drawn
+    independently with each column's observed missing rate.
+
+    Parameters
+    ----------
+    marginals : dict
+        Column name -> marginal description, as built by `fit`.
+    correlation : numpy.ndarray
+        Latent correlation matrix of the copula, in `marginals` order.
+    """
+
+    def __init__(self, marginals, correlation):
+        self.marginals = dict(marginals)
+        self.columns = list(self.marginals)
+        self.correlation = np.asarray(correlation, dtype=float)
+        # Clip negative eigenvalues so the Cholesky factor always exists
+        eigenvalues, eigenvectors = np.linalg.eigh(self.correlation)
+        fixed = eigenvectors @ np.diag(np.maximum(eigenvalues, 1e-6)) @ eigenvectors.T
+        scale = np.sqrt(np.diag(fixed))
+        self._cholesky = (np.linalg.cholesky(fixed / np.outer(scale, scale))).astype(np.float32)
+
+    @classmethod
+    def fit(cls, data, n_quantiles=1000, max_discrete=64, calibration_rounds=4, calibration_rows=100_000):
+        """
+        Fit the marginals and the copula correlation to a loan data frame.
+
+        Parameters
+        ----------
+        data : pandas.DataFrame
+            Loan data, e.g. `read_data("data/raw/loan_data.csv")`.
+        n_quantiles : int, optional
+            Number of quantile intervals kept for continuous columns. Default is 1000.
+        max_discrete : int, optional
+            Numeric columns with at most this many distinct values are
+            treated as discrete. Default is 64.
+        calibration_rounds : int, optional
+            Simulation rounds adjusting the latent correlation. Default is 4.
+        calibration_rows : int, optional
+            Rows simulated per calibration round. Default is 100,000.
+
+        Returns
+        -------
+        LoanDataGenerator
+        """
+        kinds = {name: column.metadata["kind"] for name, column in build_schema().columns.items()}
+        target = data["not.fully.paid"] if "not.fully.paid" in data.columns else None
+        marginals = {}
+        for name in data.columns:
+            values = data[name]
+            observed = values.dropna()
+            marginal = {"dtype": values.dtype, "missing_rate": float(values.isna().mean())}
+
+            if kinds.get(name) == "str" or not pd.api.types.is_numeric_dtype(values.dtype):
+                labels = observed.astype(object)
+                order = (target[observed.index].groupby(labels).mean().sort_values().index.tolist()
+                         if target is not None else sorted(labels.unique()))
+                counts = labels.value_counts().reindex(order).to_numpy()
+                marginal.update(kind="category", values=np.array(order, dtype=object),
+                                cumulative=np.cumsum(counts) / counts.sum())
+            elif observed.nunique() <= max_discrete:
+                counts = observed.value_counts().sort_index()
+                marginal.update(kind="discrete", values=counts.index.to_numpy(),
+                                cumulative=np.cumsum(counts.to_numpy()) / counts.sum())
+            else:
+                marginal.update(kind="continuous",
+                                quantiles=np.quantile(observed.to_numpy(dtype=float), np.linspace(0, 1, n_quantiles + 1)),
+                                decimals=0 if pd.api.types.is_integer_dtype(values.dtype)
+                                else _decimals(observed.to_numpy(dtype=float)))
+            marginals[name] = marginal
+
+        generator = cls(marginals, np.eye(len(marginals)))
+        target_correlation = generator.score_correlation(data)
+        latent = target_correlation
+        for _ in range(calibration_rounds):
+            generator = cls(marginals, latent)
+            achieved = generator.score_correlation(generator.sample(calibration_rows, seed=0))
+            latent = np.clip(latent + target_correlation - achieved, -0.999, 0.999)
+            np.fill_diagonal(latent, 1)
+        return cls(marginals, latent)
+
+    def score_correlation(self, data):
+        """
+        Correlation matrix of the normal scores of each column.
+
+        This is the dependence measure the generator reproduces; compare it
+        between the source and a sample to check the fit. Missing values
+        score 0 (the median).
+
+        Parameters
+        ----------
+        data : pandas.DataFrame
+            Loan data with the generator's columns.
+
+        Returns
+        -------
+        numpy.ndarray
+            The correlation matrix, in `columns` order.
+        """
+        scores = []
+        for name in self.columns:
+            marginal, values = self.marginals[name], data[name]
+            present = values.notna().to_numpy()
+            observed = values[present]
+            if marginal["kind"] == "category":
+                observed = pd.Series(pd.Categorical(observed.astype(object), categories=marginal["values"]).codes)
+            score = np.zeros(len(values))
+            score[present] = ndtri((observed.rank(method="average").to_numpy() - 0.5) / present.sum())
+            scores.append(score)
+        # A constant column has no defined correlation; treat it as independent
+        correlation = np.nan_to_num(np.corrcoef(np.vstack(scores)).reshape(len(scores), len(scores)))
+        np.fill_diagonal(correlation, 1)
+        return correlation
+
+    def _column(self, marginal, u, rng):
+        """Map uniform copula draws to one column's values."""
+        dtype = marginal["dtype"]
+        if marginal["kind"] == "continuous":
+            # The quantiles sit on a uniform probability grid, so the interval is found by scaling
+            quantiles = marginal["quantiles"]
+            position = u * (len(quantiles) - 1)
+            index = np.minimum(position.astype(np.intp), len(quantiles) - 2)
+            low = quantiles[index]
+            values = low + (quantiles[index + 1] - low) * (position - index)
+            if marginal["decimals"] is not None:
+                values = np.round(values, marginal["decimals"])
+        else:
+            index = np.minimum(np.searchsorted(marginal["cumulative"].astype(u.dtype), u, side="right"),
+                               len(marginal["values"]) - 1)
+            values = marginal["values"].take(index)
+            if isinstance(dtype, pd.CategoricalDtype):
+                values = pd.Categorical(values, dtype=dtype)
+        if pd.api.types.is_numeric_dtype(dtype):
+            # A numeric column with missing values has a float dtype already
+            values = values.astype(dtype, copy=False)
+
+        if marginal["missing_rate"] > 0:
+            values[rng.random(len(u)) < marginal["missing_rate"]] = np.nan
+        return values
+
+    def sample(self, n_rows, seed=None):
+        """
+        Generate synthetic loans.
+
+        Parameters
+        ----------
+        n_rows : int
+            Number of loans.
+        seed : int or numpy.random.SeedSequence, optional
+            Random seed.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The loans, with the columns and dtypes of the frame the generator was fit on.
+        """
+        rng = np.random.default_rng(seed)
+        # One row per column keeps each column's draws contiguous; single precision is plenty for copula draws
+        u = ndtr(self._cholesky @ rng.standard_normal((len(self.columns), n_rows), dtype=np.float32))
+        return pd.DataFrame({name: self._column(self.marginals[name], u[j], rng)
+                             for j, name in enumerate(self.columns)})
+
+    def iter_chunks(self, n_rows, chunksize=1_000_000, seed=0):
+        """
+        Generate `n_rows` synthetic loans as a sequence of DataFrames.
+
+        Each chunk gets its own child of `SeedSequence(seed)`, so the output
+        is reproducible for a given seed and chunk size, and memory is
+        bounded by the chunk size.
+
+        Yields
+        ------
+        pandas.DataFrame
+            The next chunk of at most `chunksize` loans.
+        """
+        seed_sequence = np.random.SeedSequence(seed)
+        for start in range(0, n_rows, chunksize):
+            yield self.sample(min(chunksize, n_rows - start), seed=seed_sequence.spawn(1)[0])
+
+
+def write_synthetic(generator, filepath, n_rows, chunksize=1_000_000, seed=0):
+    """
+    Stream synthetic loans to a CSV or Parquet file.
+
+    Chunks are written with pyarrow as they are generated, under a temporary
+    name that replaces `filepath` only once all rows are written.
+
+    Parameters
+    ----------
+    generator : LoanDataGenerator
+        The fitted generator.
+    filepath : str
+        Output path ending in `.csv` or `.parquet`.
+    n_rows : int
+        Number of loans.
+    chunksize : int, optional
+        Number of loans generated and written at a time. Default is 1,000,000.
+    seed : int, optional
+        Random seed. Default is 0.
+
+    Returns
+    -------
+    dict
+        Number of `rows` written, wall time in `seconds` and `rows_per_second`.
+
+    Raises
+    ------
+    ValueError
+        If `filepath` does not end with `.csv` or `.parquet`.
+    """
+    if not filepath.endswith((".csv", ".parquet")):
+        raise ValueError("Filename must end with '.csv' or '.parquet'")
+
+    start = time.perf_counter()
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    writer = None
+    try:
+        # An empty request still writes the header (CSV) or schema (Parquet)
+        chunks = generator.iter_chunks(n_rows, chunksize=chunksize, seed=seed) if n_rows else [generator.sample(0)]
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = (pq.ParquetWriter(tmp_path, table.schema) if filepath.endswith(".parquet")
+                          else pacsv.CSVWriter(tmp_path, table.schema))
+            writer.write_table(table)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    writer.close()
+    os.replace(tmp_path, filepath)
+
+    seconds = time.perf_counter() - start
+    return {"rows": n_rows, "seconds": seconds, "rows_per_second": n_rows / seconds if seconds else None}
@@ -1,10 +1,128 @@
-
+import io
 import os
+import csv
 import pandas as pd
+from src.instrumentation import instrument
+
+# Extension -> (format, compression)
+FORMATS = {
+    ".csv": ("csv", None),
+    ".csv.gz": ("csv", "gzip"),
+    ".csv.bz2": ("csv", "bz2"),
+    ".parquet": ("parquet", None),
+    ".feather": ("feather", None),
+}
+
+
+def _file_format(filename):
+    """Format and compression of `filename`, from the longest matching extension."""
+    for extension in sorted(FORMATS, key=len, reverse=True):
+        if filename.endswith(extension):
+            return FORMATS[extension]
+    raise ValueError("Filename must end with '.csv', '.csv.gz', '.csv.bz2', '.parquet' or '.feather'")
+
+
+def _csv_header(dataframe, index):
+    """The header line `DataFrame.to_csv` writes."""
+    names = list(dataframe.columns)
+    if index:
+        names = ["" if name is None else name for name in dataframe.index.names] + names
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(names)
+    return buffer.getvalue().encode()
+
+
+def _csv_table(table):
+    """
+    Format the columns of `table` as `DataFrame.to_csv` would, where pyarrow differs.
+
+    Whole-valued floats keep their ".0", so a column of 0.0/1.0 still reads
+    back as float, and booleans are written as True/False.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    columns = []
+    for column in table.columns:
+        # Only columns holding whole values are formatted here; pyarrow writes the others faster
+        if pa.types.is_floating(column.type) and pc.any(pc.equal(pc.floor(column), column)).as_py():
+            text = pc.cast(column, pa.string())
+            whole = pc.match_substring_regex(text, r"^-?\d+$")
+            column = pc.if_else(whole, pc.binary_join_element_wise(text, ".0", ""), text)
+        elif pa.types.is_boolean(column.type):
+            column = pc.if_else(column, "True", "False")
+        columns.append(column)
+    return pa.table(columns, names=table.column_names)
 
-def write_csv(dataframe: pd.DataFrame, directory: str, filename: str, index: bool = False):
+
+def _needs_quotes(table):
+    """Whether any text in `table` holds a delimiter, quote or line break."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for column in table.columns:
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        if (pa.types.is_string(column.type) or pa.types.is_large_string(column.type)) and \
+                pc.any(pc.match_substring_regex(column, '[",\r\n]')).as_py():
+            return True
+    return False
+
+
+def _write_arrow(dataframe, path, file_format, compression, index, chunksize):
+    """Write `dataframe` to `path` with pyarrow, `chunksize` rows at a time."""
+    import pyarrow as pa
+
+    if file_format == "csv":
+        import pyarrow.csv as pa_csv
+
+        # pyarrow quotes every header name, so the header is written as pandas does;
+        # the columns are renamed by position so duplicate or non-string names convert
+        frame = dataframe.reset_index() if index else dataframe
+        frame = frame.set_axis([str(i) for i in range(frame.shape[1])], axis=1)
+        schema = pa.Schema.from_pandas(frame, preserve_index=False)
+        sink = pa.CompressedOutputStream(path, compression) if compression else pa.OSFile(path, "wb")
+        with sink:
+            sink.write(_csv_header(dataframe, index))
+            for start in range(0, len(frame), chunksize):
+                table = pa.Table.from_pandas(frame.iloc[start:start + chunksize], schema=schema, preserve_index=False)
+                # Like pandas, quote values only where needed ("needed" quotes every string)
+                quoting = "needed" if _needs_quotes(table) else "none"
+                pa_csv.write_csv(_csv_table(table), sink,
+                                 pa_csv.WriteOptions(include_header=False, quoting_style=quoting))
+        return
+
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(dataframe, preserve_index=index)
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(path, schema)
+    else:
+        # Feather (V2) is the Arrow IPC file format
+        writer = pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(compression="lz4"))
+    with writer:
+        for start in range(0, len(dataframe), chunksize):
+            writer.write_table(pa.Table.from_pandas(dataframe.iloc[start:start + chunksize], schema=schema,
+                                                    preserve_index=index))
+
+
+@instrument
+def write_csv(dataframe: pd.DataFrame, directory: str, filename: str, index: bool = False,
+              engine: str = "pyarrow", chunksize: int = 100_000):
     """
-    Save a Pandas DataFrame to a CSV file in the specified directory.
+    Save a Pandas DataFrame to a file in the specified directory.
+
+    The format follows the extension: CSV (`.csv`, or compressed `.csv.gz`
+    and `.csv.bz2`), Parquet (`.parquet`) or Feather (`.feather`). Files are
+    written by pyarrow, `chunksize` rows at a time, to a temporary file that
+    is renamed into place once complete, so an interrupted write never
+    leaves a partial file behind.
+
+    pyarrow writes CSV several times faster than `DataFrame.to_csv`, with
+    the same values and dtypes when read back; the text can differ, e.g.
+    1e-05 is written as 0.00001, and when any value in a chunk needs
+    quoting every text value in it is quoted. `engine="pandas"` keeps the
+    `to_csv` formatting exactly.
 
     Parameters
     ----------
@@ -13,27 +131,45 @@ def write_csv(dataframe: pd.DataFrame, directory: str, filename: str, index: boo
     directory : str
         The directory where the file will be saved.
     filename : str
-        The name of the file (must include the '.csv' extension).
+        The name of the file, with one of the extensions above.
     index : bool, optional
-        Whether to include the DataFrame's index in the CSV file. Default is False.
+        Whether to include the DataFrame's index in the file. Default is False.
+    engine : str, optional
+        "pyarrow", or "pandas" to write CSV with `DataFrame.to_csv`. Parquet
+        and Feather are always written by pyarrow. Default is "pyarrow".
+    chunksize : int, optional
+        Rows converted and written at a time (the Parquet row group size).
+        Default is 100,000.
 
     Raises
     ------
     ValueError
-        If the filename does not end with '.csv', or the DataFrame is empty.
+        If the filename does not have a supported extension, the engine is
+        unknown or the DataFrame is empty.
     FileNotFoundError
         If the specified directory does not exist.
     TypeError
         If the input is not a pandas DataFrame.
     """
-    if not filename.endswith(".csv"):
-        raise ValueError("Filename must end with '.csv'")
+    file_format, compression = _file_format(filename)
+    if engine not in ("pyarrow", "pandas"):
+        raise ValueError(f"Unknown engine {engine!r}, expected 'pyarrow' or 'pandas'")
     if not os.path.exists(directory):
         raise FileNotFoundError(f"Directory {directory} does not exist.")
     if not isinstance(dataframe, pd.DataFrame):
-        raise TypeError("Input must be a pandas DataFrame")    
+        raise TypeError("Input must be a pandas DataFrame")
     if dataframe.empty:
         raise ValueError("DataFrame must contain observations.")
 
     file_path = os.path.join(directory, filename)
-    dataframe.to_csv(file_path, index=index)
+    # Write under a temporary name so a crash never leaves a truncated file that looks up to date
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        if file_format == "csv" and engine == "pandas":
+            dataframe.to_csv(tmp_path, index=index, compression=compression, chunksize=chunksize)
+        else:
+            _write_arrow(dataframe, tmp_path, file_format, compression, index, chunksize)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,95 @@
+import pytest
+import os
+import sys
+import pickle
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.batch_scoring import score_file
+
+@pytest.fixture
+def pipeline_path():
+    return "results/models/pipeline.pickle"
+
+@pytest.fixture
+def loans():
+    return pd.read_csv("data/processed/loan_test.csv").head(250)
+
+@pytest.fixture
+def expected(pipeline_path, loans):
+    pipeline = pickle.load(open(pipeline_path, "rb"))
+    return pipeline.predict_proba(loans)[:, 1], pipeline.predict(loans)
+
+def _read(path):
+    return pd.read_parquet(path) if str(path).endswith(".parquet") else pd.read_csv(path)
+
+# Test chunked scoring matches scoring the whole frame, for each input/output format
+@pytest.mark.parametrize("input_name, output_name", [
+    ("loans.csv", "scores.csv"),
+    ("loans.parquet", "scores.parquet"),
+])
+def test_score_file(pipeline_path, loans, expected, tmp_path, input_name, output_name):
+    data_from = str(tmp_path / input_name)
+    data_to = str(tmp_path / output_name)
+    if input_name.endswith(".parquet"):
+        loans.to_parquet(data_from, index=False)
+    else:
+        loans.to_csv(data_from, index=False)
+
+    stats = score_file(pipeline_path, data_from, data_to, chunksize=60, keep_columns=["fico"])
+    scores = _read(data_to)
+
+    assert stats["rows"] == len(loans)
+    assert stats["rows_per_second"] > 0
+    assert list(scores.columns) == ["fico", "probability", "prediction"]
+    np.testing.assert_allclose(scores["probability"], expected[0])
+    np.testing.assert_array_equal(scores["prediction"], expected[1])
+    np.testing.assert_array_equal(scores["fico"], loans["fico"])
+
+# Test chunks fanned out to worker processes come back in input order
+def test_score_file_workers(pipeline_path, loans, expected, tmp_path):
+    data_from = str(tmp_path / "loans.csv")
+    loans.to_csv(data_from, index=False)
+
+    score_file(pipeline_path, data_from, str(tmp_path / "scores.csv"), chunksize=40, n_jobs=2)
+    scores = pd.read_csv(tmp_path / "scores.csv")
+
+    np.testing.assert_allclose(scores["probability"], expected[0])
+    np.testing.assert_array_equal(scores["prediction"], expected[1])
+
+# Test a failed run leaves no partial output behind
+def test_score_file_failure(pipeline_path, loans, tmp_path):
+    data_from = str(tmp_path / "loans.csv")
+    loans.drop(columns=["fico"]).to_csv(data_from, index=False)
+
+    with pytest.raises(ValueError):
+        score_file(pipeline_path, data_from, str(tmp_path / "scores.csv"), chunksize=60)
+    assert os.listdir(tmp_path) == ["loans.csv"]
+
+# Test an input without rows gives an output with the header only
+@pytest.mark.parametrize("input_name, output_name", [
+    ("loans.csv", "scores.csv"),
+    ("loans.parquet", "scores.parquet"),
+])
+def test_score_file_empty(pipeline_path, loans, tmp_path, input_name, output_name):
+    data_from = str(tmp_path / input_name)
+    if input_name.endswith(".parquet"):
+        loans.head(0).to_parquet(data_from, index=False)
+    else:
+        loans.head(0).to_csv(data_from, index=False)
+
+    stats = score_file(pipeline_path, data_from, str(tmp_path / output_name), keep_columns=["fico"])
+    scores = _read(tmp_path / output_name)
+    assert stats["rows"] == 0 and len(scores) == 0
+    assert list(scores.columns) == ["fico", "probability", "prediction"]
+
+# Test a kept column whose dtype read_csv infers differently between chunks is written to one Parquet schema
+def test_score_file_chunk_dtypes(pipeline_path, loans, tmp_path):
+    data_from = str(tmp_path / "loans.csv")
+    loans.assign(loan_id=pd.array(list(range(200)) + [None] * 50, dtype="Int64")).to_csv(data_from, index=False)
+
+    score_file(pipeline_path, data_from, str(tmp_path / "scores.parquet"), chunksize=200, keep_columns=["loan_id"])
+    scores = pd.read_parquet(tmp_path / "scores.parquet")
+    assert len(scores) == len(loans)
+    assert scores["loan_id"].head(200).tolist() == list(range(200))
+    assert scores["loan_id"].tail(50).isna().all()
@@ -0,0 +1,58 @@
+import pytest
+import os
+import sys
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.benchmark import synthetic_loans, run_function_benchmarks, run_stage_benchmarks, \
+    save_results, load_results, compare_results
+from src.data_validation import validate
+
+# Test the synthetic data keeps the raw columns and passes validation
+def test_synthetic_loans():
+    data = synthetic_loans(3000, seed=1)
+    raw = pd.read_csv("data/raw/loan_data.csv")
+    assert len(data) == 3000
+    assert list(data.columns) == list(raw.columns)
+    pd.testing.assert_series_equal(data.dtypes, raw.dtypes)
+    validate(data)
+    pd.testing.assert_frame_equal(data, synthetic_loans(3000, seed=1))
+
+def test_function_benchmarks():
+    results = run_function_benchmarks([500, 1000], names=["validate", "add_risk_categories"], repeat=1)
+    assert [(r["name"], r["n_rows"]) for r in results] == [
+        ("validate", 500), ("add_risk_categories", 500), ("validate", 1000), ("add_risk_categories", 1000)]
+    for record in results:
+        assert record["status"] == "ok"
+        assert record["seconds"] > 0 and record["peak_memory_mb"] > 0
+        assert record["rows_per_second"] == pytest.approx(record["n_rows"] / record["seconds"])
+
+# Test sizes projected to exceed the time budget are skipped
+def test_function_benchmarks_budget():
+    results = run_function_benchmarks([500, 10**9], names=["add_risk_categories"], repeat=1, budget=1)
+    assert [r["status"] for r in results] == ["ok", "skipped"]
+
+def test_stage_benchmarks(tmp_path):
+    results = run_stage_benchmarks([500], stages=["split_validation"], workdir=str(tmp_path))
+    assert len(results) == 1 and results[0]["status"] == "ok"
+    assert results[0]["peak_memory_mb"] > 0
+    assert os.path.exists(tmp_path / "rows_500" / "processed" / "loan_train.csv")
+
+# Test a stage whose inputs are missing is reported, and stages after it are skipped
+def test_stage_benchmarks_failure(tmp_path):
+    results = run_stage_benchmarks([500], stages=["model_tuning", "model_evaluation"], workdir=str(tmp_path))
+    assert [r["status"] for r in results] == ["failed", "skipped"]
+
+def test_compare_results(tmp_path):
+    baseline = [{"name": "validate", "kind": "function", "n_rows": 10, "status": "ok",
+                 "seconds": 1.0, "rows_per_second": 10.0, "peak_memory_mb": 5.0},
+                {"name": "write_csv", "kind": "function", "n_rows": 10, "status": "ok",
+                 "seconds": 1.0, "rows_per_second": 10.0, "peak_memory_mb": 5.0}]
+    save_results(baseline, str(tmp_path / "baseline.json"))
+    assert load_results(str(tmp_path / "baseline.json")) == baseline
+
+    results = [dict(baseline[0], seconds=1.1), dict(baseline[1], seconds=2.0),
+               dict(baseline[0], n_rows=100, seconds=9.0)]
+    comparison = compare_results(results, baseline, tolerance=0.25)
+    assert comparison["name"].tolist() == ["validate", "write_csv"]
+    assert comparison["regression"].tolist() == [False, True]
+    assert comparison["time_ratio"].tolist() == pytest.approx([1.1, 2.0])
@@ -0,0 +1,60 @@
+import pytest
+import os
+import sys
+import numpy as np
+from sklearn import metrics
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.bootstrap import bootstrap_metrics, _bootstrap_block, METRICS
+
+@pytest.fixture
+def scores():
+    rng = np.random.default_rng(0)
+    y_prob = rng.beta(2, 6, 1500).round(3)
+    y_true = (rng.random(1500) < y_prob).astype(int)
+    return y_true, y_prob
+
+def test_bootstrap_estimates(scores):
+    y_true, y_prob = scores
+    intervals = bootstrap_metrics(y_true, y_prob, n_replicates=500, n_jobs=1).set_index("metric")
+    tn, fp, fn, tp = metrics.confusion_matrix(y_true, y_prob > 0.5).ravel()
+
+    assert list(intervals.index) == METRICS
+    assert intervals.loc["accuracy", "estimate"] == metrics.accuracy_score(y_true, y_prob > 0.5)
+    assert intervals.loc["roc_auc", "estimate"] == pytest.approx(metrics.roc_auc_score(y_true, y_prob))
+    assert intervals.loc["pr_auc", "estimate"] == pytest.approx(metrics.average_precision_score(y_true, y_prob))
+    assert intervals.loc["recall", "estimate"] == metrics.recall_score(y_true, y_prob > 0.5)
+    assert intervals.loc[["tp", "fp", "fn", "tn"], "estimate"].tolist() == [tp, fp, fn, tn]
+    assert (intervals["lower"] <= intervals["estimate"]).all() and (intervals["estimate"] <= intervals["upper"]).all()
+
+# Test each weighted replicate scores like the metrics of the explicitly resampled loans
+def test_bootstrap_replicates_match_resamples(scores):
+    y_true, y_prob = scores
+    seed = np.random.SeedSequence(5)
+    order = np.argsort(-y_prob, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(y_prob[order]) != 0])
+    cells = np.eye(4)[2 * y_true + (y_prob > 0.5)]
+    replicates = _bootstrap_block(seed, 3, cells, order, starts, y_true[order].astype(float))
+
+    rng = np.random.default_rng(seed)
+    for replicate, resample in zip(replicates, rng.integers(0, len(y_true), size=(3, len(y_true)))):
+        y, p = y_true[resample], y_prob[resample]
+        assert replicate[1] == pytest.approx(metrics.roc_auc_score(y, p))
+        assert replicate[2] == pytest.approx(metrics.average_precision_score(y, p))
+        assert replicate[0] == pytest.approx(metrics.accuracy_score(y, p > 0.5))
+
+# Test the intervals depend on the seed only, not on the number of processes
+def test_bootstrap_reproducible(scores):
+    y_true, y_prob = scores
+    serial = bootstrap_metrics(y_true, y_prob, n_replicates=300, block_size=70, n_jobs=1)
+    parallel = bootstrap_metrics(y_true, y_prob, n_replicates=300, block_size=70, n_jobs=2)
+    assert serial.equals(parallel)
+    assert not serial.equals(bootstrap_metrics(y_true, y_prob, n_replicates=300, block_size=70, n_jobs=1, random_state=1))
+
+def test_bootstrap_invalid(scores):
+    y_true, y_prob = scores
+    with pytest.raises(ValueError):
+        bootstrap_metrics([], [])
+    with pytest.raises(ValueError):
+        bootstrap_metrics(y_true[1:], y_prob)
+    with pytest.raises(ValueError):
+        bootstrap_metrics(y_true, y_prob, confidence=95)
@@ -0,0 +1,47 @@
+import pytest
+import os
+import sys
+import subprocess
+import importlib.util
+import pandas as pd
+from click.testing import CliRunner
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+CLI_PATH = os.path.join(os.path.dirname(__file__), '..', 'scripts', 'cli.py')
+spec = importlib.util.spec_from_file_location("cli", CLI_PATH)
+cli = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(cli)
+
+# Packages no stage may import before it starts working
+HEAVY = {"numpy", "pandas", "scipy", "sklearn", "pandera", "pyarrow", "altair", "matplotlib", "vegafusion"}
+# Import time allowed for starting any stage (click itself takes about 0.05s)
+IMPORT_BUDGET_SECONDS = 0.5
+
+def _imports(*args):
+    '''Run the CLI under `-X importtime`; return the top-level packages imported and their total time.'''
+    result = subprocess.run([sys.executable, "-X", "importtime", CLI_PATH, *args], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    timings = [line.split("|") for line in result.stderr.splitlines() if line.startswith("import time:")][1:]
+    packages = {name.strip().split(".")[0] for _, _, name in timings}
+    return packages, sum(int(self_us.split(":")[1]) for self_us, _, _ in timings) / 1e6
+
+@pytest.mark.parametrize("args", [["--help"]] + [[stage, "--help"] for stage in cli.STAGES if stage != "benchmark"])
+def test_startup_import_budget(args):
+    packages, seconds = _imports(*args)
+    assert not packages & HEAVY
+    assert seconds < IMPORT_BUDGET_SECONDS
+
+def test_every_script_is_a_stage():
+    scripts = {name[:-3] for name in os.listdir(os.path.dirname(CLI_PATH)) if name.endswith(".py")}
+    assert set(cli.STAGES) == scripts - {"cli"}
+
+def test_unknown_stage():
+    result = CliRunner().invoke(cli.cli, ["train"])
+    assert result.exit_code != 0 and "No such command" in result.output
+
+def test_run_stage(tmp_path):
+    result = CliRunner().invoke(cli.cli, ["split_validation", "--data_from=data/raw/loan_data.csv",
+                                          f"--data_to={tmp_path}"])
+    assert result.exit_code == 0, result.output
+    for name in ["loan_train.csv", "loan_test.csv"]:
+        pd.testing.assert_frame_equal(pd.read_csv(tmp_path / name), pd.read_csv(f"data/processed/{name}"))
@@ -0,0 +1,77 @@
+import pytest
+import os
+import sys
+import json
+import pickle
+import threading
+import urllib.request
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.compiled_scorer import CompiledLinearScorer, latency_benchmark
+from src.scoring_service import make_server
+
+@pytest.fixture
+def pipeline():
+    return pickle.load(open("results/models/pipeline.pickle", "rb"))
+
+@pytest.fixture
+def scorer(pipeline):
+    return CompiledLinearScorer.from_pipeline(pipeline)
+
+@pytest.fixture
+def loans():
+    loans = pd.read_csv("data/processed/loan_test.csv").drop(columns="not.fully.paid").head(300)
+    # Missing values and unseen categories go through the imputers and the encoder
+    loans.loc[::5, "dti"] = np.nan
+    loans.loc[::7, "purpose"] = np.nan
+    loans.loc[::11, "purpose"] = "unseen_purpose"
+    return loans
+
+# Test the vectorized scorer matches the sklearn pipeline
+def test_compiled_batch_matches_pipeline(pipeline, scorer, loans):
+    np.testing.assert_allclose(scorer.predict_proba(loans), pipeline.predict_proba(loans), rtol=1e-12, atol=1e-15)
+    np.testing.assert_array_equal(scorer.predict(loans), pipeline.predict(loans))
+
+# Test single-loan scoring matches the sklearn pipeline
+def test_compiled_one_matches_pipeline(pipeline, scorer, loans):
+    scores = [scorer.score_one(loan) for loan in loans.to_dict("records")]
+    np.testing.assert_allclose([p for p, _ in scores], pipeline.predict_proba(loans)[:, 1], rtol=1e-12, atol=1e-15)
+    np.testing.assert_array_equal([label for _, label in scores], pipeline.predict(loans))
+    # Absent features are imputed like NaN
+    assert scorer.score_one({"fico": 700}) == scorer.score_one({"fico": 700, "dti": None, "purpose": None})
+
+# Test pipelines with steps that cannot be folded are rejected
+def test_compiled_unsupported_step(pipeline):
+    unsupported = pickle.loads(pickle.dumps(pipeline.best_estimator_))
+    unsupported.named_steps["preprocessor"].transformers_[0][1].steps[0][1].add_indicator = True
+    with pytest.raises(ValueError, match="Cannot compile"):
+        CompiledLinearScorer.from_pipeline(unsupported)
+
+def test_latency_benchmark(scorer, loans):
+    latency = latency_benchmark(scorer.score_one, loans.to_dict("records"), n_calls=500)
+    assert set(latency) == {"p50_us", "p99_us", "mean_us"}
+    assert 0 < latency["p50_us"] <= latency["p99_us"]
+
+# Test the HTTP service on localhost
+def test_scoring_service(scorer, loans):
+    server = make_server(scorer, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    loan = loans.iloc[0].to_dict()
+    loan = {key: (None if isinstance(value, float) and np.isnan(value) else value) for key, value in loan.items()}
+
+    def post(body):
+        request = urllib.request.Request(f"{url}/score", data=body.encode(), method="POST")
+        return json.loads(urllib.request.urlopen(request).read())
+
+    try:
+        assert json.loads(urllib.request.urlopen(f"{url}/health").read()) == {"status": "ok"}
+        probability, prediction = scorer.score_one(loan)
+        assert post(json.dumps(loan)) == {"probability": probability, "prediction": int(prediction)}
+        assert len(post(json.dumps([loan, loan]))) == 2
+        with pytest.raises(urllib.error.HTTPError, match="400"):
+            post("not json")
+    finally:
+        server.shutdown()
+        server.server_close()
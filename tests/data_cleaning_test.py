@@ -9,9 +9,13 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 # Import the functions from src.data_cleaning
 from src.data_cleaning import (
     handle_missing_values,
+    MissingValueImputer,
     add_loan_categories,
     add_loan_income_ratio,
-    add_risk_categories
+    add_risk_categories,
+    LoanFeatureEngineer,
+    LOAN_CATEGORIES,
+    RISK_CATEGORIES
 )
 
 # Sample DataFrame fixture for testing
@@ -62,6 +66,38 @@ def test_handle_missing_values_drop(sample_dataframe):
     # Assert that the number of rows is 3 (two rows should be dropped)
     assert result.shape[0] == 3 
 
+# Test MissingValueImputer fills new data with the statistics learned at fit time
+def test_missing_value_imputer_reuses_statistics(sample_dataframe):
+    imputer = MissingValueImputer(strategy='mean').fit(sample_dataframe)
+    new = pd.DataFrame({"fico_score": [None, 800.0], "monthly_installment": [1, 2],
+                        "annual_income": [1, 2], "missing_values": [None, 100.0]})
+    result = imputer.transform(new)
+
+    assert imputer.columns_ == list(sample_dataframe.columns)
+    assert result["missing_values"].tolist() == pytest.approx([11 / 3, 100])
+    assert result["fico_score"].iloc[0] == pytest.approx(655)
+    assert result["monthly_installment"].dtype == np.int64
+    assert new["missing_values"].isna().sum() == 1
+
+def test_missing_value_imputer_in_place(sample_dataframe, capsys):
+    result = handle_missing_values(sample_dataframe, strategy='median')
+    assert result is sample_dataframe
+    assert sample_dataframe.isna().sum().sum() == 0
+    assert capsys.readouterr().out == ""
+
+# Test nullable columns are filled with a value of their own dtype
+def test_missing_value_imputer_nullable_dtypes():
+    df = pd.DataFrame({"count": pd.array([1, None, 2, 2], dtype="Int64"),
+                       "rate": pd.array([0.5, None, 1.0, 1.5], dtype="Float64")})
+    result = MissingValueImputer(strategy='mean', columns=["count", "rate"]).fit_transform(df)
+
+    assert result["count"].tolist() == [1, 2, 2, 2] and result["count"].dtype == "Int64"
+    assert result["rate"].tolist() == [0.5, 1.0, 1.0, 1.5] and result["rate"].dtype == "Float64"
+
+def test_missing_value_imputer_invalid_strategy(sample_dataframe):
+    with pytest.raises(ValueError):
+        MissingValueImputer(strategy='mode').fit(sample_dataframe)
+
 
     
 
@@ -70,3 +106,62 @@ def test_add_loan_categories(sample_dataframe):
     result = add_loan_categories(sample_dataframe, fico_column='fico_score')
     expected_categories = ['Super-prime', 'Prime', 'Near-prime', 'Subprime', 'Unknown']
     
+
+
+# Test LoanFeatureEngineer matches the separate functions, including bin edges and missing scores
+@pytest.fixture
+def loans():
+    fico = [750, 720, 719.5, 660, 659, 650, 649, 620, 619, 580, 579, None]
+    return pd.DataFrame({
+        "fico": fico,
+        "installment": np.linspace(100, 900, len(fico)),
+        "log.annual.inc": np.log(np.linspace(30000, 90000, len(fico))),
+    })
+
+def test_loan_feature_engineer(loans):
+    expected = loans.copy()
+    expected["annual.inc"] = np.exp(expected["log.annual.inc"])
+    expected = add_loan_income_ratio(expected, installment_column="installment", income_column="annual.inc")
+    expected = add_risk_categories(add_loan_categories(expected, fico_column="fico"), fico_column="fico")
+
+    result = LoanFeatureEngineer().fit_transform(loans)
+
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(result.astype({"loan_categories": object, "risk_category": object}), expected)
+    assert result["loan_categories"].dtype == LOAN_CATEGORIES
+    assert result["risk_category"].dtype == RISK_CATEGORIES
+    assert list(LoanFeatureEngineer().fit(loans).get_feature_names_out()) == list(result.columns)
+
+# Test the input is neither modified nor copied
+def test_loan_feature_engineer_no_copy(loans):
+    original = loans.copy()
+    result = LoanFeatureEngineer().fit_transform(loans)
+
+    pd.testing.assert_frame_equal(loans, original)
+    assert np.shares_memory(result["installment"].to_numpy(), loans["installment"].to_numpy())
+    # Transforming its own output replaces the engineered columns
+    pd.testing.assert_frame_equal(LoanFeatureEngineer().fit_transform(result), result)
+
+def test_loan_feature_engineer_out(loans):
+    out = {"loan_income_ratio": np.empty(len(loans)), "risk_category": np.empty(len(loans), dtype=np.int8)}
+    features = LoanFeatureEngineer().fit(loans).compute(loans, out=out)
+
+    assert features["loan_income_ratio"] is out["loan_income_ratio"]
+    assert features["risk_category"] is out["risk_category"]
+    assert out["risk_category"].tolist() == [0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 2, 3]
+    assert features["loan_categories"].dtype == np.int8
+
+# Test the transformer can sit in front of a model in a Pipeline
+def test_loan_feature_engineer_pipeline(loans):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+
+    X, y = loans.fillna({"fico": 700}), [0, 1] * 6
+    pipeline = Pipeline([
+        ("features", LoanFeatureEngineer()),
+        ("encode", ColumnTransformer([("cat", OneHotEncoder(), ["loan_categories", "risk_category"])], remainder="passthrough")),
+        ("model", LogisticRegression()),
+    ]).fit(X, y)
+    assert pipeline.predict_proba(X).shape == (len(X), 2)
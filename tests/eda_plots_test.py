@@ -0,0 +1,109 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+import altair as alt
+import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.eda_plots import histogram_bins, plot_histogram_grid, count_table, sort_by_count, boxplot_summary, \
+    boxplot_chart, save_chart, MAX_OUTLIER_COPIES
+
+@pytest.fixture
+def loans():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        "not.fully.paid": rng.integers(0, 2, 2000),
+        "purpose": rng.choice(["credit_card", "educational", "all_other"], 2000),
+        "fico": rng.normal(700, 30, 2000).round(),
+        "dti": rng.gamma(2, 5, 2000).round(2),
+    })
+    data.loc[::97, "dti"] = np.nan
+    return data
+
+# Test each class is binned over its own range, like pandas' groupby histogram
+def test_histogram_bins(loans):
+    histograms = histogram_bins(loans, ["fico", "dti"], by="not.fully.paid", bins=40)
+
+    assert list(histograms) == ["fico", "dti"]
+    for feat, classes in histograms.items():
+        assert [label for label, _, _ in classes] == [0, 1]
+        for label, counts, edges in classes:
+            values = loans.loc[loans["not.fully.paid"] == label, feat].dropna()
+            assert len(counts) == 40 and counts.sum() == len(values)
+            assert edges[0] == values.min() and edges[-1] == values.max()
+
+def test_plot_histogram_grid(loans, tmp_path):
+    plot_histogram_grid(histogram_bins(loans, ["fico", "dti"], by="not.fully.paid"), str(tmp_path / "grid.png"))
+    assert plt.imread(tmp_path / "grid.png").shape == (500, 1500, 4)
+
+def test_count_table(loans):
+    counts = count_table(loans, ["purpose", "not.fully.paid"])
+    expected = loans.groupby(["purpose", "not.fully.paid"]).size()
+
+    assert counts[["purpose", "not.fully.paid"]].iloc[0].tolist() == loans[["purpose", "not.fully.paid"]].iloc[0].tolist()
+    assert counts.set_index(["purpose", "not.fully.paid"])["count"].sort_index().equals(expected)
+
+def test_sort_by_count():
+    counts = pd.DataFrame({"purpose": ["b", "a", "c", "a"], "grade": ["x", "x", "y", "y"], "count": [5, 1, 3, 2]})
+    assert sort_by_count(counts, "purpose") == ["a", "c", "b"]
+    assert sort_by_count(counts, "purpose", descending=True) == ["b", "a", "c"]
+    assert sort_by_count(counts, "grade", descending=True) == ["x", "y"]
+
+# Test a chart of the counts renders exactly like a count() chart of every row, and its size
+# does not grow with the rows
+def test_count_chart(loans, tmp_path):
+    def chart(data):
+        counts = count_table(data, ["purpose", "not.fully.paid"])
+        return alt.Chart(counts).mark_circle().encode(
+            x=alt.X("not.fully.paid:N", sort=sort_by_count(counts, "not.fully.paid", descending=True)),
+            y=alt.Y("purpose:N", sort=sort_by_count(counts, "purpose")),
+            color=alt.Color("sum(count):Q", title="Count"), size=alt.Size("sum(count):Q", title="Count"))
+    row_level = alt.Chart(loans).mark_circle().encode(
+        x=alt.X("not.fully.paid:N", sort="-color"), y=alt.Y("purpose:N", sort="color"),
+        color=alt.Color("count()", title="Count"), size=alt.Size("count()", title="Count"))
+
+    save_chart(row_level, str(tmp_path / "row_level.png"))
+    save_chart(chart(loans), str(tmp_path / "counts.png"))
+    np.testing.assert_array_equal(plt.imread(tmp_path / "row_level.png"), plt.imread(tmp_path / "counts.png"))
+    with alt.data_transformers.enable("default"):
+        assert len(chart(pd.concat([loans] * 50).sample(frac=1, random_state=0)).to_json()) == \
+            pytest.approx(len(chart(loans).to_json()), abs=20)
+
+# Test the boxplot statistics follow Vega-Lite's definitions
+def test_boxplot_summary(loans):
+    loans.loc[:5, "fico"] = 400
+    boxes, outliers = boxplot_summary(loans, "fico", by="purpose")
+
+    assert boxes["purpose"].tolist() == ["all_other", "credit_card", "educational"]
+    for _, box in boxes.iterrows():
+        values = loans.loc[loans["purpose"] == box["purpose"], "fico"]
+        q1, q3 = values.quantile([0.25, 0.75])
+        inside = values.between(q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1))
+        assert box[["q1", "median", "q3"]].tolist() == pytest.approx(values.quantile([0.25, 0.5, 0.75]).tolist())
+        assert box["lower_whisker"] == values[inside].min() and box["upper_whisker"] == values[inside].max()
+        assert sorted(outliers.loc[outliers["purpose"] == box["purpose"], "fico"]) == sorted(values[~inside])
+    assert 400 in outliers["fico"].tolist()
+
+def test_boxplot_summary_caps_repeated_outliers():
+    data = pd.DataFrame({"group": "a", "value": [0.0] * 1000 + [1.0] * 1000 + [50.0] * 500})
+    _, outliers = boxplot_summary(data, "value", by="group")
+    assert outliers["value"].tolist() == [50.0] * MAX_OUTLIER_COPIES
+
+# Test the chart drawn from the summary renders exactly like mark_boxplot on every row,
+# including outliers repeated more often than the summary keeps them
+def test_boxplot_chart(loans, tmp_path):
+    repeated = pd.DataFrame({"purpose": ["credit_card", "educational"] * 2 * MAX_OUTLIER_COPIES, "dti": 60.0})
+    data = pd.concat([loans] * 5 + [repeated], ignore_index=True)
+    row_level = alt.Chart(data).mark_boxplot().encode(
+        y=alt.Y('purpose:N', title='Loan Purpose'),
+        x=alt.X('dti:Q', title='DTI', scale=alt.Scale(domain=[0, 70])),
+        color=alt.Color('purpose:N', legend=None),
+    ).properties(width=400, height=200)
+    boxes, outliers = boxplot_summary(data, "dti", by="purpose")
+    summarised = boxplot_chart(boxes, outliers, "dti", "purpose", x_title="DTI", y_title="Loan Purpose", domain=[0, 70])
+
+    assert (outliers["dti"] == 60).sum() == 2 * MAX_OUTLIER_COPIES
+    save_chart(row_level, str(tmp_path / "row_level.png"))
+    save_chart(summarised, str(tmp_path / "summarised.png"))
+    np.testing.assert_array_equal(plt.imread(tmp_path / "row_level.png"), plt.imread(tmp_path / "summarised.png"))
@@ -0,0 +1,87 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+from sklearn import metrics
+from sklearn.calibration import calibration_curve
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.evaluation import BinaryMetrics, evaluate_file
+
+@pytest.fixture
+def scores():
+    rng = np.random.default_rng(0)
+    # Rounded so many loans share a score
+    y_prob = rng.beta(2, 8, 20_000).round(3)
+    y_true = (rng.random(20_000) < y_prob).astype(int)
+    return y_true, y_prob
+
+# Test the metrics accumulated over chunks match scikit-learn's on all rows
+def test_binary_metrics(scores):
+    y_true, y_prob = scores
+    accumulated = BinaryMetrics()
+    for start in range(0, len(y_true), 3000):
+        accumulated.update(y_true[start:start + 3000], y_prob[start:start + 3000])
+    summary = accumulated.summary()
+
+    assert summary["n"] == len(y_true)
+    assert summary["accuracy"] == metrics.accuracy_score(y_true, y_prob > 0.5)
+    assert summary["roc_auc"] == pytest.approx(metrics.roc_auc_score(y_true, y_prob))
+    assert summary["pr_auc"] == pytest.approx(metrics.average_precision_score(y_true, y_prob))
+    assert summary["log_loss"] == pytest.approx(metrics.log_loss(y_true, y_prob))
+    assert summary["brier_score"] == pytest.approx(metrics.brier_score_loss(y_true, y_prob))
+    np.testing.assert_array_equal(accumulated.confusion, metrics.confusion_matrix(y_true, y_prob > 0.5))
+
+def test_threshold_and_calibration_tables(scores):
+    y_true, y_prob = scores
+    accumulated = BinaryMetrics(threshold=0.3).update(y_true, y_prob)
+    sweep = accumulated.threshold_table()
+    fpr, tpr, thresholds = metrics.roc_curve(y_true, y_prob, drop_intermediate=False)
+
+    np.testing.assert_allclose(sweep["threshold"], thresholds[1:])
+    np.testing.assert_allclose(sweep["fpr"], fpr[1:])
+    np.testing.assert_allclose(sweep["recall"], tpr[1:])
+    at_threshold = sweep[sweep["threshold"] > 0.3].iloc[-1]
+    assert [[at_threshold["tn"], at_threshold["fp"]], [at_threshold["fn"], at_threshold["tp"]]] == \
+        accumulated.confusion.tolist()
+
+    prob_true, prob_pred = calibration_curve(y_true, y_prob, n_bins=10)
+    calibration = accumulated.calibration_table()
+    np.testing.assert_allclose(calibration["fraction_positive"], prob_true)
+    np.testing.assert_allclose(calibration["mean_predicted"], prob_pred)
+    assert calibration["count"].sum() == len(y_true)
+
+# Test scores counted on a grid give the exact metrics when no bin splits a score, and merge
+def test_binary_metrics_resolution(scores):
+    y_true, y_prob = scores
+    exact = BinaryMetrics().update(y_true, y_prob)
+    gridded = BinaryMetrics(resolution=10_000).update(y_true[:5000], y_prob[:5000])
+    gridded.merge(BinaryMetrics(resolution=10_000).update(y_true[5000:], y_prob[5000:]))
+
+    assert gridded.summary() == pytest.approx(exact.summary())
+    # A bin's threshold is its lower edge
+    pd.testing.assert_frame_equal(gridded.threshold_table(), exact.threshold_table(), check_exact=False, atol=1e-4)
+    assert BinaryMetrics(resolution=10).update(y_true, y_prob).summary()["roc_auc"] == \
+        pytest.approx(exact.summary()["roc_auc"], abs=0.02)
+
+def test_binary_metrics_invalid(scores):
+    y_true, y_prob = scores
+    with pytest.raises(ValueError):
+        BinaryMetrics().update(y_true + 1, y_prob)
+    with pytest.raises(ValueError):
+        BinaryMetrics().update(y_true, y_prob * 2)
+    with pytest.raises(ValueError):
+        BinaryMetrics().update(y_true[1:], y_prob)
+    with pytest.raises(ValueError):
+        BinaryMetrics().merge(BinaryMetrics(resolution=100))
+    assert np.isnan(BinaryMetrics().update([0, 0], [0.2, 0.4]).summary()["roc_auc"])
+
+def test_evaluate_file(scores, tmp_path):
+    y_true, y_prob = scores
+    pd.DataFrame({"not.fully.paid": y_true, "probability": y_prob}).to_parquet(tmp_path / "scores.parquet")
+    evaluated = evaluate_file(str(tmp_path / "scores.parquet"), chunksize=7000)
+    assert evaluated.summary() == pytest.approx(BinaryMetrics().update(y_true, y_prob).summary())
+
+    pd.DataFrame({"not.fully.paid": [], "probability": []}).to_csv(tmp_path / "empty.csv", index=False)
+    with pytest.raises(ValueError):
+        evaluate_file(str(tmp_path / "empty.csv"))
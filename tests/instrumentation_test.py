@@ -0,0 +1,68 @@
+import pytest
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src import instrumentation
+from src.instrumentation import instrument, span, set_metrics_dir
+
+@instrument
+def _allocate(data):
+    return np.ones((len(data), 100_000 // len(data) * 10))
+
+@instrument(name="script", report=True)
+def _script(data, fail=False):
+    with span("load") as s:
+        s.rows = 7
+    _allocate(data)
+    if fail:
+        raise RuntimeError("failed")
+    return "done"
+
+@pytest.fixture
+def metrics_dir(tmp_path):
+    set_metrics_dir(str(tmp_path / "metrics"))
+    yield tmp_path / "metrics"
+    set_metrics_dir(None)
+
+def _report(directory):
+    [path] = os.listdir(directory)
+    assert path.startswith("script-") and path.endswith(f"-{os.getpid()}.json")
+    with open(directory / path) as f:
+        return json.load(f)
+
+def test_instrumentation_disabled(tmp_path):
+    set_metrics_dir(None)
+    assert _script(pd.DataFrame({"a": range(100)})) == "done"
+    assert instrumentation._finished == [] and instrumentation._open_spans == []
+
+# Test a script run writes every nested span, with the memory of children counted in their parents
+def test_instrumentation_report(metrics_dir):
+    assert _script(pd.DataFrame({"a": range(100)})) == "done"
+    report = _report(metrics_dir)
+    script, load, allocate = report["spans"]
+
+    assert [s["name"] for s in report["spans"]] == ["script", "load", "instrumentation_test._allocate"]
+    assert [s["depth"] for s in report["spans"]] == [0, 1, 1]
+    assert load["rows"] == 7 and allocate["rows"] == 100 and script["rows"] == 100
+    assert allocate["rows_per_second"] == pytest.approx(100 / allocate["wall_seconds"])
+    assert allocate["peak_memory_mb"] >= 100_000 * 10 * 8 / 2 ** 20
+    assert script["peak_memory_mb"] >= allocate["peak_memory_mb"]
+    assert script["wall_seconds"] >= allocate["wall_seconds"] + load["wall_seconds"]
+    assert all(s["error"] is None and s["cpu_seconds"] >= 0 for s in report["spans"])
+    assert instrumentation._finished == [] and instrumentation._open_spans == []
+
+def test_instrumentation_error(metrics_dir):
+    with pytest.raises(RuntimeError):
+        _script(pd.DataFrame({"a": range(100)}), fail=True)
+    assert _report(metrics_dir)["spans"][0]["error"] == "RuntimeError"
+
+def test_instrumentation_without_memory(tmp_path):
+    set_metrics_dir(str(tmp_path), trace_memory=False)
+    try:
+        _script(pd.DataFrame({"a": range(100)}))
+    finally:
+        set_metrics_dir(None)
+    assert all(s["peak_memory_mb"] is None for s in _report(tmp_path)["spans"])
@@ -6,7 +6,8 @@ import pandas as pd
 import pickle
 from sklearn.dummy import DummyClassifier
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.model_cv import model_cross_val
+from src.model_cv import FoldCache, model_cross_val, parallel_model_cross_val
+from sklearn.linear_model import LogisticRegression
 import math
 from sklearn.pipeline import Pipeline
 from sklearn.model_selection import cross_validate
@@ -78,3 +79,30 @@ def test_cv_output(valid_model, test_data):
 
 
 
+# Test the fold cache gives the same scores as refitting the pipeline per fold
+@pytest.mark.parametrize("model", [DummyClassifier(), LogisticRegression(random_state=123)])
+def test_fold_cache_scores(valid_model, test_data, model):
+    expected = model_cross_val(model, valid_model, *test_data)
+    cached = model_cross_val(model, valid_model, *test_data, fold_cache=FoldCache())
+    assert list(cached.keys()) == list(expected.keys())
+    assert cached['test_score'] == expected['test_score']
+    assert cached['train_score'] == expected['train_score']
+
+# Test the preprocessed folds are computed once and shared across models
+def test_fold_cache_reuse(valid_model, test_data):
+    cache = FoldCache()
+    model_cross_val(DummyClassifier(), valid_model, *test_data, fold_cache=cache)
+    folds = cache.folds(valid_model, *test_data)
+    model_cross_val(LogisticRegression(), valid_model, *test_data, fold_cache=cache)
+    assert cache.folds(valid_model, *test_data) is folds
+    assert len(folds) == 10
+
+# Test the parallel (model, fold) engine gives the same scores as model_cross_val
+def test_parallel_model_cross_val(valid_model, test_data):
+    models = {"Dummy": DummyClassifier(), "Logistic Regression": LogisticRegression(random_state=123)}
+    results = parallel_model_cross_val(models, valid_model, *test_data, n_jobs=2)
+    assert list(results.keys()) == list(models.keys())
+    for (name, model) in models.items():
+        expected = model_cross_val(model, valid_model, *test_data)
+        assert results[name]['test_score'] == expected['test_score']
+        assert results[name]['train_score'] == expected['train_score']
@@ -0,0 +1,111 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pickle
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV
+from sklearn.pipeline import Pipeline
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from sklearn.linear_model import SGDClassifier
+from src.preprocessing import load_preprocessor
+from src.model_tuning import TunedModel, c_path_search, halving_c_search, streaming_alpha_search
+
+# Test data setup
+@pytest.fixture
+def test_data():
+    data = pd.read_csv("data/processed/loan_train.csv")
+    data = data.sample(600, random_state=123)
+    X_mock = data.drop(columns=["not.fully.paid"])
+    y_mock = data["not.fully.paid"]
+    return [X_mock, y_mock]
+
+@pytest.fixture
+def preprocessor():
+    return "results/models/preprocessor.pickle"
+
+@pytest.fixture
+def Cs():
+    return np.logspace(-3, 3, 7)
+
+
+# Test the warm-started path gives the same cross-validation results as GridSearchCV
+def test_c_path_matches_grid_search(preprocessor, test_data, Cs):
+    search = c_path_search(preprocessor, *test_data, Cs, n_jobs=1)
+
+    grid = GridSearchCV(
+        Pipeline(steps=[
+            ('preprocessor', load_preprocessor(preprocessor).preprocessor),
+            ('LogReg', LogisticRegression(random_state=123, max_iter=20000))
+        ]),
+        param_grid={"LogReg__C": Cs},
+        cv=10,
+        return_train_score=True
+    ).fit(*test_data)
+
+    # Warm starts only move fits within the solver tolerance
+    np.testing.assert_allclose(search.cv_results_["mean_test_score"], grid.cv_results_["mean_test_score"], atol=1e-2)
+    np.testing.assert_allclose(search.cv_results_["mean_train_score"], grid.cv_results_["mean_train_score"], atol=1e-2)
+    assert search.best_params_ == grid.best_params_
+
+
+# Test the search result can stand in for a fitted GridSearchCV
+def test_tuned_model_interface(preprocessor, test_data, Cs):
+    search = c_path_search(preprocessor, *test_data, Cs, n_jobs=1)
+    X, y = test_data
+
+    assert isinstance(search, TunedModel)
+    assert search.best_estimator_.named_steps['LogReg'].C == search.best_params_["LogReg__C"]
+    np.testing.assert_array_equal(search.predict(X), search.best_estimator_.predict(X))
+    assert search.predict_proba(X).shape == (len(X), 2)
+    assert list(search.classes_) == [0, 1]
+
+    cv_results = pd.DataFrame(search.cv_results_)
+    assert {"rank_test_score", "param_LogReg__C", "mean_test_score", "mean_train_score"} <= set(cv_results.columns)
+    assert cv_results["rank_test_score"].min() == 1
+    assert search.best_score_ == cv_results["mean_test_score"].max()
+
+    # The result pickles like the GridSearchCV it replaces
+    assert pickle.loads(pickle.dumps(search)).best_params_ == search.best_params_
+
+
+# Test successive halving narrows the candidates down on growing subsamples
+def test_halving_c_search(preprocessor, test_data, Cs):
+    search = halving_c_search(preprocessor, *test_data, Cs, factor=3, n_jobs=1)
+    cv_results = pd.DataFrame(search.cv_results_)
+    X, y = test_data
+
+    last_rung = cv_results["iter"].max()
+    assert last_rung > 0
+    assert cv_results.groupby("iter")["n_resources"].first().is_monotonic_increasing
+    finalists = cv_results[cv_results["iter"] == last_rung]
+    assert (finalists["n_resources"] == len(y)).all()
+    assert len(finalists) < len(Cs)
+    assert search.best_params_["LogReg__C"] in finalists["param_LogReg__C"].tolist()
+    assert search.best_score_ == finalists["mean_test_score"].max()
+
+
+# Test the streaming sweep trains on chunks and returns a pipeline model_evaluation can read
+def test_streaming_alpha_search(preprocessor, test_data, tmp_path):
+    X, y = test_data
+    X.assign(**{"not.fully.paid": y}).to_csv(tmp_path / "train.csv", index=False)
+    alphas = [1e-1, 1e-3, 1e-5]
+    search = streaming_alpha_search(preprocessor, str(tmp_path / "train.csv"), alphas, chunksize=100, n_epochs=3)
+    cv_results = pd.DataFrame(search.cv_results_)
+
+    assert isinstance(search, TunedModel)
+    assert cv_results["param_LogReg__alpha"].tolist() == alphas
+    assert cv_results["mean_test_score"].between(0, 1).all() and cv_results["rank_test_score"].min() == 1
+    model = search.best_estimator_.named_steps['LogReg']
+    assert isinstance(model, SGDClassifier) and model.alpha == search.best_params_["LogReg__alpha"]
+    assert model.coef_.shape == (1, len(search.best_estimator_.named_steps['preprocessor'].get_feature_names_out()))
+    assert search.predict_proba(X).shape == (len(X), 2)
+
+    with pytest.raises(ValueError):
+        streaming_alpha_search(preprocessor, str(tmp_path / "train.csv"), alphas, validation_fraction=0)
+    with pytest.raises(ValueError, match="n_epochs must be at least 1"):
+        streaming_alpha_search(preprocessor, str(tmp_path / "train.csv"), alphas, n_epochs=0)
+    # One epoch over a single chunk never scores the model
+    with pytest.raises(ValueError, match="No held-out or training rows were scored"):
+        streaming_alpha_search(preprocessor, str(tmp_path / "train.csv"), alphas, chunksize=1000, n_epochs=1)
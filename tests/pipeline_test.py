@@ -0,0 +1,113 @@
+import pytest
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.pipeline import parse_makefile, run_pipeline
+
+MAKEFILE = """\
+.PHONY: all clean
+
+all : d.txt
+
+a.txt: in.txt
+	sort in.txt > a.txt
+
+# Two independent stages reading a.txt
+b.txt: a.txt
+	sleep {sleep} && \\
+		cp a.txt b.txt
+c.txt: a.txt
+	sleep {sleep} && {c_command}
+
+d.txt: b.txt c.txt
+	cat b.txt c.txt > d.txt
+
+clean :
+	rm -f a.txt b.txt c.txt d.txt
+"""
+
+def make_project(tmp_path, sleep=0, c_command="cp a.txt c.txt"):
+    (tmp_path / "Makefile").write_text(MAKEFILE.format(sleep=sleep, c_command=c_command))
+    (tmp_path / "in.txt").write_text("b\na\n")
+    return parse_makefile(str(tmp_path / "Makefile"))
+
+def statuses(report):
+    return {entry["name"]: entry["status"] for entry in report}
+
+# Test the stage graph is read from the project's Makefile
+def test_parse_project_makefile():
+    stages, default_goal = parse_makefile("Makefile")
+    by_name = {stage.name: stage for stage in stages}
+
+    assert default_goal[0] == "reports/p2p_lending_risk_analysis_report.html"
+    assert list(by_name) == ["download_data", "split_validation", "eda", "preprocessing", "model_training",
+                             "model_tuning", "model_evaluation", "p2p_lending_risk_analysis_report"]
+    assert "results/figures/param_C_tuning.png" in by_name["model_tuning"].targets
+    assert len(by_name["eda"].targets) == 7
+    assert by_name["p2p_lending_risk_analysis_report"].commands == \
+        ["quarto render reports/p2p_lending_risk_analysis_report.qmd --to html"]
+    assert by_name["split_validation"].commands == \
+        ["python scripts/split_validation.py --data_from=data/raw/loan_data.csv --data_to=data/processed"]
+
+def test_parse_makefile(tmp_path):
+    stages, default_goal = make_project(tmp_path)
+    assert default_goal == ["d.txt"]
+    assert [(stage.name, stage.targets, stage.prerequisites) for stage in stages] == \
+        [("a", ["a.txt"], ["in.txt"]), ("b", ["b.txt"], ["a.txt"]),
+         ("c", ["c.txt"], ["a.txt"]), ("d", ["d.txt"], ["b.txt", "c.txt"])]
+
+# Test unchanged stages are skipped, judged by content rather than timestamps
+def test_run_pipeline_cache(tmp_path):
+    stages, goal = make_project(tmp_path)
+    run = lambda **kwargs: statuses(run_pipeline(stages, goal, root=str(tmp_path), **kwargs))
+
+    assert run() == {"a": "ran", "b": "ran", "c": "ran", "d": "ran"}
+    assert (tmp_path / "d.txt").read_text() == "a\nb\na\nb\n"
+    assert run() == {"a": "cached", "b": "cached", "c": "cached", "d": "cached"}
+
+    # Reordering the input reruns the sort, whose unchanged output keeps everything downstream cached
+    (tmp_path / "in.txt").write_text("a\nb\n")
+    assert run() == {"a": "ran", "b": "cached", "c": "cached", "d": "cached"}
+
+    # A changed output is rebuilt
+    (tmp_path / "c.txt").write_text("edited\n")
+    assert run() == {"a": "cached", "b": "cached", "c": "ran", "d": "cached"}
+
+    assert run(force=True) == {"a": "ran", "b": "ran", "c": "ran", "d": "ran"}
+    (tmp_path / "in.txt").write_text("c\n")
+    assert set(run(dry_run=True).values()) == {"would run"}
+    assert (tmp_path / "a.txt").read_text() == "a\nb\n"
+
+# Test only the stages a goal needs run, and a stage name works as a goal
+def test_run_pipeline_goals(tmp_path):
+    stages, _ = make_project(tmp_path)
+    assert statuses(run_pipeline(stages, ["b.txt"], root=str(tmp_path))) == {"a": "ran", "b": "ran"}
+    assert statuses(run_pipeline(stages, ["c"], root=str(tmp_path))) == {"a": "cached", "c": "ran"}
+
+# Test outputs built by make before the first run are adopted rather than rebuilt
+def test_run_pipeline_adopts_make_outputs(tmp_path):
+    stages, goal = make_project(tmp_path)
+    for name in "abcd":
+        (tmp_path / f"{name}.txt").write_text("made\n")
+        time.sleep(0.01)
+    assert set(statuses(run_pipeline(stages, goal, root=str(tmp_path))).values()) == {"adopted"}
+    assert set(statuses(run_pipeline(stages, goal, root=str(tmp_path))).values()) == {"cached"}
+
+# Test a failing stage skips its dependents only
+@pytest.mark.parametrize("c_command", ["exit 1", "echo no output"])
+def test_run_pipeline_failure(tmp_path, c_command):
+    stages, goal = make_project(tmp_path, c_command=c_command)
+    assert statuses(run_pipeline(stages, goal, root=str(tmp_path))) == \
+        {"a": "ran", "b": "ran", "c": "failed", "d": "skipped"}
+    assert (tmp_path / ".cache" / "pipeline" / "c.log").exists()
+    assert not (tmp_path / "d.txt").exists()
+
+# Test independent stages run at the same time
+def test_run_pipeline_parallel(tmp_path):
+    stages, goal = make_project(tmp_path, sleep=1)
+    report = {entry["name"]: entry for entry in run_pipeline(stages, goal, jobs=2, root=str(tmp_path))}
+
+    assert report["b"]["start"] < report["c"]["end"] and report["c"]["start"] < report["b"]["end"]
+    assert report["d"]["start"] >= max(report["b"]["end"], report["c"]["end"])
+    assert report["d"]["end"] < report["b"]["seconds"] + report["c"]["seconds"]
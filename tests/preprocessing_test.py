@@ -0,0 +1,144 @@
+import pytest
+import os
+import sys
+import pickle
+import numpy as np
+import pandas as pd
+from sklearn import config_context
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.preprocessing import QuantileSketch, fit_out_of_core, transform_file, FeatureDigest, \
+    save_preprocessor, load_preprocessor, ARTIFACT_VERSION
+from src.read_data import file_sha256
+
+NUMERIC = ['int.rate', 'installment', 'log.annual.inc', 'dti', 'days.with.cr.line', 'revol.bal',
+           'revol.util', 'fico', 'inq.last.6mths', 'delinq.2yrs', 'pub.rec', 'credit.policy']
+
+@pytest.fixture
+def preprocessor():
+    return ColumnTransformer(transformers=[
+        ('num', Pipeline(steps=[('imputer', SimpleImputer(strategy='median')), ('scaler', StandardScaler())]), NUMERIC),
+        ('cat', Pipeline(steps=[('imputer', SimpleImputer(strategy='most_frequent')),
+                                ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))]), ['purpose']),
+    ])
+
+@pytest.fixture
+def loans():
+    rng = np.random.default_rng(0)
+    data = pd.read_csv("data/processed/loan_train.csv")
+    data.loc[rng.random(len(data)) < 0.05, "dti"] = np.nan
+    data.loc[rng.random(len(data)) < 0.05, "purpose"] = np.nan
+    # A category that only appears after the first chunks
+    data.loc[len(data) - 3:, "purpose"] = "wedding"
+    return data
+
+def _chunks(data, chunksize):
+    return (data.iloc[start:start + chunksize] for start in range(0, len(data), chunksize))
+
+# Test every quantile respects the relative error bound, for any chunking and merge order
+def test_quantile_sketch_error_bound():
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(3, 2, 50_001) * rng.choice([-1, 1], 50_001)
+    values[:100] = 0
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for chunk in np.array_split(values, 7):
+        sketch.merge(QuantileSketch(relative_accuracy=0.01).update(chunk))
+
+    assert sketch.count == len(values)
+    for q in [0, 0.01, 0.25, 0.5, 0.75, 0.99, 1]:
+        assert sketch.quantile(q) == pytest.approx(np.quantile(values, q), rel=0.01)
+    np.testing.assert_array_equal(sketch.positive[1], QuantileSketch(0.01).update(values).positive[1])
+
+def test_quantile_sketch_integers_and_missing():
+    sketch = QuantileSketch().update([700, 705, np.nan, 712, 690])
+    assert sketch.count == 4
+    assert sketch.quantile(0.5) == np.median([700, 705, 712, 690])
+    assert np.isnan(QuantileSketch().quantile(0.5))
+    with pytest.raises(ValueError):
+        QuantileSketch(relative_accuracy=0.01).merge(QuantileSketch(relative_accuracy=0.02))
+
+# Test the streamed fit transforms like the in-memory fit, within the median error bound
+def test_fit_out_of_core(preprocessor, loans):
+    expected = clone(preprocessor).fit(loans)
+    fitted = fit_out_of_core(preprocessor, _chunks(loans, 1000))
+
+    expected_steps, fitted_steps = expected.named_transformers_['num'], fitted.named_transformers_['num']
+    np.testing.assert_allclose(fitted_steps['imputer'].statistics_, expected_steps['imputer'].statistics_, rtol=5e-4)
+    np.testing.assert_allclose(fitted_steps['scaler'].mean_, expected_steps['scaler'].mean_, rtol=1e-4)
+    np.testing.assert_allclose(fitted_steps['scaler'].scale_, expected_steps['scaler'].scale_, rtol=1e-4)
+    assert fitted_steps['scaler'].n_samples_seen_ == len(loans)
+    assert list(fitted.get_feature_names_out()) == list(expected.get_feature_names_out())
+    assert fitted.named_transformers_['cat']['imputer'].statistics_ == expected.named_transformers_['cat']['imputer'].statistics_
+
+    np.testing.assert_allclose(fitted.transform(loans), expected.transform(loans), atol=1e-3)
+
+def test_fit_out_of_core_invalid(preprocessor, loans):
+    preprocessor.transformers[0][1].steps[0][1].set_params(strategy='mean')
+    with pytest.raises(ValueError):
+        fit_out_of_core(preprocessor, _chunks(loans, 1000))
+    with pytest.raises(ValueError):
+        fit_out_of_core(clone(preprocessor).set_params(num__imputer__strategy='median'), iter([]))
+
+def test_transform_file(preprocessor, loans, tmp_path):
+    loans.to_csv(tmp_path / "loans.csv", index=False)
+    with config_context(transform_output="pandas"):
+        preprocessor.fit(loans)
+        transform_file(preprocessor, str(tmp_path / "loans.csv"), str(tmp_path / "scaled.csv"), chunksize=700)
+        expected = preprocessor.transform(loans)
+
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "scaled.csv"), expected)
+    assert sorted(os.listdir(tmp_path)) == ["loans.csv", "scaled.csv"]
+
+    # Array output is written with the same column names
+    transform_file(clone(preprocessor).fit(loans), str(tmp_path / "loans.csv"), str(tmp_path / "scaled.csv"))
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "scaled.csv"), expected)
+
+def test_feature_digest(loans):
+    whole, chunked = FeatureDigest(), FeatureDigest()
+    assert whole.update(loans) is loans
+    for chunk in _chunks(loans, 1000):
+        chunked.update(chunk)
+
+    assert whole.hexdigest() == chunked.hexdigest() and chunked.n_rows == len(loans)
+    changed = loans.copy()
+    changed.loc[5, "fico"] += 1
+    assert FeatureDigest().update(changed) is changed
+    digest = FeatureDigest()
+    digest.update(changed)
+    assert digest.hexdigest() != whole.hexdigest()
+
+# Test an artifact loads fitted, memory-mapped and only once per file version
+def test_save_load_preprocessor(preprocessor, loans, tmp_path):
+    path = str(tmp_path / "preprocessor.pickle")
+    preprocessor.fit(loans)
+    save_preprocessor(preprocessor, path, data_sha256="abc", features_sha256="def", n_rows=len(loans))
+    artifact = load_preprocessor(path)
+
+    assert artifact.metadata["data_sha256"] == "abc" and artifact.metadata["n_rows"] == len(loans)
+    assert isinstance(artifact.preprocessor.named_transformers_['num']['scaler'].mean_, np.memmap)
+    np.testing.assert_array_equal(artifact.preprocessor.transform(loans), preprocessor.transform(loans))
+    assert load_preprocessor(path) is artifact
+    assert os.listdir(tmp_path) == ["preprocessor.pickle"]
+
+    save_preprocessor(preprocessor, path, data_sha256="ghi", features_sha256="def", n_rows=len(loans))
+    os.utime(path, ns=(0, 0))
+    assert load_preprocessor(path).metadata["data_sha256"] == "ghi"
+
+def test_load_legacy_and_invalid_preprocessor(preprocessor, tmp_path):
+    with open(tmp_path / "legacy.pickle", "wb") as f:
+        pickle.dump(preprocessor, f)
+    assert load_preprocessor(str(tmp_path / "legacy.pickle")).metadata == {}
+    # The published artifact is versioned and fitted
+    published = load_preprocessor("results/models/preprocessor.pickle")
+    assert published.metadata["artifact_version"] == ARTIFACT_VERSION
+    assert published.metadata["data_sha256"] == file_sha256("data/processed/loan_train.csv")
+    assert len(published.preprocessor.get_feature_names_out()) == 19
+
+    with pytest.raises(pickle.UnpicklingError):
+        load_preprocessor("results/tables/cv_results.csv")
+    with pytest.raises(FileNotFoundError):
+        load_preprocessor(str(tmp_path / "missing.pickle"))
@@ -0,0 +1,107 @@
+import pytest
+import sys
+import os
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.read_data import read_data, read_loan_data, memory_report
+
+@pytest.fixture
+def csv_file(tmp_path):
+    file_path = tmp_path / "loans.csv"
+    pd.DataFrame({
+        "fico": [737, 707, 682],
+        "purpose": ["credit_card", "all_other", "educational"],
+        "int.rate": [0.1189, 0.1071, 0.1357]
+    }).to_csv(file_path, index=False)
+    return file_path
+
+def test_read_data_matches_read_csv(csv_file):
+    expected = pd.read_csv(csv_file)
+    # First read fills the cache, second read loads from it
+    pd.testing.assert_frame_equal(read_data(csv_file), expected)
+    pd.testing.assert_frame_equal(read_data(csv_file), expected)
+
+def test_read_data_writes_parquet_cache(csv_file):
+    read_data(csv_file)
+    cached = os.listdir(csv_file.parent / ".cache")
+    assert len(cached) == 1
+    assert cached[0].startswith("loans-") and cached[0].endswith(".parquet")
+
+def test_read_data_column_projection(csv_file):
+    read_data(csv_file)
+    result = read_data(csv_file, columns=["purpose", "fico"])
+    assert list(result.columns) == ["purpose", "fico"]
+    pd.testing.assert_frame_equal(result, pd.read_csv(csv_file)[["purpose", "fico"]])
+
+def test_read_data_invalidates_on_change(csv_file):
+    read_data(csv_file)
+    pd.DataFrame({"fico": [800], "purpose": ["credit_card"], "int.rate": [0.05]}).to_csv(csv_file, index=False)
+    result = read_data(csv_file)
+    assert result["fico"].tolist() == [800]
+    # The stale copy is replaced, not accumulated
+    assert len(os.listdir(csv_file.parent / ".cache")) == 1
+
+def test_read_data_custom_cache_dir(csv_file, tmp_path):
+    cache_dir = tmp_path / "cache"
+    read_data(csv_file, cache_dir=str(cache_dir))
+    assert len(os.listdir(cache_dir)) == 1
+
+# Test same-named files sharing a cache directory keep one copy each instead of evicting each other
+def test_read_data_shared_cache_dir(csv_file, tmp_path):
+    other = tmp_path / "other" / "loans.csv"
+    other.parent.mkdir()
+    pd.DataFrame({"fico": [800], "purpose": ["credit_card"], "int.rate": [0.05]}).to_csv(other, index=False)
+    cache_dir = str(tmp_path / "cache")
+    for _ in range(2):
+        assert read_data(csv_file, cache_dir=cache_dir)["fico"].tolist() == [737, 707, 682]
+        assert read_data(other, cache_dir=cache_dir)["fico"].tolist() == [800]
+    cached = os.listdir(cache_dir)
+    assert len(cached) == 2 and all(name.startswith("loans-") for name in cached)
+    # Both copies are hits: neither file was re-parsed on the second round
+    mtimes = {name: os.stat(os.path.join(cache_dir, name)).st_mtime_ns for name in cached}
+    read_data(csv_file, cache_dir=cache_dir)
+    assert {name: os.stat(os.path.join(cache_dir, name)).st_mtime_ns for name in cached} == mtimes
+
+# Test a column Parquet cannot store is still read, just not cached
+@pytest.mark.filterwarnings("ignore::pandas.errors.DtypeWarning")
+def test_read_data_uncacheable_column(tmp_path):
+    file_path = tmp_path / "mixed.csv"
+    # read_csv parses the file in blocks: integers in the first, strings in the last
+    file_path.write_text("id\n" + "\n".join(map(str, range(600_000))) + "\nx\n")
+    expected = pd.read_csv(file_path)
+    assert {type(value) for value in expected["id"]} == {int, str}
+    pd.testing.assert_frame_equal(read_data(file_path), expected)
+    assert os.listdir(tmp_path / ".cache") == []
+
+# Test a copy removed between the existence check and the read is a miss, not an error
+def test_read_data_cache_removed_concurrently(csv_file, monkeypatch):
+    read_data(csv_file)
+
+    def removed(*args, **kwargs):
+        raise FileNotFoundError
+    monkeypatch.setattr(pd, "read_parquet", removed)
+    pd.testing.assert_frame_equal(read_data(csv_file), pd.read_csv(csv_file))
+    assert len(os.listdir(csv_file.parent / ".cache")) == 1
+
+def test_read_data_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_data(tmp_path / "missing.csv")
+
+def test_read_loan_data_compact_dtypes(csv_file):
+    result = read_loan_data(csv_file)
+    assert result["fico"].dtype == "int16"
+    assert isinstance(result["purpose"].dtype, pd.CategoricalDtype)
+    assert result["int.rate"].dtype == "float64"
+    assert read_loan_data(csv_file, float32=True)["int.rate"].dtype == "float32"
+    pd.testing.assert_frame_equal(result.astype(pd.read_csv(csv_file).dtypes), pd.read_csv(csv_file))
+
+def test_memory_report(csv_file):
+    # Enough rows for the category codes to outweigh the category labels
+    pd.concat([pd.read_csv(csv_file)] * 100).to_csv(csv_file, index=False)
+    baseline = read_data(csv_file)
+    report = memory_report(read_loan_data(csv_file), baseline=baseline)
+    assert report.index.tolist() == [*baseline.columns, "total"]
+    assert report.loc["fico", "dtype"] == "int16"
+    assert report.loc["fico", "baseline_bytes"] == 4 * report.loc["fico", "bytes"]
+    assert report.loc["total", "bytes"] == report["bytes"].iloc[:-1].sum()
+    assert report.loc["total", "reduction"] > 1
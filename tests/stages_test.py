@@ -0,0 +1,99 @@
+import pytest
+import os
+import sys
+import warnings
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.data_validation import validate_csv
+from src.model_cv import FoldCache, model_cross_val
+from src.model_tuning import c_path_search
+from src.preprocessing import load_preprocessor
+from src.read_data import read_loan_data, file_sha256
+from src.stages import BackgroundWriter, split, split_csv, preprocess, run_in_process, save_artifact
+
+@pytest.fixture(scope="module")
+def loans():
+    return read_loan_data("data/raw/loan_data.csv")
+
+# Test the split matches the committed train and test files, as read back by the next stage
+def test_split(loans):
+    train_df, test_df = split(loans)
+    pd.testing.assert_frame_equal(train_df, read_loan_data("data/processed/loan_train.csv"))
+    pd.testing.assert_frame_equal(test_df, read_loan_data("data/processed/loan_test.csv"))
+
+# Test the chunked split writes the same rows, in the same order, as the in-memory one
+def test_split_csv(loans, tmp_path):
+    positions = validate_csv("data/raw/loan_data.csv", chunksize=1000)
+    split_csv("data/raw/loan_data.csv", str(tmp_path), positions, chunksize=1000)
+    assert sorted(os.listdir(tmp_path)) == ["loan_test.csv", "loan_train.csv"]
+    for written, expected in zip(["loan_train.csv", "loan_test.csv"], split(loans)):
+        pd.testing.assert_frame_equal(read_loan_data(str(tmp_path / written)), expected)
+
+# Test an in-memory artifact scores like the saved one and is cached like a path
+def test_preprocess_artifact_in_memory(loans, tmp_path):
+    train_df, test_df = split(loans)
+    artifact, tables = preprocess(train_df, test_df)
+    pd.testing.assert_frame_equal(tables["scaled_loan_train.csv"][0].reset_index(drop=True),
+                                  pd.read_csv("data/processed/scaled_loan_train.csv"), check_dtype=False)
+    assert load_preprocessor(artifact) is artifact
+
+    train_df.to_csv(tmp_path / "loan_train.csv", index=False)
+    save_artifact(artifact, str(tmp_path / "models" / "preprocessor.pickle"), str(tmp_path / "loan_train.csv"))
+    saved = load_preprocessor(str(tmp_path / "models" / "preprocessor.pickle"))
+    assert saved.metadata["data_sha256"] == file_sha256(str(tmp_path / "loan_train.csv"))
+    assert saved.metadata["features_sha256"] == artifact.metadata["features_sha256"]
+
+    X, y = train_df.drop(columns="not.fully.paid").head(500), train_df["not.fully.paid"].head(500)
+    cache = FoldCache(cv=3)
+    assert cache.folds(artifact, X, y) is cache.folds(artifact, X, y)
+    in_memory = model_cross_val(LogisticRegression(), artifact, X, y, fold_cache=cache)
+    saved = model_cross_val(LogisticRegression(), str(tmp_path / "models" / "preprocessor.pickle"), X, y,
+                            fold_cache=FoldCache(cv=3))
+    assert [in_memory[k] for k in ["test_score", "train_score"]] == [saved[k] for k in ["test_score", "train_score"]]
+
+def test_background_writer_order_and_errors():
+    done = []
+    with BackgroundWriter() as writer:
+        for i in range(5):
+            writer.submit(done.append, i)
+    assert done == list(range(5))
+
+    with pytest.raises(ZeroDivisionError):
+        with BackgroundWriter() as writer:
+            writer.submit(lambda: 1 / 0)
+            writer.submit(done.append, 5)
+    assert done[-1] == 5
+
+# Test a run on a sample writes every stage's files, consistent with each other
+def test_run_in_process(tmp_path):
+    raw = pd.read_csv("data/raw/loan_data.csv").sample(1500, random_state=0)
+    raw.to_csv(tmp_path / "loans.csv", index=False)
+    dirs = {name: tmp_path / name for name in ["processed", "tables", "figures", "models"]}
+    search = run_in_process(str(tmp_path / "loans.csv"), *map(str, dirs.values()), n_bootstrap=100, n_jobs=1)
+
+    assert sorted(os.listdir(dirs["processed"])) == ["loan_test.csv", "loan_train.csv",
+                                                     "scaled_loan_test.csv", "scaled_loan_train.csv"]
+    assert sorted(os.listdir(dirs["models"])) == ["pipeline.pickle", "preprocessor.pickle"]
+    assert os.listdir(dirs["figures"]) == ["param_C_tuning.png"]
+    assert {"cv_results.csv", "target_dist.csv", "model_results.csv", "test_metrics.csv", "test_ci.csv",
+            "confusion_matrix.csv", "positive_coef.csv"} <= set(os.listdir(dirs["tables"]))
+
+    artifact = load_preprocessor(str(dirs["models"] / "preprocessor.pickle"))
+    assert artifact.metadata["data_sha256"] == file_sha256(str(dirs["processed"] / "loan_train.csv"))
+    test_df = read_loan_data(str(dirs["processed"] / "loan_test.csv"))
+    accuracy = pd.read_csv(dirs["tables"] / "test_metrics.csv")["accuracy"][0]
+    assert accuracy == pytest.approx(np.mean(search.predict(test_df.drop(columns="not.fully.paid"))
+                                             == test_df["not.fully.paid"]), abs=1e-4)
+
+# Test the tuned pipeline reusing the published preprocessor predicts without feature-name warnings
+def test_reused_preprocessor_predicts_without_warnings(loans):
+    train_df, test_df = split(loans)
+    artifact, _ = preprocess(train_df, test_df)
+    search = c_path_search(artifact, train_df.drop(columns="not.fully.paid"), train_df["not.fully.paid"],
+                           np.logspace(-2, 2, 3), cv=3, n_jobs=1)
+    assert search.best_estimator_.named_steps["preprocessor"] is artifact.preprocessor
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        search.predict_proba(test_df.drop(columns="not.fully.paid"))
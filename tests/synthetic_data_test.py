@@ -0,0 +1,73 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.synthetic_data import LoanDataGenerator, write_synthetic
+from src.data_validation import validate
+
+@pytest.fixture(scope="module")
+def raw():
+    return pd.read_csv("data/raw/loan_data.csv")
+
+@pytest.fixture(scope="module")
+def generator(raw):
+    return LoanDataGenerator.fit(raw, calibration_rows=50_000)
+
+@pytest.fixture(scope="module")
+def sample(generator):
+    return generator.sample(50_000, seed=1)
+
+# Test generated loans keep the columns, dtypes and schema domains of the source
+def test_sample_valid(raw, sample):
+    assert list(sample.columns) == list(raw.columns)
+    pd.testing.assert_series_equal(sample.dtypes, raw.dtypes)
+    validate(sample)
+
+# Test the marginals: target rate, category mix and ranges
+def test_sample_marginals(raw, sample):
+    assert sample["not.fully.paid"].mean() == pytest.approx(raw["not.fully.paid"].mean(), abs=0.01)
+    mix = sample["purpose"].value_counts(normalize=True)
+    pd.testing.assert_series_equal(mix, raw["purpose"].value_counts(normalize=True).reindex(mix.index),
+                                   atol=0.01, check_names=False)
+    for col in raw.select_dtypes("number").columns:
+        assert raw[col].min() <= sample[col].min() and sample[col].max() <= raw[col].max()
+        assert sample[col].median() == pytest.approx(raw[col].median(), rel=0.05, abs=0.5)
+    # Recorded precision is kept
+    np.testing.assert_array_equal(sample["int.rate"], sample["int.rate"].round(4))
+
+# Test the dependence between columns matches the source
+def test_sample_correlation(raw, generator, sample):
+    np.testing.assert_allclose(generator.score_correlation(sample), generator.score_correlation(raw), atol=0.03)
+
+def test_sample_seeded(generator):
+    pd.testing.assert_frame_equal(generator.sample(100, seed=7), generator.sample(100, seed=7))
+    assert not generator.sample(100, seed=7).equals(generator.sample(100, seed=8))
+
+# Test missing values are generated at the source's rate
+def test_missing_values(raw):
+    with_missing = raw.copy()
+    with_missing.loc[with_missing.sample(frac=0.04, random_state=1).index, "dti"] = np.nan
+    generated = LoanDataGenerator.fit(with_missing, calibration_rounds=1, calibration_rows=10_000).sample(20_000, seed=1)
+    assert generated["dti"].isna().mean() == pytest.approx(0.04, abs=0.01)
+    assert generated.drop(columns="dti").notna().all().all()
+
+@pytest.mark.parametrize("filename", ["loans.csv", "loans.parquet"])
+def test_write_synthetic(generator, tmp_path, filename):
+    filepath = str(tmp_path / filename)
+    stats = write_synthetic(generator, filepath, 2500, chunksize=1000, seed=3)
+    written = pd.read_parquet(filepath) if filename.endswith(".parquet") else pd.read_csv(filepath)
+    expected = pd.concat(generator.iter_chunks(2500, chunksize=1000, seed=3), ignore_index=True)
+
+    assert stats["rows"] == 2500 and stats["rows_per_second"] > 0
+    pd.testing.assert_frame_equal(written, expected)
+    assert os.listdir(tmp_path) == [filename]
+
+def test_write_synthetic_empty(generator, tmp_path):
+    write_synthetic(generator, str(tmp_path / "loans.csv"), 0)
+    assert pd.read_csv(tmp_path / "loans.csv").columns.tolist() == generator.columns
+
+def test_write_synthetic_format(generator, tmp_path):
+    with pytest.raises(ValueError, match="Filename must end with"):
+        write_synthetic(generator, str(tmp_path / "loans.txt"), 10)
@@ -5,7 +5,7 @@ import pandera as pa
 import numpy as np
 import pandas as pd
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.data_validation import validate
+from src.data_validation import validate, validate_csv, compact_dtypes
 import math
 
 # Test Data
@@ -87,4 +87,73 @@ def test_invalid_data(invalid_data, description):
     with pytest.raises(pa.errors.SchemaErrors):
         validate(invalid_data)
 
+# Invalid data stays invalid after narrowing to compact dtypes
+@pytest.mark.parametrize("invalid_data, description", invalid_cases)
+def test_invalid_compact_data(invalid_data, description):
+    with pytest.raises(pa.errors.SchemaErrors):
+        validate(invalid_data.astype(compact_dtypes(invalid_data)))
+
+# Case: Compact dtypes are derived from the schema and still validate
+@pytest.mark.parametrize("float32", [False, True])
+def test_compact_dtypes(float32):
+    compact = data.astype(compact_dtypes(data, float32=float32))
+    assert compact["credit.policy"].dtype == np.int8
+    assert compact["not.fully.paid"].dtype == np.int8
+    assert compact["fico"].dtype == np.int16
+    assert isinstance(compact["purpose"].dtype, pd.CategoricalDtype)
+    assert compact["int.rate"].dtype == (np.float32 if float32 else np.float64)
+    assert compact.memory_usage(deep=True).sum() * 2 < data.memory_usage(deep=True).sum()
+    validate(compact)
+
+def test_compact_dtypes_keep_out_of_domain_values():
+    invalid_data = test_data.copy()
+    invalid_data.loc[0, "credit.policy"] = 1000
+    invalid_data.loc[1, "purpose"] = "others"
+    compact = invalid_data.astype(compact_dtypes(invalid_data))
+    assert compact["credit.policy"].dtype == np.int16
+    pd.testing.assert_frame_equal(compact.astype(invalid_data.dtypes), invalid_data)
+
+
+
+# Streaming validation: same verdict as the in-memory path
+def _verdict(check):
+    try:
+        check()
+    except (ValueError, pa.errors.SchemaErrors):
+        return "fail"
+    return "pass"
+
+streaming_cases = [(data, "Full training data")]
+
+invalid_data = data.copy()
+invalid_data.loc[:10, "fico"] = 1000
+streaming_cases.append((invalid_data, "Out of range values"))
+
+invalid_data = pd.concat([data, data.iloc[[0]]], ignore_index=True)
+streaming_cases.append((invalid_data, "Duplicate rows in different chunks"))
+
+invalid_data = data.copy()
+invalid_data.loc[:len(data) // 10, "dti"] = np.nan
+streaming_cases.append((invalid_data, "Too many null values"))
+
+invalid_data = data.copy()
+invalid_data["installment"] = invalid_data["revol.util"] + 1
+streaming_cases.append((invalid_data, "Anomalous correlations"))
+
+@pytest.mark.parametrize("case_data, description", streaming_cases)
+def test_validate_csv_verdict(case_data, description, tmp_path):
+    file_path = tmp_path / "loan_data.csv"
+    case_data.to_csv(file_path, index=False)
+    assert _verdict(lambda: validate_csv(file_path, chunksize=1000)) == _verdict(lambda: validate(case_data))
+
+def test_validate_csv_empty(tmp_path):
+    file_path = tmp_path / "loan_data.csv"
+    test_data.iloc[:0].to_csv(file_path, index=False)
+    with pytest.raises(ValueError, match="Input Dataframe cannot be empty."):
+        validate_csv(file_path)
 
+# Case: Valid data returns the timing breakdown per check
+def test_validate_timings():
+    timings = validate(data)
+    assert list(timings.keys()) == ["schema", "target_distribution", "correlation"]
+    assert all(seconds >= 0 for seconds in timings.values())
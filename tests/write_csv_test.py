@@ -1,4 +1,5 @@
 import pytest
+import io
 import sys
 import os
 import pandas as pd
@@ -63,4 +64,58 @@ def test_write_csv_empty_dataframe(sample_dataframe, temp_directory):
     empty_df = pd.DataFrame()  # Empty DataFrame
     
     with pytest.raises(ValueError, match="DataFrame must contain observations."):
-        write_csv(empty_df, temp_directory, "test_file.csv", index=False)
\ No newline at end of file
+        write_csv(empty_df, temp_directory, "test_file.csv", index=False)
+
+@pytest.fixture
+def loans():
+    return pd.DataFrame({
+        "purpose": pd.Categorical(["credit_card", "all_other", "credit_card"] * 1000),
+        "note": ['a, "b"', None, "c"] * 1000,
+        "flag": [0.0, 1.0, 0.0] * 1000,
+        "fico": [707, 682, 712] * 1000,
+        "dti": [8.03, None, 1e-05] * 1000,
+        "paid": [True, False, True] * 1000,
+    }, index=pd.RangeIndex(3000, name="loan"))
+
+# Test every format reads back the same frame, written in several chunks
+@pytest.mark.parametrize("filename", ["loans.csv", "loans.csv.gz", "loans.csv.bz2", "loans.parquet", "loans.feather"])
+@pytest.mark.parametrize("index", [False, True])
+def test_write_csv_formats(loans, temp_directory, filename, index):
+    write_csv(loans, temp_directory, filename, index=index, chunksize=700)
+    file_path = os.path.join(temp_directory, filename)
+
+    if ".csv" in filename:
+        loaded_df = pd.read_csv(file_path, index_col=0 if index else None)
+        expected = pd.read_csv(io.StringIO(loans.to_csv(index=index)), index_col=0 if index else None)
+    else:
+        loaded_df = pd.read_parquet(file_path) if filename.endswith(".parquet") else pd.read_feather(file_path)
+        expected = loans if index else loans.reset_index(drop=True)
+    pd.testing.assert_frame_equal(loaded_df, expected)
+    assert os.listdir(temp_directory) == [filename]
+
+# Test the pyarrow CSV matches to_csv where it can, and the pandas engine exactly
+def test_write_csv_matches_to_csv(loans, temp_directory):
+    plain = loans.drop(columns="note")
+    write_csv(plain, temp_directory, "pyarrow.csv", index=True)
+    write_csv(loans, temp_directory, "pandas.csv", index=True, engine="pandas")
+    with open(os.path.join(temp_directory, "pyarrow.csv")) as f:
+        assert f.read() == plain.to_csv(index=True).replace("1e-05", "0.00001")
+    with open(os.path.join(temp_directory, "pandas.csv")) as f:
+        assert f.read() == loans.to_csv(index=True)
+
+# Test a failed write leaves the previous file in place and no partial file
+def test_write_csv_atomic(sample_dataframe, temp_directory, monkeypatch):
+    write_csv(sample_dataframe, temp_directory, "test_file.csv")
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(pd.DataFrame, "to_csv", fail)
+    with pytest.raises(OSError, match="disk full"):
+        write_csv(pd.DataFrame({"class": [2]}), temp_directory, "test_file.csv", engine="pandas")
+
+    assert os.listdir(temp_directory) == ["test_file.csv"]
+    pd.testing.assert_frame_equal(pd.read_csv(os.path.join(temp_directory, "test_file.csv")), sample_dataframe)
+
+def test_write_csv_invalid_engine(sample_dataframe, temp_directory):
+    with pytest.raises(ValueError, match="Unknown engine"):
+        write_csv(sample_dataframe, temp_directory, "test_file.csv", engine="polars")